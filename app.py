@@ -1,6 +1,8 @@
 from rho_api import rho_bp
+from batch_api import batch_bp
 import os, sys
 from flask import Flask, request, jsonify, render_template_string, send_from_directory
+import rate_limit, metrics, profiling, time
 
 # Prefer system-wide /opt/factor-core; fall back to ./vendor
 try:
@@ -12,6 +14,8 @@ except Exception:
 STATIC_DIR = os.path.join(os.path.dirname(__file__), "web", "public")
 app = Flask(__name__, static_folder=STATIC_DIR, static_url_path="/static")
 app.register_blueprint(rho_bp)
+app.register_blueprint(batch_bp)
+metrics.init_app(app)
 
 PAGE = """<!doctype html><html><head>
 <meta charset="utf-8"><meta name="viewport" content="width=device-width,initial-scale=1">
@@ -85,14 +89,19 @@ def api_quick():
         n = int(str(data.get("n","")).strip())
     except:
         return jsonify(error="invalid integer"), 400
-    d, how = quick_factor(n, budget_s=3.0)
+    limited = rate_limit.limit("quick", n.bit_length(), 3000)
+    if limited: return limited
+    t0 = time.perf_counter()
+    (d, how), profile = profiling.run(profiling.requested(request, data), quick_factor, n, budget_s=3.0)
+    metrics.record_factor(how, time.perf_counter() - t0, n.bit_length(), bool(d))
+    extra = {"profile": profile} if profile else {}
     if d:
         q = n//d
         return jsonify(n_bits=n.bit_length(), method=how, factor=int(d), cofactor=int(q),
-                       pretty=f"{n} = {d} × {q}  (method: {how})")
+                       pretty=f"{n} = {d} × {q}  (method: {how})", **extra)
     info = classify(n, attempt_s=0.2)
     return jsonify(n_bits=n.bit_length(), method="quick", factor=None,
-                   pretty=f"No factor found quickly. status={info['status']} bits={info['bits']}")
+                   pretty=f"No factor found quickly. status={info['status']} bits={info['bits']}", **extra)
 
 @app.post("/api/ecm")
 def api_ecm():
@@ -106,12 +115,19 @@ def api_ecm():
         timeout = int(data.get("timeout",30))
     except:
         return jsonify(error="bad params"), 400
-    f, log = run_ecm(n, B1=B1, B2=B2, curves=curves, threads=threads, timeout=timeout)
+    limited = rate_limit.limit("ecm", n.bit_length(), timeout * 1000 * max(1, threads))
+    if limited: return limited
+    t0 = time.perf_counter()
+    (f, log), profile = profiling.run(profiling.requested(request, data), metrics.run_ecm_counted, run_ecm, n,
+                                      B1=B1, B2=B2, curves=curves, threads=threads, timeout=timeout)
+    metrics.record_factor("ecm", time.perf_counter() - t0, n.bit_length(), bool(f))
+    extra = {"profile": profile} if profile else {}
     if f:
         co = n//f
         return jsonify(factor=int(f), cofactor=int(co), n_bits=n.bit_length(),
-                       pretty=f"{n} = {f} × {co}  (ECM)")
-    return jsonify(factor=None, n_bits=n.bit_length(), pretty="No factor found by ECM.", log=(log or "")[-4000:])
+                       pretty=f"{n} = {f} × {co}  (ECM)", **extra)
+    return jsonify(factor=None, n_bits=n.bit_length(), pretty="No factor found by ECM.", log=(log or "")[-4000:],
+                   **extra)
 
 @app.post("/api/rho")
 def api_rho():
@@ -123,11 +139,16 @@ def api_rho():
         return jsonify(error="bad params"), 400
     if n.bit_length() > 128:
         return jsonify(error="Please keep N ≤ 128 bits for this demo."), 400
-    d = pollard_rho(n, iters=max(1,it))
+    limited = rate_limit.limit("rho", n.bit_length(), iters=max(1, it))
+    if limited: return limited
+    t0 = time.perf_counter()
+    d, profile = profiling.run(profiling.requested(request, data), pollard_rho, n, iters=max(1,it))
+    metrics.record_factor("rho", time.perf_counter() - t0, n.bit_length(), bool(d))
+    extra = {"profile": profile} if profile else {}
     if d:
         co = n//d
-        return jsonify(factor=int(d), cofactor=int(co), pretty=f"{n} = {d} × {co}  (Pollard Rho)")
-    return jsonify(factor=None, pretty="No factor found within iteration budget.")
+        return jsonify(factor=int(d), cofactor=int(co), pretty=f"{n} = {d} × {co}  (Pollard Rho)", **extra)
+    return jsonify(factor=None, pretty="No factor found within iteration budget.", **extra)
 
 @app.get("/api/health")
 def api_health():
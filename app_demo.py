@@ -1,6 +1,6 @@
-<<<<<<< HEAD
 #!/usr/bin/env python3
-import os, json, random, time, multiprocessing as mp
+import os, json, random, time
+os.environ.setdefault("TRACE_LOG", "1")  # span logs of real traffic (before rsacrack is imported)
 from collections import Counter
 from flask import Flask, request, jsonify
 
@@ -13,32 +13,14 @@ DEFAULT_MAX_BITS_FOR_FACTOR = 4096
 HARD_MAX_BITS               = 16384   # keep a sanity ceiling
 app = Flask(__name__)
 
-def _factor_worker(n, q):
-    try:
-        fs = factor(n)
-        q.put(("ok", fs))
-    except Exception as e:
-        q.put(("err", str(e)))
-
-def factor_with_timeout(n: int, timeout_ms: int):
-    # 0 or negative => infinite
-    if timeout_ms and timeout_ms > 0:
-        os.environ["FACTOR_MAX_SECONDS"] = str(max(1, timeout_ms // 1000))
-    else:
-        os.environ["FACTOR_MAX_SECONDS"] = "0"  # infinite
-    q = mp.Queue()
-    p = mp.Process(target=_factor_worker, args=(n, q), daemon=True)
-    p.start()
-    if timeout_ms and timeout_ms > 0:
-        p.join(timeout_ms / 1000.0)
-        if p.is_alive():
-            p.terminate(); p.join()
-            return None, "timeout"
-    else:
-        p.join()  # wait indefinitely
-    if q.empty(): return None, "noresult"
-    tag, payload = q.get()
-    return (payload, None) if tag == "ok" else (None, "error:" + payload)
+from factor_pool import FactorPool
+import rate_limit, metrics, profiling
+_pool = FactorPool()
+metrics.init_app(app)
+
+def factor_with_timeout(n: int, timeout_ms: int, profile_mode=None):
+    # 0 or negative => infinite; the deadline travels with the task
+    return _pool.run(n, timeout_ms, profile_mode)
 
 def to_counter_map(fs):
     if isinstance(fs, dict):
@@ -145,14 +127,20 @@ def api_factor():
             "params": {"max_bits": max_bits, "timeout_ms": timeout_ms}
         })
 
-    fs, err = factor_with_timeout(n, timeout_ms)
+    limited = rate_limit.limit("factor", bits, timeout_ms)
+    if limited: return limited
+    t0 = time.perf_counter()
+    fs, err, profile = factor_with_timeout(n, timeout_ms, profiling.requested(request))
+    metrics.record_factor("tangent", time.perf_counter() - t0, bits, fs is not None)
+    extra = {"profile": profile} if profile else {}
     if fs is None:
         return jsonify({
             "n": n, "n_str": str(n),
             "classification": "composite",
             "bits": bits,
             "status": err,
-            "params": {"max_bits": max_bits, "timeout_ms": timeout_ms}
+            "params": {"max_bits": max_bits, "timeout_ms": timeout_ms},
+            **extra
         })
 
     return jsonify({
@@ -161,7 +149,8 @@ def api_factor():
         "factors": to_counter_map(fs),
         "bits": bits,
         "status": "ok",
-        "params": {"max_bits": max_bits, "timeout_ms": timeout_ms}
+        "params": {"max_bits": max_bits, "timeout_ms": timeout_ms},
+        **extra
     })
 
 if __name__ == "__main__":
@@ -173,16 +162,17 @@ try:
     from flask import request, jsonify
     from lotto_factor import factor_lotto_64
 
-    def _factor_core(n: int, budget_ms: int|None):
+    def _factor_core(n: int, budget_ms: int|None, profile_mode=None):
         t0 = time.perf_counter()
-        res = factor_lotto_64(n, budget_ms=budget_ms)
+        res, profile = profiling.run(profile_mode, factor_lotto_64, n, budget_ms=budget_ms)
         dt_ms = int((time.perf_counter() - t0) * 1000)
+        extra = {"profile": profile} if profile else {}
         if res is None:
-            return {"ok": True, "n": str(n), "duration_ms": dt_ms, "result": "none"}
+            return {"ok": True, "n": str(n), "duration_ms": dt_ms, "result": "none", **extra}
         p, q = res
         if q == 1:
-            return {"ok": True, "n": str(n), "duration_ms": dt_ms, "result": "prime", "p": str(p)}
-        return {"ok": True, "n": str(n), "duration_ms": dt_ms, "result": "factors", "p": str(p), "q": str(q)}
+            return {"ok": True, "n": str(n), "duration_ms": dt_ms, "result": "prime", "p": str(p), **extra}
+        return {"ok": True, "n": str(n), "duration_ms": dt_ms, "result": "factors", "p": str(p), "q": str(q), **extra}
 
     @app.get("/api/factor")
     def api_factor_query():
@@ -202,7 +192,7 @@ try:
                 return jsonify({"error":"timeout_ms must be integer"}), 400
         if n < 0 or n > 0xFFFFFFFFFFFFFFFF:
             return jsonify({"error":"n must be 64-bit unsigned"}), 400
-        return jsonify(_factor_core(n, budget_ms))
+        return jsonify(_factor_core(n, budget_ms, profiling.requested(request)))
 
     @app.post("/api/lotto_factor")
     def api_lotto_factor():
@@ -216,7 +206,7 @@ try:
             return jsonify({"error": f"invalid payload: {e}"}), 400
         if n < 0 or n > 0xFFFFFFFFFFFFFFFF:
             return jsonify({"error":"n must be 64-bit unsigned"}), 400
-        return jsonify(_factor_core(n, budget_ms))
+        return jsonify(_factor_core(n, budget_ms, profiling.requested(request, data)))
 except Exception as _e:
     # Keep the rest of app_demo working even if lotto imports are missing
     pass
@@ -227,16 +217,17 @@ try:
     from flask import request, jsonify
     from lotto_factor import factor_lotto_64
 
-    def _factor_core(n: int, budget_ms: int|None):
+    def _factor_core(n: int, budget_ms: int|None, profile_mode=None):
         t0 = time.perf_counter()
-        res = factor_lotto_64(n, budget_ms=budget_ms)
+        res, profile = profiling.run(profile_mode, factor_lotto_64, n, budget_ms=budget_ms)
         dt_ms = int((time.perf_counter() - t0) * 1000)
+        extra = {"profile": profile} if profile else {}
         if res is None:
-            return {"ok": True, "n": str(n), "duration_ms": dt_ms, "result": "none"}
+            return {"ok": True, "n": str(n), "duration_ms": dt_ms, "result": "none", **extra}
         p, q = res
         if q == 1:
-            return {"ok": True, "n": str(n), "duration_ms": dt_ms, "result": "prime", "p": str(p)}
-        return {"ok": True, "n": str(n), "duration_ms": dt_ms, "result": "factors", "p": str(p), "q": str(q)}
+            return {"ok": True, "n": str(n), "duration_ms": dt_ms, "result": "prime", "p": str(p), **extra}
+        return {"ok": True, "n": str(n), "duration_ms": dt_ms, "result": "factors", "p": str(p), "q": str(q), **extra}
 
     @app.get("/api/factor")
     def api_factor_query():
@@ -256,7 +247,7 @@ try:
                 return jsonify({"error":"timeout_ms must be integer"}), 400
         if n < 0 or n > 0xFFFFFFFFFFFFFFFF:
             return jsonify({"error":"n must be 64-bit unsigned"}), 400
-        return jsonify(_factor_core(n, budget_ms))
+        return jsonify(_factor_core(n, budget_ms, profiling.requested(request)))
 
     @app.post("/api/lotto_factor")
     def api_lotto_factor():
@@ -270,7 +261,7 @@ try:
             return jsonify({"error": f"invalid payload: {e}"}), 400
         if n < 0 or n > 0xFFFFFFFFFFFFFFFF:
             return jsonify({"error":"n must be 64-bit unsigned"}), 400
-        return jsonify(_factor_core(n, budget_ms))
+        return jsonify(_factor_core(n, budget_ms, profiling.requested(request, data)))
 except Exception as _e:
     # Keep the rest of app_demo working even if lotto imports are missing
     pass
@@ -283,27 +274,11 @@ def _new_ui():
 
 
 # --- Generic API proxy to Node (:3000) ---
-from flask import request, Response, jsonify
-import requests as _rq
+from upstream_proxy import forward as _forward
 
 @app.route('/api/<path:path>', methods=['GET','POST','PUT','DELETE','PATCH','OPTIONS'])
 def api_proxy(path):
-    try:
-        url = f'http://127.0.0.1:3000/api/{path}'
-        resp = _rq.request(
-            method=request.method,
-            url=url,
-            params=request.args,
-            data=request.get_data(),
-            headers={k:v for k,v in request.headers.items()
-                     if k.lower() in ('content-type','accept','authorization')},
-            timeout=300
-        )
-        drop = {'content-encoding','transfer-encoding','connection'}
-        hdrs = [(k,v) for k,v in resp.headers.items() if k.lower() not in drop]
-        return Response(resp.content, resp.status_code, headers=hdrs)
-    except Exception as e:
-        return jsonify(ok=False, error=f'proxy error: {e}'), 502
+    return _forward(f'/api/{path}', timeout_s=300)
 
 # (commented duplicate /api/health block removed)
 
@@ -376,16 +351,40 @@ def _api_factor_impl():
     return jsonify(ok=False, n=str(n), result="unknown")
 
 def _api_classify_impl():
+    # prime / semiprime / composite without factoring n where a bound proves it;
+    # the primes (p, q or factor_count) come along when they were found anyway,
+    # or are worked out when ?factors=1 asks for them.  "type" keeps its old
+    # meaning (semiprime = p*q with p != q; p^2 and undecided n are composite);
+    # "kind" is the engine's answer, counted with multiplicity, and may be
+    # "unknown" when the split ran out of time
     n = _parse_n()
+    want = (request.args.get('factors') or '').lower() in ('1', 'true', 'yes')
     try:
-        import sympy as sp
-        if sp.isprime(n):
-            return jsonify(ok=True, n=str(n), type="prime")
-        f = sp.factorint(n, limit=1_000_000)
-        if len(f) == 2 and all(exp == 1 for exp in f.values()):
-            ps = sorted(f.keys())
-            return jsonify(ok=True, n=str(n), type="semiprime", p=str(ps[0]), q=str(ps[1]))
-        return jsonify(ok=True, n=str(n), type="composite", factor_count=len(f))
+        import math
+        from rsacrack.classify import classify, factorize
+        c = classify(n)
+        if c.kind == "prime":
+            return jsonify(ok=True, n=str(n), type="prime", kind=c.kind, proof=c.proof)
+        r = math.isqrt(n)
+        square = c.kind == "semiprime" and r * r == n
+        f = {r: 2} if square else c.primes
+        if f is None and want:
+            try:
+                f = factorize(n, c, time_ms=3000)
+            except TimeoutError:
+                f = None
+        if c.kind == "semiprime" and not square:
+            out = dict(ok=True, n=str(n), type="semiprime", kind=c.kind, proof=c.proof)
+            if f:
+                ps = sorted(p for p, e in f.items() for _ in range(e))
+                out.update(p=str(ps[0]), q=str(ps[1]))
+            return jsonify(**out)
+        out = dict(ok=True, n=str(n), type="composite", kind=c.kind, proof=c.proof)
+        if c.kind == "unknown":
+            out["detail"] = "no factor found in time; semiprime not ruled out"
+        if f:
+            out["factor_count"] = len(f)
+        return jsonify(**out)
     except Exception as e:
         return jsonify(ok=False, error=str(e)), 400
 
@@ -404,8 +403,9 @@ def _api_json_guard(fn):
         return fn()
     except Exception as e:
         return jsonify(ok=False, error=str(e)), 400
-=======
-from rsacrack import factor_one, is_probable_prime
+
+# === Inline /factor (rsacrack pipeline) ===
+from rsacrack import factor_one, is_probable_prime as _rsacrack_is_prime
 
 @app.post("/factor")
 def _factor_inline():
@@ -419,7 +419,6 @@ def _factor_inline():
     return jsonify({
         "status":"ok","n":str(n),"p":str(res.p),"q":str(res.q),
         "method":res.method,"steps":res.steps,
-        "is_p_prime": is_probable_prime(res.p),
-        "is_q_prime": is_probable_prime(res.q)
+        "is_p_prime": _rsacrack_is_prime(res.p),
+        "is_q_prime": _rsacrack_is_prime(res.q)
     })
->>>>>>> 71a6650 (chore: repo init + API + infra)
@@ -0,0 +1,547 @@
+# asgi_app.py — asyncio service mode for RSAcrack
+#
+# The CPU-bound routes of app.py, web/app.py and factor_server.py are served
+# by async handlers that hand the work to a bounded, pre-warmed process pool,
+# so no request thread ever blocks on factoring and /healthz keeps answering
+# while every core is busy.  Everything else (rho queue API, UI pages, static
+# files) falls through to the Flask app in app.py.
+#
+#   uvicorn asgi_app:app --host 0.0.0.0 --port 8080
+#   gunicorn -w 1 -k uvicorn.workers.UvicornWorker -b 0.0.0.0:8080 asgi_app:app
+#
+# One ASGI worker per host is enough: throughput comes from the process pool,
+# which is sized to the core count (ASGI_POOL_WORKERS).
+
+import os, sys, io, json, time, asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import parse_qs
+import multiprocessing as mp
+
+sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+os.environ.setdefault("TRACE_LOG", "1")  # span logs of real traffic, pool processes included
+
+# Prefer system-wide /opt/factor-core; fall back to ./vendor (same as app.py)
+try:
+    from factor_core import quick_factor, classify, run_ecm, pollard_rho
+except Exception:
+    sys.path.insert(0, os.path.join(os.path.dirname(__file__), "vendor"))
+    from factor_core import quick_factor, classify, run_ecm, pollard_rho
+import metrics
+
+POOL_WORKERS = int(os.getenv("ASGI_POOL_WORKERS", str(os.cpu_count() or 1)))
+MAX_INFLIGHT = int(os.getenv("ASGI_MAX_INFLIGHT", str(POOL_WORKERS * 4)))  # running + waiting
+DEADLINE_S   = float(os.getenv("ASGI_DEADLINE_S", "40"))                  # hard cap per request
+GRACE_S      = 2.0                                                        # on top of an engine's own budget
+MAX_BODY     = 1 << 20
+
+# ------------------ CPU jobs (run inside the pool) ------------------
+def _warm_worker():
+    # pay the import/JIT-ish costs once per pool process, not per request
+    import lotto_factor  # noqa: F401
+    from rsacrack import pipeline_smart  # noqa: F401
+    quick_factor(91, budget_s=0.01)
+
+def _ping():
+    return os.getpid()
+
+def _quick_job(n, profile_mode=None):
+    import profiling
+    t0 = time.perf_counter()
+    (d, how), profile = profiling.run(profile_mode, quick_factor, n, budget_s=3.0)
+    metrics.record_factor(how, time.perf_counter() - t0, n.bit_length(), bool(d))
+    extra = {"profile": profile} if profile else {}
+    if d:
+        q = n//d
+        return dict(n_bits=n.bit_length(), method=how, factor=int(d), cofactor=int(q),
+                    pretty=f"{n} = {d} × {q}  (method: {how})", **extra)
+    info = classify(n, attempt_s=0.2)
+    return dict(n_bits=n.bit_length(), method="quick", factor=None,
+                pretty=f"No factor found quickly. status={info['status']} bits={info['bits']}", **extra)
+
+def _ecm_job(n, B1, B2, curves, threads, timeout, profile_mode=None):
+    import profiling
+    t0 = time.perf_counter()
+    (f, log), profile = profiling.run(profile_mode, metrics.run_ecm_counted, run_ecm, n,
+                                      B1=B1, B2=B2, curves=curves, threads=threads, timeout=timeout)
+    metrics.record_factor("ecm", time.perf_counter() - t0, n.bit_length(), bool(f))
+    extra = {"profile": profile} if profile else {}
+    if f:
+        co = n//f
+        return dict(factor=int(f), cofactor=int(co), n_bits=n.bit_length(),
+                    pretty=f"{n} = {f} × {co}  (ECM)", **extra)
+    return dict(factor=None, n_bits=n.bit_length(), pretty="No factor found by ECM.", log=(log or "")[-4000:],
+                **extra)
+
+def _rho_job(n, it, profile_mode=None):
+    import profiling
+    t0 = time.perf_counter()
+    d, profile = profiling.run(profile_mode, pollard_rho, n, iters=max(1, it))
+    metrics.record_factor("rho", time.perf_counter() - t0, n.bit_length(), bool(d))
+    extra = {"profile": profile} if profile else {}
+    if d:
+        co = n//d
+        return dict(factor=int(d), cofactor=int(co), pretty=f"{n} = {d} × {co}  (Pollard Rho)", **extra)
+    return dict(factor=None, pretty="No factor found within iteration budget.", **extra)
+
+def _lotto_job(n, budget_ms, profile_mode=None):
+    import profiling
+    from lotto_factor import factor_lotto_64
+    t0 = time.perf_counter()
+    res, profile = profiling.run(profile_mode, factor_lotto_64, n, budget_ms=budget_ms)
+    dt_ms = int((time.perf_counter() - t0) * 1000)
+    metrics.record_factor("lotto", dt_ms / 1000.0, n.bit_length(), res is not None)
+    extra = {"profile": profile} if profile else {}
+    if res is None:
+        return {"ok": True, "n": str(n), "duration_ms": dt_ms, "result": "none", **extra}
+    p, q = res
+    if q == 1:
+        return {"ok": True, "n": str(n), "duration_ms": dt_ms, "result": "prime", "p": str(p), **extra}
+    return {"ok": True, "n": str(n), "duration_ms": dt_ms, "result": "factors", "p": str(p), "q": str(q), **extra}
+
+def _smart_job(n, time_ms, strategy, want_trace=False, profile_mode=None):
+    import profiling
+    from rsacrack import is_probable_prime
+    from rsacrack.pipeline_smart import factor_smart
+    from rsacrack.tracing import Tracer
+    t0 = time.perf_counter()
+    tracer = Tracer("smart", n)
+    res, profile = profiling.run(profile_mode, factor_smart, n, max_ms=time_ms, tracer=tracer)
+    metrics.record_factor(res["method"] if res else None, time.perf_counter() - t0, n.bit_length(), bool(res))
+    trace = {"trace": tracer.to_list()} if want_trace else {}
+    if profile:
+        trace["profile"] = profile
+    if not res:
+        return {"status": "timeout", "n": str(n), "time_ms": time_ms, "strategy": strategy, **trace}
+    return {
+        "status": "ok", "n": str(n), "p": str(res["p"]), "q": str(res["q"]),
+        "method": res["method"], "steps": res["steps"],
+        "is_p_prime": is_probable_prime(res["p"]),
+        "is_q_prime": is_probable_prime(res["q"]),
+        "strategy": strategy,
+        **trace,
+    }
+
+# ------------------ pool + admission ------------------
+# A request holds its admission slot until its pool job has really finished,
+# not just until the request gave up on it.  A job still running past its
+# deadline retires the pool: new work goes to a fresh pool, and the old one's
+# processes are killed as soon as only overdue jobs are left on it.  A pool
+# broken by a worker that died on its own (segfault, OOM kill) is retired the
+# same way and the request is retried once on a fresh one.
+_pool = None
+_inflight = 0
+_jobs = {}      # pool -> [jobs not finished, set of those past their deadline]
+
+def _get_pool():
+    global _pool
+    if _pool is not None and getattr(_pool, "_broken", False):
+        _retire(_pool)
+    if _pool is None:
+        # forkserver: workers start from a clean process, not from a copy of
+        # the event loop and its threads
+        ctx = mp.get_context("forkserver" if "forkserver" in mp.get_all_start_methods() else "spawn")
+        _pool = ProcessPoolExecutor(max_workers=POOL_WORKERS, mp_context=ctx, initializer=_warm_worker)
+    return _pool
+
+class _Reject(Exception):
+    def __init__(self, status, payload, headers=()):
+        self.status, self.payload, self.headers = status, payload, list(headers)
+
+async def _limit(scope, method, bits, budget_ms=None, iters=None):
+    """Charge the shared cost-weighted bucket; 429 with Retry-After when empty."""
+    import rate_limit
+    xff = dict(scope["headers"]).get(b"x-forwarded-for", b"").decode("latin-1")
+    ip = rate_limit.client_addr((scope.get("client") or ("-",))[0], xff)
+    cost = rate_limit.estimate_cost(method, bits, budget_ms, iters)
+    ok, retry, _ = await asyncio.to_thread(rate_limit.charge, ip, cost)
+    if not ok:
+        raise _Reject(429, {"error": "too many requests", "retry_after": retry},
+                      [("retry-after", str(max(1, retry)))])
+
+def _job_done(pool, fut):
+    global _inflight
+    _inflight -= 1
+    live = _jobs[pool]
+    live[0] -= 1
+    live[1].discard(fut)
+    if live[0] == 0:
+        del _jobs[pool]
+    _reap(pool)
+
+def _kill(pool):
+    for proc in list((getattr(pool, "_processes", None) or {}).values()):
+        proc.terminate()    # overdue futures fail with BrokenProcessPool and free their slots
+    pool.shutdown(wait=False, cancel_futures=True)
+
+def _retire(pool):
+    """New work goes to a fresh pool; this one is shut down once _reap allows."""
+    global _pool
+    if pool is _pool:
+        _pool = None
+    _reap(pool)
+
+def _reap(pool):
+    """Shut a retired pool down once every job left on it is overdue (or none is left)."""
+    if pool is _pool:
+        return
+    live = _jobs.get(pool)
+    if live is None:
+        pool.shutdown(wait=False)
+    elif live[0] <= len(live[1]):
+        _kill(pool)
+
+async def _offload(fn, *args, budget_s):
+    """Run fn(*args) in the pool; 503 when over the admission limit or the pool
+    broke twice, 504 past the deadline."""
+    if _inflight >= MAX_INFLIGHT:
+        raise _Reject(503, {"error": "server busy, retry shortly"}, [("retry-after", "1")])
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + min(DEADLINE_S, budget_s + GRACE_S)
+    for attempt in (0, 1):
+        try:
+            return await _run_in_pool(loop, fn, args, deadline)
+        except BrokenProcessPool:
+            pass    # _run_in_pool retired the pool; the next attempt gets a fresh one
+    raise _Reject(503, {"error": "worker pool failed, retry shortly"}, [("retry-after", "1")])
+
+async def _run_in_pool(loop, fn, args, deadline):
+    global _inflight
+    pool = _get_pool()
+    try:
+        fut = pool.submit(fn, *args)
+    except BrokenProcessPool:
+        _retire(pool)
+        raise
+    _inflight += 1
+    _jobs.setdefault(pool, [0, set()])[0] += 1
+    fut.add_done_callback(lambda f: loop.call_soon_threadsafe(_job_done, pool, f))
+    waiter = asyncio.wrap_future(fut)
+    waiter.add_done_callback(lambda w: w.cancelled() or w.exception())   # nobody reads an abandoned one
+    try:
+        return await asyncio.wait_for(asyncio.shield(waiter), max(0.0, deadline - loop.time()))
+    except BrokenProcessPool:
+        _retire(pool)
+        raise
+    except asyncio.TimeoutError:
+        if not fut.cancel() and not fut.done():   # running: its process is busy until it is killed
+            _jobs[pool][1].add(fut)
+            _retire(pool)
+        raise _Reject(504, {"error": "deadline exceeded"})
+
+# ------------------ ASGI plumbing ------------------
+def _json_body(obj):
+    # match Flask's jsonify output (sorted keys, compact)
+    return json.dumps(obj, sort_keys=True, separators=(",", ":")).encode("utf-8") + b"\n"
+
+async def _respond(send, status, body, ctype="application/json", headers=()):
+    hdrs = [(b"content-type", ctype.encode()), (b"content-length", str(len(body)).encode())]
+    hdrs += [(k.encode("latin-1"), v.encode("latin-1")) for k, v in headers]
+    await send({"type": "http.response.start", "status": status, "headers": hdrs})
+    await send({"type": "http.response.body", "body": body})
+
+async def _read_body(receive):
+    chunks, size = [], 0
+    while True:
+        msg = await receive()
+        if msg["type"] == "http.disconnect":
+            break
+        chunk = msg.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY:
+            raise _Reject(413, {"error": "request body too large"})
+        chunks.append(chunk)
+        if not msg.get("more_body"):
+            break
+    return b"".join(chunks)
+
+def _json_payload(body):
+    try:
+        data = json.loads(body or b"{}")
+    except Exception:
+        data = None
+    return data if isinstance(data, dict) else {}
+
+def _content_type(scope):
+    for k, v in scope["headers"]:
+        if k == b"content-type":
+            return v.decode("latin-1").split(";")[0].strip().lower()
+    return ""
+
+def _query(scope):
+    return {k: v[0] for k, v in parse_qs(scope["query_string"].decode("latin-1")).items()}
+
+def _profile_mode(scope, data):
+    """profiling.requested() for a raw ASGI scope: admin token header plus ?profile= / body flag."""
+    import profiling
+    raw = _query(scope).get("profile", data.get("profile"))
+    raw = str(raw or "").lower()
+    token = dict(scope["headers"]).get(b"x-admin-token", b"").decode("latin-1")
+    if raw in ("", "0", "false", "no") or not profiling.is_admin(token):
+        return None
+    return raw if raw in profiling.MODES else "sample"
+
+# ------------------ routes (same contracts as the Flask apps) ------------------
+async def healthz(scope, body):
+    return 200, b"ok", "text/plain; charset=utf-8"
+
+async def api_quick(scope, body):
+    data = _json_payload(body)
+    try:
+        n = int(str(data.get("n","")).strip())
+    except Exception:
+        return 400, {"error": "invalid integer"}
+    await _limit(scope, "quick", n.bit_length(), 3000)
+    return 200, await _offload(_quick_job, n, _profile_mode(scope, data), budget_s=3.0 + 0.2)
+
+async def api_ecm(scope, body):
+    data = _json_payload(body)
+    try:
+        n = int(str(data.get("n","")).strip())
+        B1 = int(data.get("B1", 100000))
+        B2 = int(data["B2"]) if (data.get("B2") not in (None,"")) else None
+        curves = int(data.get("curves",5))
+        threads = int(data.get("threads",1))
+        timeout = int(data.get("timeout",30))
+    except Exception:
+        return 400, {"error": "bad params"}
+    await _limit(scope, "ecm", n.bit_length(), timeout * 1000 * max(1, threads))
+    return 200, await _offload(_ecm_job, n, B1, B2, curves, threads, timeout, _profile_mode(scope, data),
+                               budget_s=timeout)
+
+async def api_rho(scope, body):
+    data = _json_payload(body)
+    try:
+        n = int(str(data.get("n","")).strip())
+        it = int(data.get("it", 1_000_000))
+    except Exception:
+        return 400, {"error": "bad params"}
+    if n.bit_length() > 128:
+        return 400, {"error": "Please keep N ≤ 128 bits for this demo."}
+    await _limit(scope, "rho", n.bit_length(), iters=max(1, it))
+    return 200, await _offload(_rho_job, n, it, _profile_mode(scope, data), budget_s=DEADLINE_S)
+
+def _check_u64(n):
+    if n < 0 or n > 0xFFFFFFFFFFFFFFFF:
+        raise _Reject(400, {"error": "n must be a 64-bit unsigned integer (0..2^64-1)"})
+
+async def api_lotto_factor(scope, body):
+    try:
+        data = json.loads(body)
+        n = int(data.get("n"))
+        budget_ms = data.get("budget_ms")
+        if budget_ms is not None:
+            budget_ms = int(budget_ms)
+    except Exception as e:
+        return 400, {"error": f"Invalid payload: {e}"}
+    _check_u64(n)
+    await _limit(scope, "lotto", n.bit_length(), budget_ms)
+    return 200, await _offload(_lotto_job, n, budget_ms, _profile_mode(scope, data),
+                               budget_s=(budget_ms or 700) / 1000.0)
+
+async def api_factor_query(scope, body):
+    args = _query(scope)
+    n_str = args.get("n", "").strip()
+    t_str = args.get("timeout_ms", "").strip()
+    if not n_str:
+        return 400, {"error": "missing n"}
+    try:
+        n = int(n_str)
+    except Exception:
+        return 400, {"error": "n must be integer"}
+    budget_ms = None
+    if t_str and t_str != "0":
+        try:
+            budget_ms = int(t_str)
+        except Exception:
+            return 400, {"error": "timeout_ms must be integer"}
+    _check_u64(n)
+    await _limit(scope, "lotto", n.bit_length(), budget_ms)
+    return 200, await _offload(_lotto_job, n, budget_ms, _profile_mode(scope, args),
+                               budget_s=(budget_ms or 700) / 1000.0)
+
+async def factor_endpoint(scope, body):
+    if _content_type(scope) == "application/json":
+        data = _json_payload(body)
+    else:
+        data = _query({"query_string": body})
+    try:
+        n = int((data.get("n") or "").strip())
+    except Exception:
+        return 400, {"status": "error", "error": "invalid n"}
+    try:
+        time_ms = int(data.get("time_ms", 3000))
+    except Exception:
+        return 400, {"status": "error", "error": "invalid time_ms"}
+    strategy = data.get("strategy", "smart")
+    want_trace = str(data.get("trace", "")).lower() in ("1", "true", "yes")
+    await _limit(scope, "smart", n.bit_length(), time_ms)
+    return 200, await _offload(_smart_job, n, time_ms, strategy, want_trace, _profile_mode(scope, data),
+                               budget_s=time_ms / 1000.0)
+
+ROUTES = {
+    ("GET",  "/healthz"):          healthz,
+    ("POST", "/api/quick_factor"): api_quick,
+    ("POST", "/api/ecm"):          api_ecm,
+    ("POST", "/api/rho"):          api_rho,
+    ("POST", "/api/lotto_factor"): api_lotto_factor,
+    ("GET",  "/api/factor"):       api_factor_query,
+    ("POST", "/factor"):           factor_endpoint,
+}
+
+# ------------------ SSE job progress (no thread held per watcher) ------------------
+_aredis = None
+
+def _async_redis():
+    global _aredis
+    if _aredis is None:
+        from redis.asyncio import Redis
+        _aredis = Redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    return _aredis
+
+async def job_events(scope, receive, send):
+    import rho_events
+    job_id = scope["path"][len("/api/job/"):-len("/events")]
+    conn = _async_redis()
+    status = await conn.hget(f"rq:job:{job_id}", "status")
+    if status is None:
+        return await _respond(send, 404, _json_body({"error": "unknown job"}))
+    last_id = dict(scope["headers"]).get(b"last-event-id", b"0-0").decode("latin-1")
+    await send({"type": "http.response.start", "status": 200, "headers": [
+        (b"content-type", b"text/event-stream"), (b"cache-control", b"no-cache"), (b"x-accel-buffering", b"no")]})
+    async def pump():
+        frames = [rho_events.sse("status", {"job_id": job_id, "status": status.decode()})]
+        async for frame in rho_events.sse_stream_async(conn, job_id, last_id):
+            frames.append(frame)
+            await send({"type": "http.response.body", "body": "".join(frames).encode(), "more_body": True})
+            frames = []
+        await send({"type": "http.response.body", "body": b""})
+    async def gone():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+    # stop reading the job's stream as soon as the client goes away
+    tasks = [asyncio.ensure_future(pump()), asyncio.ensure_future(gone())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for t in tasks:
+            t.cancel()
+    if tasks[0] in done:
+        tasks[0].result()
+
+def _is_job_events(scope):
+    p = scope["path"]
+    return scope["method"] == "GET" and p.startswith("/api/job/") and p.endswith("/events") and p.count("/") == 4
+
+# ------------------ WSGI fallback (everything else → app.py) ------------------
+_flask = None
+
+def _flask_app():
+    global _flask
+    if _flask is None:
+        from app import app as flask_app
+        _flask = flask_app
+    return _flask
+
+def _wsgi_environ(scope, body):
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    env = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", ""),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope["query_string"].decode("latin-1"),
+        "SERVER_NAME": server[0], "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": "HTTP/" + scope.get("http_version", "1.1"),
+        "REMOTE_ADDR": client[0],
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0), "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body), "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True, "wsgi.multiprocess": True, "wsgi.run_once": False,
+    }
+    for k, v in scope["headers"]:
+        key, val = k.decode("latin-1").upper().replace("-", "_"), v.decode("latin-1")
+        if key == "CONTENT_LENGTH":
+            continue
+        if key != "CONTENT_TYPE":
+            key = "HTTP_" + key
+        env[key] = env[key] + "," + val if key in env else val
+    return env
+
+_END = object()
+
+async def _wsgi_fallback(scope, body, send):
+    loop = asyncio.get_running_loop()
+    started = {}
+    def start_response(status, headers, exc_info=None):
+        started["status"], started["headers"] = int(status.split(" ", 1)[0]), headers
+    result = await loop.run_in_executor(None, _flask_app(), _wsgi_environ(scope, body), start_response)
+    it = iter(result)
+    def _next():
+        try:
+            return next(it)
+        except StopIteration:
+            return _END
+    try:
+        # chunks are pulled one at a time so streaming responses stay streaming
+        chunk = await loop.run_in_executor(None, _next)
+        await send({"type": "http.response.start", "status": started["status"],
+                    "headers": [(k.lower().encode("latin-1"), v.encode("latin-1")) for k, v in started["headers"]]})
+        while chunk is not _END:
+            if chunk:
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            chunk = await loop.run_in_executor(None, _next)
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        if hasattr(result, "close"):
+            await loop.run_in_executor(None, result.close)
+
+# ------------------ ASGI entry ------------------
+def _observe_route(scope, status, t0):
+    metrics.observe("rsacrack_http_request_seconds", time.perf_counter() - t0,
+                    route=scope["path"], method=scope["method"], status=f"{status // 100}xx")
+
+async def _lifespan(receive, send):
+    while True:
+        msg = await receive()
+        if msg["type"] == "lifespan.startup":
+            loop = asyncio.get_running_loop()
+            pool = _get_pool()
+            # start every pool process now so the first requests don't pay for it
+            await asyncio.gather(*(loop.run_in_executor(pool, _ping) for _ in range(POOL_WORKERS)))
+            await send({"type": "lifespan.startup.complete"})
+        elif msg["type"] == "lifespan.shutdown":
+            if _pool is not None:
+                _pool.shutdown(wait=False, cancel_futures=True)
+            for pool in [p for p in _jobs if p is not _pool]:
+                _kill(pool)         # retired pools still running overdue jobs
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] != "http":
+        return
+    try:
+        body = await _read_body(receive)
+        if _is_job_events(scope):
+            return await job_events(scope, receive, send)
+        handler = ROUTES.get((scope["method"], scope["path"]))
+        if handler is None:
+            return await _wsgi_fallback(scope, body, send)
+        t0 = time.perf_counter()
+        try:
+            res = await handler(scope, body)
+        except _Reject as r:
+            _observe_route(scope, r.status, t0)
+            raise
+        status, payload = res[0], res[1]
+        _observe_route(scope, status, t0)
+        if isinstance(payload, bytes):
+            return await _respond(send, status, payload, res[2])
+        return await _respond(send, status, _json_body(payload))
+    except _Reject as r:
+        return await _respond(send, r.status, _json_body(r.payload), headers=r.headers)
+    except Exception as e:
+        return await _respond(send, 500, _json_body({"error": f"internal error: {e.__class__.__name__}"}))
@@ -0,0 +1,128 @@
+import json, time
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+
+from rsacrack import pollard_rho_brent
+from rsacrack.batch import screen, is_probable_prime
+import rate_limit, metrics
+
+batch_bp = Blueprint("batch_bp", __name__)
+
+MAX_ITEMS      = 10_000
+MAX_BYTES      = 4 << 20
+MAX_DIGITS     = 200
+ITEM_BUDGET_MS = (0, 10_000)     # per line; default 500
+BATCH_BUDGET_MS = (100, 120_000)  # per request (?budget_ms=); default 30000
+FLUSH_LINES    = 64              # screened results are written in groups
+
+def _clamp(v, lo_hi):
+    return max(lo_hi[0], min(lo_hi[1], v))
+
+def _parse_lines(raw: bytes):
+    """[(i, n, budget_ms) | (i, error)] for every non-empty NDJSON line."""
+    items = []
+    for i, line in enumerate(l for l in raw.splitlines() if l.strip()):
+        try:
+            obj = json.loads(line)
+            s = str(obj["n"] if isinstance(obj, dict) else obj).strip().lstrip("+")
+            if not s.isdigit():
+                raise ValueError("n must be a non-negative integer string")
+            if len(s) > MAX_DIGITS:
+                raise ValueError(f"n too large (max {MAX_DIGITS} digits)")
+            budget = int(obj.get("budget_ms", 500)) if isinstance(obj, dict) else 500
+            items.append((i, int(s), _clamp(budget, ITEM_BUDGET_MS)))
+        except Exception as e:
+            items.append((i, f"{e}" if isinstance(e, ValueError) else f"bad line: {e.__class__.__name__}"))
+    return items
+
+def _result(i, n, factors, complete, method, t0):
+    factors = sorted(factors)
+    ms = round((time.perf_counter() - t0) * 1000, 2)
+    metrics.record_factor(method, ms / 1000.0, n.bit_length(), complete)
+    if not complete:
+        cls = "other"   # unsplit composite left: same answer as /api/factor on timeout
+    elif len(factors) == 1:
+        cls = "prime"
+    elif len(factors) == 2:
+        cls = "semiprime"
+    else:
+        cls = "other"
+    return {"i": i, "n": str(n), "class": cls, "factors": [str(f) for f in factors],
+            "complete": complete, "method": method, "ms": ms}
+
+def _finish(n, composites, deadline):
+    """Split the remaining composite parts with ρ(Brent) until prime or out of time."""
+    primes, todo = [], list(composites)
+    while todo:
+        m = todo.pop()
+        left = deadline - time.perf_counter()
+        if is_probable_prime(m):
+            primes.append(m); continue
+        if left <= 0.005:
+            return primes, todo + [m]
+        d = pollard_rho_brent(m, time_ms=int(left * 1000))
+        if not 1 < d < m:
+            return primes, todo + [m]
+        todo += [d, m // d]
+    return primes, []
+
+def _run(items, batch_deadline):
+    t0 = time.perf_counter()
+    good = [it for it in items if len(it) == 3 and it[1] >= 2]
+    screened = screen([n for _, n, _ in good])
+    pending, buf = [], []
+    for it in items:
+        if len(it) == 2:
+            buf.append({"i": it[0], "error": it[1]})
+        elif it[1] < 2:
+            buf.append({"i": it[0], "n": str(it[1]), "class": "other", "factors": [], "complete": True,
+                        "method": "trivial", "ms": 0.0})
+    for (i, n, budget), (small, m, m_prime) in zip(good, screened):
+        fs = [p for p, e in small.items() for _ in range(e)]
+        if m == 1 or m_prime:
+            buf.append(_result(i, n, fs + ([m] if m > 1 else []), True, "trial" if small else "prime-test", t0))
+        elif len(fs) >= 2:
+            # >= 2 small primes and a composite cofactor: "other" whatever it splits into
+            buf.append(_result(i, n, fs + [m], False, "trial", t0))
+        else:
+            pending.append((i, n, budget, fs, m))
+        if len(buf) >= FLUSH_LINES:
+            yield buf; buf = []
+    if buf:
+        yield buf
+    # hard ones, cheapest first, each on its own budget within what the batch has left
+    for i, n, budget, fs, m in sorted(pending, key=lambda x: x[4]):
+        ts = time.perf_counter()
+        if ts >= batch_deadline:
+            yield [{"i": i, "n": str(n), "class": "other", "factors": [str(f) for f in sorted(fs + [m])],
+                    "complete": False, "method": "skipped", "error": "batch budget exhausted", "ms": 0.0}]
+            continue
+        primes, left = _finish(n, [m], min(batch_deadline, ts + budget / 1000.0))
+        yield [_result(i, n, fs + primes + left, not left, "trial+rho" if fs else "rho", ts)]
+
+@batch_bp.post("/api/factor/batch")
+def factor_batch():
+    """
+    NDJSON in ({"n": "...", "budget_ms": 500} per line), NDJSON out, one line per
+    input as soon as it is done; "i" is the input line index.  Results are
+    produced only as fast as the client reads them.
+    """
+    raw = request.stream.read(MAX_BYTES + 1)
+    if len(raw) > MAX_BYTES:
+        return jsonify({"error": f"batch too large (max {MAX_BYTES} bytes)"}), 413
+    items = _parse_lines(raw)
+    if len(items) > MAX_ITEMS:
+        return jsonify({"error": f"too many lines (max {MAX_ITEMS})"}), 413
+    try:
+        total_ms = _clamp(int(request.args.get("budget_ms", 30_000)), BATCH_BUDGET_MS)
+    except ValueError:
+        return jsonify({"error": "budget_ms must be an integer"}), 400
+    good = [it for it in items if len(it) == 3]
+    limited = rate_limit.limit("batch", max((it[1].bit_length() for it in good), default=0),
+                               min(total_ms, sum(it[2] for it in good) + len(good)))
+    if limited: return limited
+    deadline = time.perf_counter() + total_ms / 1000.0
+    def gen():
+        for rows in _run(items, deadline):
+            yield "".join(json.dumps(r, separators=(",", ":")) + "\n" for r in rows)
+    return Response(stream_with_context(gen()), mimetype="application/x-ndjson",
+                    headers={"X-Accel-Buffering": "no", "Cache-Control": "no-cache"})
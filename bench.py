@@ -0,0 +1,489 @@
+#!/usr/bin/env python3
+# bench.py — offline factoring benchmark, engines called in-process
+#
+# A seeded corpus (same seed -> same numbers on every machine) of numbers per
+# bit size and shape:
+#   balanced    p*q, both ~bits/2
+#   lopsided    p*q, p ~bits/4
+#   close       p*q, q the next prime after p (Fermat territory)
+#   smooth      p*q, p-1 built from primes < 2^16 (p-1 territory)
+#   prime       a prime (success = no factor claimed)
+#   prime_power p^k, k = 2..3
+# Every engine gets every number with the same budget; the report is
+# p50/p90/p99 latency and success rate per engine per (bits, shape) bucket.
+# Calls run in one forked child (no HTTP, no server) so a call that ignores
+# its budget is cut off at --cap-s and counted as hung, at the cap time.
+# --save writes the report as a baseline, --baseline compares against one
+# and --check exits 1 on a regression (slower p50/p90 or lower success).
+#
+#   python bench.py --bits 32,48,64 --count 20 --save bench_baseline.json
+#   python bench.py --baseline bench_baseline.json --check
+#   python bench.py --engines pipeline,rho_worker --shapes balanced,close
+#   python bench.py --corpus-file corpus.rsc --count 50   # prebuilt numbers (corpus.py)
+#
+# --matrix also times the full factorization (cofactors split again by the
+# same engine, out of the same budget) and prints the fastest engine per
+# (bits, shape) to the first factor and to the full factorization; --routes
+# writes the per-size winner as JSON for a dispatcher (bench.route_for).
+#   python bench.py --matrix --bits 32,48,64,80 --routes engine_routes.json
+
+import os, sys, json, time, math, random, argparse, platform
+
+os.environ.setdefault("TRACE_LOG", "0")  # span logging would dominate the output
+ROOT = os.path.abspath(os.path.dirname(__file__))
+sys.path[:0] = [ROOT, os.path.join(ROOT, "vendor")]
+
+SHAPES  = ("balanced", "lopsided", "close", "smooth", "prime", "prime_power")
+BITS    = (32, 48, 64, 80)
+COUNT   = 10
+BUDGET_MS = 2000
+SEED    = 1
+
+# ------------------ corpus ------------------
+_MR_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+
+def is_prime(n: int) -> bool:
+    """Miller-Rabin on fixed bases: exact below 3.3e24, and deterministic, so the corpus is too."""
+    if n < 2:
+        return False
+    for p in _MR_BASES:
+        if n % p == 0:
+            return n == p
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2; s += 1
+    for a in _MR_BASES:
+        x = pow(a, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+def next_prime(n: int) -> int:
+    if n < 2:
+        return 2
+    n += 1 if n % 2 == 0 else 2
+    while not is_prime(n):
+        n += 2
+    return n
+
+def rand_prime(rng: random.Random, bits: int) -> int:
+    bits = max(2, bits)
+    while True:
+        c = rng.getrandbits(bits) | (1 << (bits - 1)) | 1
+        if is_prime(c):
+            return c
+
+_SMALL_PRIMES = []
+
+def _smooth_prime(rng: random.Random, bits: int) -> int:
+    """Prime p of ~bits bits with p-1 a product of primes < 2^16."""
+    if not _SMALL_PRIMES:
+        _SMALL_PRIMES.extend(p for p in range(3, 1 << 16, 2) if is_prime(p))
+    small = _SMALL_PRIMES
+    while True:
+        m = 2
+        while m.bit_length() < bits - 1:
+            m *= rng.choice(small)
+        if is_prime(m + 1):
+            return m + 1
+
+def make_case(rng: random.Random, bits: int, shape: str):
+    """(n, p, q) with n = p*q: p the smallest prime factor (q = 1 for a prime, p^(k-1) for p^k)."""
+    if shape == "prime":
+        n = rand_prime(rng, bits)
+        return n, n, 1
+    if shape == "prime_power":
+        k = rng.choice((2, 3))
+        p = rand_prime(rng, max(2, bits // k))
+        return p ** k, p, p ** (k - 1)
+    if shape == "balanced":
+        p, q = rand_prime(rng, bits // 2), rand_prime(rng, bits - bits // 2)
+    elif shape == "lopsided":
+        p, q = rand_prime(rng, bits // 4), rand_prime(rng, bits - bits // 4)
+    elif shape == "close":
+        p = rand_prime(rng, bits // 2)
+        q = next_prime(p + rng.randrange(2, 1 << max(4, bits // 8)))
+    elif shape == "smooth":
+        p = _smooth_prime(rng, bits // 2)
+        q = rand_prime(rng, bits - p.bit_length())
+    else:
+        raise ValueError(f"unknown shape {shape!r}")
+    return p * q, min(p, q), max(p, q)
+
+def make_number(rng: random.Random, bits: int, shape: str) -> int:
+    return make_case(rng, bits, shape)[0]
+
+def corpus(seed: int, bits_list, shapes, count: int):
+    """{(bits, shape): [n, ...]}; each bucket has its own stream so adding buckets changes nothing else."""
+    out = {}
+    for bits in bits_list:
+        for shape in shapes:
+            rng = random.Random(f"{seed}:{bits}:{shape}")
+            out[(bits, shape)] = [make_number(rng, bits, shape) for _ in range(count)]
+    return out
+
+# ------------------ engines ------------------
+# name -> (max bits or None, fn(n, budget_ms) -> nontrivial divisor or None)
+def _pipeline(n, budget_ms):
+    from rsacrack import factor_one
+    r = factor_one(n, time_ms=budget_ms)
+    return r.p if r and r.q != 1 else None
+
+def _smart(n, budget_ms):
+    from rsacrack.pipeline_smart import factor_smart
+    r = factor_smart(n, max_ms=budget_ms)
+    return r["p"] if r else None
+
+def _quick(n, budget_ms):
+    from factor_core import quick_factor
+    d, _ = quick_factor(n, budget_s=budget_ms / 1000.0)
+    return d
+
+def _fast(n, budget_ms):
+    from fast_factor import factor_semiprime
+    r = factor_semiprime(n, max_ms=budget_ms)
+    return r[0] if r else None
+
+def _lotto(n, budget_ms):
+    from lotto_factor import factor_lotto_64
+    r = factor_lotto_64(n, budget_ms=budget_ms, seed=n)
+    return r[0] if r and r[1] != 1 else None
+
+def _rho_worker(n, budget_ms):
+    # RQ job body without Redis; its budget is iterations, ~2000 per ms
+    import rho_worker
+    from rho_events import _NullProgress
+    r = rho_worker._pollard_rho(n, budget_ms * 2000, _NullProgress())
+    return r.get("factor") if r.get("factor") not in (None, 1, n) else None
+
+def _tangent(n, budget_ms):
+    from tangent_prime_test import factor
+    fs = factor(n, max_seconds=budget_ms / 1000.0)  # prime factors found before the deadline
+    d = min(fs) if fs else None
+    return d if d and 1 < d < n and n % d == 0 else None
+
+ENGINES = {
+    "pipeline":   (None, _pipeline),
+    "smart":      (None, _smart),
+    "quick":      (None, _quick),
+    "fast":       (None, _fast),
+    "lotto":      (64,   _lotto),
+    "rho_worker": (None, _rho_worker),
+    "tangent":    (None, _tangent),
+}
+
+# ------------------ run ------------------
+def percentile(sorted_vals, q):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_vals:
+        return None
+    k = max(0, math.ceil(q / 100.0 * len(sorted_vals)) - 1)
+    return sorted_vals[k]
+
+def _ok(n, shape, d):
+    if shape == "prime":
+        return not d
+    return bool(d) and 1 < int(d) < n and n % int(d) == 0
+
+def _split_all(fn, pieces, budget_ms, t0):
+    """Split composite pieces with fn until all are prime; False once a split fails or time is up."""
+    while pieces:
+        c = pieces.pop()
+        if is_prime(c):
+            continue
+        left = budget_ms - (time.perf_counter() - t0) * 1000.0
+        d = fn(c, left) if left > 0 else None
+        if not d or not 1 < int(d) < c or c % int(d):
+            return False
+        pieces += [int(d), c // int(d)]
+    return True
+
+def _timed(name, n, budget_ms, complete=False):
+    """Runs in the bench child: (divisor, ms to first factor, ms to full factorization or None, error).
+    complete: keep splitting the cofactors with the same engine, out of the same budget."""
+    fn = ENGINES[name][1]
+    t0 = time.perf_counter()
+    full = None
+    try:
+        d, err = fn(n, budget_ms), None
+        ms = (time.perf_counter() - t0) * 1000.0
+        if complete:
+            ok = (is_prime(n) if not d or not 1 < int(d) < n or n % int(d)
+                  else _split_all(fn, [int(d), n // int(d)], budget_ms, t0))
+            full = (time.perf_counter() - t0) * 1000.0 if ok else None
+    except Exception as e:
+        d, err = None, f"{type(e).__name__}: {e}"
+        ms = (time.perf_counter() - t0) * 1000.0
+    return d, ms, full, err
+
+def _serve(conn):
+    while True:
+        job = conn.recv()
+        if job is None:
+            return
+        conn.send(_timed(*job))
+
+class _Child:
+    """One forked process running the engine calls, so a call that ignores its
+    budget (or never returns) is cut off after cap_s instead of hanging the run.
+    Times are measured inside the child; the pipe is not part of them.  Not a
+    Pool worker: engines such as "smart" start process pools of their own."""
+
+    def __init__(self, cap_s):
+        import multiprocessing as mp
+        self.ctx = mp.get_context("fork")
+        self.cap_s = cap_s
+        self.proc = self.conn = None
+
+    def call(self, name, n, budget_ms, complete=False):
+        if self.proc is None:
+            self.conn, theirs = self.ctx.Pipe()
+            self.proc = self.ctx.Process(target=_serve, args=(theirs,))
+            self.proc.start()
+        self.conn.send((name, n, budget_ms, complete))
+        if self.conn.poll(self.cap_s):
+            return self.conn.recv()
+        self.close(kill=True)
+        return None, self.cap_s * 1000.0, None, "hung"
+
+    def close(self, kill=False):
+        if self.proc is None:
+            return
+        if kill:
+            self.proc.kill()
+        else:
+            self.conn.send(None)
+        self.proc.join()
+        self.proc = self.conn = None
+
+def run_bucket(child, name, numbers, shape, budget_ms, complete=False):
+    times, full, ok, errors, hung = [], [], 0, 0, 0
+    for n in numbers:
+        d, ms, full_ms, err = child.call(name, n, budget_ms, complete)
+        hung += err == "hung"
+        errors += err is not None and err != "hung"
+        times.append(ms)
+        ok += err is None and _ok(n, shape, d)  # a hung/crashed call did not "prove" a prime
+        if full_ms is not None:
+            full.append(full_ms)
+    times.sort()
+    r = {"n": len(numbers), "success": round(ok / len(numbers), 4) if numbers else None,
+         "errors": errors, "hung": hung,
+         "p50_ms": round(percentile(times, 50), 3), "p90_ms": round(percentile(times, 90), 3),
+         "p99_ms": round(percentile(times, 99), 3)}
+    if complete:
+        # time to the full factorization, over the numbers that got one
+        full.sort()
+        r["complete"] = round(len(full) / len(numbers), 4) if numbers else None
+        r["p50_full_ms"] = round(percentile(full, 50), 3) if full else None
+        r["p90_full_ms"] = round(percentile(full, 90), 3) if full else None
+    return r
+
+def run(engines, bits_list, shapes, count, budget_ms, seed, progress=None, cap_s=None, data=None, complete=False):
+    """cap_s: wall time after which one call counts as hung (default 4x budget + 2 s);
+    data: {(bits, shape): [n, ...]} to use instead of generating the corpus;
+    complete: also time the full factorization (see _timed)."""
+    if data is None:
+        data = corpus(seed, bits_list, shapes, count)
+    cap_s = cap_s or budget_ms / 1000.0 * 4 + 2
+    results, unavailable = {}, {}
+    child = _Child(cap_s)
+    try:
+        for name in engines:
+            max_bits, _ = ENGINES[name]
+            _, _, _, err = child.call(name, 15, budget_ms)  # imports and one-time setup outside the timings
+            if err is not None:  # missing binary / optional dependency on this host
+                unavailable[name] = err
+                continue
+            for (bits, shape), numbers in data.items():
+                if max_bits is not None and bits > max_bits:
+                    continue
+                r = run_bucket(child, name, numbers, shape, budget_ms, complete)
+                results.setdefault(name, {})[f"{bits}/{shape}"] = r
+                if progress:
+                    progress(name, bits, shape, r)
+    finally:
+        child.close()
+    return {"meta": {"seed": seed, "count": count, "budget_ms": budget_ms, "cap_s": cap_s, "complete": complete,
+                     "bits": list(bits_list), "shapes": list(shapes), "python": platform.python_version(),
+                     "machine": platform.machine(), "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())},
+            "results": results, "unavailable": unavailable}
+
+# ------------------ baseline ------------------
+def compare(report, baseline, tolerance=0.25, min_ms=5.0, success_drop=0.05):
+    """Regressions of report against baseline: [(engine, bucket, metric, old, new)]."""
+    out = []
+    if baseline.get("meta", {}).get("seed") != report["meta"]["seed"]:
+        out.append(("*", "*", "seed", baseline.get("meta", {}).get("seed"), report["meta"]["seed"]))
+    for eng, buckets in report["results"].items():
+        for bucket, r in buckets.items():
+            b = baseline.get("results", {}).get(eng, {}).get(bucket)
+            if not b:
+                continue
+            for m in ("p50_ms", "p90_ms"):
+                if r[m] > b[m] * (1 + tolerance) and r[m] - b[m] > min_ms:
+                    out.append((eng, bucket, m, b[m], r[m]))
+            if r["success"] is not None and b["success"] is not None and r["success"] < b["success"] - success_drop:
+                out.append((eng, bucket, "success", b["success"], r["success"]))
+    return out
+
+def _delta(r, b, m):
+    if not b or b.get(m) in (None, 0):
+        return ""
+    return f" ({(r[m] / b[m] - 1) * 100:+.0f}%)"
+
+def print_report(report, baseline=None):
+    print(f"seed={report['meta']['seed']} count={report['meta']['count']} budget={report['meta']['budget_ms']}ms")
+    print(f"{'engine':11s} {'bucket':18s} {'ok':>6s} {'p50 ms':>16s} {'p90 ms':>16s} {'p99 ms':>10s}")
+    for eng, buckets in report["results"].items():
+        for bucket, r in buckets.items():
+            b = (baseline or {}).get("results", {}).get(eng, {}).get(bucket)
+            print(f"{eng:11s} {bucket:18s} {r['success'] * 100:5.0f}% "
+                  f"{r['p50_ms']:9.1f}{_delta(r, b, 'p50_ms'):>7s} {r['p90_ms']:9.1f}{_delta(r, b, 'p90_ms'):>7s} "
+                  f"{r['p99_ms']:10.1f}" + (f"  errors={r['errors']}" if r["errors"] else "")
+                  + (f"  hung={r['hung']}" if r.get("hung") else ""))
+    for eng, why in report.get("unavailable", {}).items():
+        print(f"{eng:11s} skipped: {why}")
+
+# ------------------ engine matrix ------------------
+def winners(report, full=False):
+    """{bucket: (engine, result)}: highest success rate, then lowest p50; full ranks on the full factorization."""
+    rate, ms = ("complete", "p50_full_ms") if full else ("success", "p50_ms")
+    best = {}
+    for eng, buckets in report["results"].items():
+        for bucket, r in buckets.items():
+            if r.get(rate) is None:
+                continue
+            key = (r[rate], -(r[ms] if r[ms] is not None else math.inf))
+            if bucket not in best or key > best[bucket][0]:
+                best[bucket] = (key, eng, r)
+    return {b: (e, r) for b, (_, e, r) in best.items()}
+
+def print_matrix(report):
+    bits, shapes = report["meta"]["bits"], report["meta"]["shapes"]
+    for full, title in ((False, "first factor"), (True, "full factorization")):
+        rate, ms = ("complete", "p50_full_ms") if full else ("success", "p50_ms")
+        w = winners(report, full)
+        print(f"\nfastest to the {title}: engine p50 ms (success)")
+        print(f"{'bits':>5s} " + " ".join(f"{s:>26s}" for s in shapes))
+        for b in bits:
+            cells = []
+            for s in shapes:
+                eng, r = w.get(f"{b}/{s}", (None, None))
+                cells.append(f"{eng} {r[ms]:.1f} ({r[rate] * 100:.0f}%)" if eng and r[rate] else "-")
+            print(f"{b:5d} " + " ".join(f"{c:>26s}" for c in cells))
+
+def routes(report):
+    """Dispatcher table from a --matrix report: per bit size, the engine with the best mean
+    full-factorization rate over all shapes, then the lowest mean p50 to it (a miss costs the budget)."""
+    budget = report["meta"]["budget_ms"]
+    by_bits = {}
+    for eng, buckets in report["results"].items():
+        for bucket, r in buckets.items():
+            by_bits.setdefault(int(bucket.split("/")[0]), {}).setdefault(eng, []).append(r)
+    table = []
+    for bits in sorted(by_bits):
+        engines = by_bits[bits]
+        nshapes = max(len(rs) for rs in engines.values())
+        scored = sorted(
+            (-sum(r["complete"] for r in rs) / len(rs),
+             sum(budget if r["p50_full_ms"] is None else r["p50_full_ms"] for r in rs) / len(rs), eng)
+            for eng, rs in engines.items() if len(rs) == nshapes)  # engines capped below this size drop out
+        if not scored:
+            continue
+        rate, ms, eng = scored[0]
+        table.append({"max_bits": bits, "engine": eng, "complete": round(-rate, 4), "mean_p50_ms": round(ms, 3),
+                      "runner_up": scored[1][2] if len(scored) > 1 else None})
+    w1, wf = winners(report), winners(report, full=True)
+    return {"version": 1, "meta": report["meta"], "routes": table,
+            "by_bucket": {b: {"first": w1[b][0], "full": wf.get(b, (None,))[0]} for b in sorted(w1)}}
+
+def route_for(table: dict, bits: int):
+    """Engine a routes() table picks for an n of `bits` bits (the largest class beyond the table)."""
+    rows = table.get("routes") or []
+    for r in rows:
+        if bits <= r["max_bits"]:
+            return r["engine"]
+    return rows[-1]["engine"] if rows else None
+
+def _csv(v, cast=str):
+    return [cast(x) for x in v.split(",") if x.strip()]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Offline factoring benchmark (no network, engines in-process).")
+    ap.add_argument("--engines", type=_csv, default=list(ENGINES), help=f"comma list of: {', '.join(ENGINES)}")
+    ap.add_argument("--bits", type=lambda v: _csv(v, int), default=list(BITS))
+    ap.add_argument("--shapes", type=_csv, default=list(SHAPES))
+    ap.add_argument("--count", type=int, default=COUNT, help="numbers per bucket")
+    ap.add_argument("--budget-ms", type=int, default=BUDGET_MS, help="per-number budget given to each engine")
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--cap-s", type=float, help="a call running longer counts as hung (default 4x budget + 2 s)")
+    ap.add_argument("--save", metavar="PATH", help="write the report as JSON (a new baseline)")
+    ap.add_argument("--baseline", metavar="PATH", help="compare against a saved report")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed p50/p90 slowdown (fraction)")
+    ap.add_argument("--check", action="store_true", help="exit 1 on any regression against --baseline")
+    ap.add_argument("--corpus", action="store_true", help="print the corpus and exit")
+    ap.add_argument("--corpus-file", metavar="PATH", help="numbers from a corpus.py file (its seed, "
+                    "--count numbers per bucket) instead of generating them")
+    ap.add_argument("--matrix", action="store_true",
+                    help="also time full factorizations and print the fastest engine per bits x shape")
+    ap.add_argument("--routes", metavar="PATH", help="write the per-size engine table for the dispatcher (implies --matrix)")
+    ap.add_argument("-q", "--quiet", action="store_true")
+    args = ap.parse_args(argv)
+    args.matrix = args.matrix or bool(args.routes)
+
+    bad = [e for e in args.engines if e not in ENGINES] + [s for s in args.shapes if s not in SHAPES]
+    if bad:
+        ap.error(f"unknown engine/shape: {', '.join(bad)}")
+    data = None
+    if args.corpus_file:
+        from corpus import Corpus
+        with Corpus(args.corpus_file) as cf:
+            data = {k: v[:args.count] for k, v in cf.buckets().items() if k[0] in args.bits and k[1] in args.shapes}
+            args.seed = cf.seed
+        args.count = max((len(v) for v in data.values()), default=0)
+    if args.corpus:
+        for (bits, shape), ns in (data or corpus(args.seed, args.bits, args.shapes, args.count)).items():
+            print(bits, shape, " ".join(map(str, ns)))
+        return 0
+
+    progress = None if args.quiet else \
+        (lambda e, b, s, r: print(f"  {e} {b}/{s}: p50 {r['p50_ms']:.1f} ms, ok {r['success'] * 100:.0f}%",
+                                  file=sys.stderr, flush=True))
+    report = run(args.engines, args.bits, args.shapes, args.count, args.budget_ms, args.seed, progress, args.cap_s,
+                 data, complete=args.matrix)
+    if args.corpus_file:
+        report["meta"]["corpus_file"] = os.path.basename(args.corpus_file)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+    print_report(report, baseline)
+    if args.matrix:
+        print_matrix(report)
+    if args.routes:
+        table = routes(report)
+        with open(args.routes, "w") as fh:
+            json.dump(table, fh, indent=1)
+        print("\nroutes: " + ", ".join(f"<={r['max_bits']} bits: {r['engine']}" for r in table["routes"]))
+    if args.save:
+        with open(args.save, "w") as fh:
+            json.dump(report, fh, indent=1, sort_keys=True)
+    if baseline is not None:
+        regressions = compare(report, baseline, tolerance=args.tolerance)
+        for eng, bucket, m, old, new in regressions:
+            print(f"REGRESSION {eng} {bucket} {m}: {old} -> {new}")
+        if not regressions:
+            print("no regressions against baseline")
+        if args.check and regressions:
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
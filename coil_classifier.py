@@ -4,32 +4,54 @@ import json
 import hashlib
 import math
 import argparse
-import sympy as sp
-from typing import Tuple, Dict, Any
+from typing import Tuple, Dict, Any, Optional
 
 # ---------- Classification ----------
 
-def coil_classify(n: int) -> str:
+def factorize(n: int) -> Dict[int, int]:
+    """{prime: exponent} for n >= 2 (rsacrack.classify: primorial trial division, Brent's rho)."""
+    from rsacrack.classify import factorize as _factorize
+    return _factorize(n)
+
+def classify(n: int, factors: bool = True) -> Tuple[str, Optional[Dict[int, int]]]:
+    """
+    (class as coil_classify, factorization or None when it is not known).
+    The class comes from rsacrack.classify, which proves most semiprimes by
+    trial division to the cube root without splitting them; a semiprime is
+    factored when factors is set (the footprint needs p, q), any other n
+    comes with the primes the proof found anyway, if they are all of them.
+    """
+    if n <= 1:
+        return "not valid (≤1)", None
+    from rsacrack.classify import classify as _classify, factorize as _factorize
+    c = _classify(n, time_ms=None)      # no time limit: the class is always settled
+    if not factors:
+        return c.kind, None
+    if c.kind == "semiprime":
+        return c.kind, c.primes or _factorize(n, c)
+    return c.kind, c.primes
+
+def coil_classify(n: int, factors: Optional[Dict[int, int]] = None) -> str:
     """
     Returns:
       - "prime"     : n is prime
       - "semiprime" : n = p*q (counting multiplicity = 2)
       - "other"     : n has >=3 prime factors or n<=1 invalid
+    factors: the complete factorization of n when the caller already has it
+    (None or {} when not known).
     """
-    if n <= 1:
-        return "not valid (≤1)"
-    if sp.isprime(n):
-        return "prime"
-    factors = sp.factorint(n)   # {prime: exponent}
+    if not factors or n <= 1:
+        return classify(n, factors=False)[0]
     num_primes = sum(factors.values())
-    return "semiprime" if num_primes == 2 else "other"
+    return "prime" if num_primes == 1 else "semiprime" if num_primes == 2 else "other"
 
-def semiprime_factors(n: int) -> Tuple[int, int]:
+def semiprime_factors(n: int, factors: Dict[int, int] = None) -> Tuple[int, int]:
     """
     Precondition: n is semiprime.
     Returns the two prime factors sorted p <= q.
+    factors: factorize(n) when the caller already has it.
     """
-    f = sp.factorint(n)
+    f = factorize(n) if factors is None else factors
     # Expand with multiplicity, then pick two
     primes = []
     for p, e in f.items():
@@ -41,15 +63,28 @@ def semiprime_factors(n: int) -> Tuple[int, int]:
 
 # ---------- Coil geometry ----------
 
+def _turn(L: float) -> Tuple[int, int]:
+    """L as an exact integer ratio a/b (every float is one)."""
+    return float(L).as_integer_ratio()
+
+def coil_angle(n: int, L: float) -> float:
+    """
+    theta(n) = 2*pi*n / L, reduced to one turn in integers first: with
+    L = a/b, theta = 2*pi * ((n*b) mod a) / a, so a large n does not lose
+    its low digits to float rounding before the cos/sin.
+    """
+    a, b = _turn(L)
+    return (2.0 * math.pi / a) * ((n * b) % a)
+
 def coil_point(n: int, r0: float, alpha: float, beta: float, L: float) -> Tuple[float, float, float]:
     """
     Map integer n to a conical helix point (x,y,z).
     r(n) = r0 + alpha*n
-    theta(n) = 2*pi*n / L
+    theta(n) = 2*pi*n / L   (see coil_angle)
     z(n) = beta*n
     """
     r = r0 + alpha * n
-    theta = (2.0 * math.pi / L) * n
+    theta = coil_angle(n, L)
     x = r * math.cos(theta)
     y = r * math.sin(theta)
     z = beta * n
@@ -102,7 +137,8 @@ def invariant_signature(n: int, fp: dict) -> str:
     }
     return _sha256_hex(payload)
 
-def footprint_for_semiprime(n: int, r0: float, alpha: float, beta: float, L: float) -> Dict[str, Any]:
+def footprint_for_semiprime(n: int, r0: float, alpha: float, beta: float, L: float,
+                            factors: Dict[int, int] = None) -> Dict[str, Any]:
     """
     For n = p*q (p<=q), returns:
       - primes: (p,q)
@@ -111,8 +147,9 @@ def footprint_for_semiprime(n: int, r0: float, alpha: float, beta: float, L: flo
       - normalized: distances normalized to sum=1 (fingerprint shape only)
       - balance: |p-q| / sqrt(n)  (0 = perfectly balanced; larger = more lopsided)
       - bit_gap: |bitlen(p) - bitlen(q)|
+    factors: factorize(n) when the caller already has it (n is not factored again).
     """
-    p, q = semiprime_factors(n)
+    p, q = semiprime_factors(n, factors)
 
     d1 = coil_distance(n, q, r0, alpha, beta, L)
     d2 = coil_distance(q, p, r0, alpha, beta, L)
@@ -139,35 +176,274 @@ def footprint_for_semiprime(n: int, r0: float, alpha: float, beta: float, L: flo
         "bit_gap": bit_gap,
     }
 
+# ---------- Batch footprints (NumPy) ----------
+# Same arithmetic as the scalar functions above, in the same order, over
+# arrays: results match footprint_for_semiprime element for element.  The
+# integer parts (angle residues, n-q / q-p / p-1, bit lengths) stay exact:
+# int64 when every n fits, Python ints otherwise.  NumPy is imported on first
+# use so importing this module stays cheap.
+
+_INT64_SAFE = 1 << 62
+
+def _np():
+    import numpy as np
+    return np
+
+def _as_ints(xs):
+    """Python int list of any int sequence (lists, ranges, NumPy integer arrays)."""
+    return [int(x) for x in xs]
+
+def _int_path(ns, a, b):
+    """int64 arrays can hold every product we form: n*b and the deltas."""
+    return bool(ns) and b == 1 and max(ns) < _INT64_SAFE and min(ns) >= 0 and abs(a) < _INT64_SAFE
+
+def coil_points(ns, r0: float, alpha: float, beta: float, L: float):
+    """Vector coil_point: a sequence of ints (any size) -> x, y, z float64 arrays."""
+    np = _np()
+    ns = _as_ints(ns)
+    a, b = _turn(L)
+    if _int_path(ns, a, b):
+        ni = np.asarray(ns, dtype=np.int64)
+        nf, res = ni.astype(np.float64), (ni % a).astype(np.float64)
+    else:
+        nf = np.array([float(n) for n in ns], dtype=np.float64)
+        res = np.array([float((n * b) % a) for n in ns], dtype=np.float64)
+    r = r0 + alpha * nf
+    theta = (2.0 * math.pi / a) * res
+    return r * np.cos(theta), r * np.sin(theta), beta * nf
+
+def coil_distances(n1, n2, r0: float, alpha: float, beta: float, L: float):
+    """Vector coil_distance over two equal-length int sequences."""
+    np = _np()
+    x1, y1, z1 = coil_points(n1, r0, alpha, beta, L)
+    x2, y2, z2 = coil_points(n2, r0, alpha, beta, L)
+    dx, dy, dz = x1 - x2, y1 - y2, z1 - z2
+    return np.sqrt(dx*dx + dy*dy + dz*dz)
+
+def footprints(ns, ps, qs, r0: float, alpha: float, beta: float, L: float) -> Dict[str, Any]:
+    """
+    footprint_for_semiprime for many n = p*q with known factors, as columns:
+      p, q (Python int lists, p <= q), d1, d2, d3, s1, s2, s3, f1, f2, f3,
+      balance (float64 arrays) and bit_gap (int64 array).
+    """
+    np = _np()
+    ns, ps, qs = _as_ints(ns), _as_ints(ps), _as_ints(qs)
+    if not len(ns) == len(ps) == len(qs):
+        raise ValueError("n, p and q must have the same length")
+    ps, qs = [min(p, q) for p, q in zip(ps, qs)], [max(p, q) for p, q in zip(ps, qs)]
+    bad = next((i for i, (n, p, q) in enumerate(zip(ns, ps, qs)) if p < 2 or p * q != n), None)
+    if bad is not None:
+        raise ValueError(f"row {bad}: {ns[bad]} != {ps[bad]} * {qs[bad]}")
+
+    d1 = coil_distances(ns, qs, r0, alpha, beta, L)
+    d2 = coil_distances(qs, ps, r0, alpha, beta, L)
+    d3 = coil_distances(ps, [1] * len(ps), r0, alpha, beta, L)
+
+    a, b = _turn(L)
+    if _int_path(ns, a, b):
+        ni, pi, qi = (np.asarray(v, dtype=np.int64) for v in (ns, ps, qs))
+        dnq, dqp, dp1 = ((x - y).astype(np.float64) for x, y in ((ni, qi), (qi, pi), (pi, 1)))
+    else:
+        dnq = np.array([float(n - q) for n, q in zip(ns, qs)], dtype=np.float64)
+        dqp = np.array([float(q - p) for p, q in zip(ps, qs)], dtype=np.float64)
+        dp1 = np.array([float(p - 1) for p in ps], dtype=np.float64)
+    nf = np.array([float(n) for n in ns], dtype=np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        s1 = d1 / dnq
+        s2 = np.where(dqp == 0, 0.0, d2 / dqp)
+        s3 = d3 / dp1
+        total = d1 + d2 + d3
+        pos = total > 0
+        f1, f2, f3 = (np.where(pos, d / total, 0.0) for d in (d1, d2, d3))
+
+    return {
+        "p": ps, "q": qs,
+        "d1": d1, "d2": d2, "d3": d3,
+        "s1": s1, "s2": s2, "s3": s3,
+        "f1": f1, "f2": f2, "f3": f3,
+        "balance": dqp / np.sqrt(nf),
+        "bit_gap": np.array([abs(p.bit_length() - q.bit_length()) for p, q in zip(ps, qs)], dtype=np.int64),
+    }
+
+def footprint_row(cols: Dict[str, Any], i: int) -> Dict[str, Any]:
+    """Row i of footprints() in the footprint_for_semiprime layout."""
+    g = lambda k: float(cols[k][i])
+    return {
+        "primes": (cols["p"][i], cols["q"][i]),
+        "distances": {"d1_n_to_q": g("d1"), "d2_q_to_p": g("d2"), "d3_p_to_1": g("d3")},
+        "per_step_slopes": {"s1": g("s1"), "s2": g("s2"), "s3": g("s3")},
+        "normalized": {"f1": g("f1"), "f2": g("f2"), "f3": g("f3")},
+        "balance": g("balance"),
+        "bit_gap": int(cols["bit_gap"][i]),
+    }
+
+def _jf(x: float) -> str:
+    """A float as json.dumps writes it."""
+    return repr(x) if math.isfinite(x) else json.dumps(x)
+
+def signatures(ns, cols: Dict[str, Any], r0: float = None, alpha: float = None, beta: float = None,
+               L: float = None, kind: str = "invariant"):
+    """
+    invariant_signature (kind="invariant") or geometry_signature
+    (kind="geometry", needs r0/alpha/beta/L) for every row of footprints().
+    The JSON payloads are formatted directly; the bytes, and so the hashes,
+    are the ones the scalar functions produce.
+    """
+    sha = hashlib.sha256
+    ps, qs = cols["p"], cols["q"]
+    out = []
+    if kind == "invariant":
+        bal, gap = cols["balance"].tolist(), cols["bit_gap"].tolist()
+        for n, p, q, ba, bg in zip(ns, ps, qs, bal, gap):
+            lr = math.log(q) - math.log(p)
+            s = (f'{{"balance":{_jf(ba)},"bit_gap":{bg},"log_ratio":{_jf(lr)},'
+                 f'"n":{int(n)},"primes":[{p},{q}]}}')
+            out.append(sha(s.encode()).hexdigest())
+    elif kind == "geometry":
+        geom = json.dumps({"r0": r0, "alpha": alpha, "beta": beta, "L": L}, sort_keys=True, separators=(",", ":"))
+        f1, f2, f3 = (cols[k].tolist() for k in ("f1", "f2", "f3"))
+        for n, p, q, a, b, c in zip(ns, ps, qs, f1, f2, f3):
+            s = f'{{"geom":{geom},"n":{int(n)},"norm":[{_jf(a)},{_jf(b)},{_jf(c)}],"primes":[{p},{q}]}}'
+            out.append(sha(s.encode()).hexdigest())
+    else:
+        raise ValueError(f"unknown signature kind {kind!r}")
+    return out
+
 # ---------- CLI ----------
 
+BATCH_CHUNK  = 100_000
+STREAM_CHUNK = 4096        # lines per pool task with --jobs
+
+def _batch_rows(path):
+    """
+    (n, p, q, error) per input line "n p q" or "n" (p = q = None: classify and
+    factor n).  A line that does not parse gives its first field as n and the
+    reason as error.
+    """
+    fh = sys.stdin if path == "-" else open(path)
+    try:
+        for line in fh:
+            parts = line.replace(",", " ").split()
+            if not parts or parts[0].startswith("#"):
+                continue
+            if len(parts) == 2:
+                yield parts[0], None, None, 'expected "n p q" or "n"'
+                continue
+            try:
+                n, p, q = (int(x) for x in parts[:3]) if len(parts) >= 3 else (int(parts[0]), None, None)
+            except ValueError as e:
+                yield parts[0], None, None, str(e)
+                continue
+            yield n, p, q, None
+    finally:
+        if fh is not sys.stdin:
+            fh.close()
+
+def batch_lines(rows, r0, alpha, beta, L, signature=False) -> str:
+    """
+    NDJSON for a list of _batch_rows rows: each bare n is factored once,
+    footprints run as one batch.  A bad row gets {"n", "error"} instead of
+    failing the rest.
+    """
+    chunk = []
+    for n, p, q, err in rows:
+        cls = None
+        if err is None and p is None:
+            try:
+                cls, f = classify(n)
+                p, q = semiprime_factors(n, f) if cls == "semiprime" else (None, None)
+            except ValueError as e:
+                err = str(e)
+        elif err is None:
+            if min(p, q) < 2:
+                err = "p and q must be >= 2"
+            elif p * q != n:
+                err = f"{n} != {p} * {q}"
+            cls = "semiprime"
+        chunk.append((n, p, q, cls if err is None else None, err))
+    semi = [r for r in chunk if r[3] == "semiprime"]
+    if semi:
+        ns, ps, qs, _, _ = zip(*semi)
+        cols = footprints(ns, ps, qs, r0, alpha, beta, L)
+        inv = signatures(ns, cols)
+        geo = signatures(ns, cols, r0, alpha, beta, L, kind="geometry") if signature else None
+        lists = {k: (v.tolist() if hasattr(v, "tolist") else v) for k, v in cols.items()}
+    out, i = [], 0
+    for n, _, _, cls, err in chunk:
+        if err is not None:
+            out.append(json.dumps({"n": str(n), "error": err}) + "\n")
+            continue
+        rec = {"n": str(n), "class": cls}
+        if cls == "semiprime":
+            rec.update({k: (str(v[i]) if k in ("p", "q") else v[i]) for k, v in lists.items()})
+            rec["signature"] = inv[i]
+            if geo:
+                rec["signature_geom"] = geo[i]
+            i += 1
+        out.append(json.dumps(rec) + "\n")
+    return "".join(out)
+
+def run_batch(path, r0, alpha, beta, L, signature=False, jobs=1):
+    """
+    NDJSON line per input line, in input order, streamed as chunks finish.
+    jobs > 1 (0: all CPUs): chunks of STREAM_CHUNK lines go through a
+    process pool, a few per worker in flight, so memory stays flat.
+    """
+    import os
+    jobs = jobs or os.cpu_count() or 1
+    rows, size = _batch_rows(path), (BATCH_CHUNK if jobs <= 1 else STREAM_CHUNK)
+    chunks = iter(lambda: [r for _, r in zip(range(size), rows)], [])
+    out = sys.stdout
+    if jobs <= 1:
+        for chunk in chunks:
+            out.write(batch_lines(chunk, r0, alpha, beta, L, signature)); out.flush()
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = []
+        for chunk in chunks:
+            pending.append(pool.submit(batch_lines, chunk, r0, alpha, beta, L, signature))
+            if len(pending) >= 2 * jobs:
+                out.write(pending.pop(0).result()); out.flush()
+        for f in pending:
+            out.write(f.result())
+        out.flush()
+
 def main():
     ap = argparse.ArgumentParser(
         description="Classify n as prime / semiprime / other and compute coil footprint for semiprimes."
     )
-    ap.add_argument("n", type=int, help="Integer to classify")
+    ap.add_argument("n", type=int, nargs="?", help="Integer to classify")
     ap.add_argument("--r0", type=float, default=1.0, help="Base radius r0")
     ap.add_argument("--alpha", type=float, default=0.0125, help="Cone slope alpha")
     ap.add_argument("--beta", type=float, default=0.005, help="Pitch (z-step) beta")
     ap.add_argument("--L", type=float, default=360.0, help="Angular period L (integers per full turn)")
     ap.add_argument("--signature", action="store_true", help="Print geometry-aware and geometry-invariant signatures for semiprimes")
     ap.add_argument("--json", action="store_true", help="Emit JSON instead of text")
+    ap.add_argument("--batch", metavar="FILE", help='footprints for lines "n p q" (or "n") of FILE ("-": stdin) as NDJSON')
+    ap.add_argument("--jobs", type=int, default=1, help="--batch worker processes (0: all CPUs)")
     args = ap.parse_args()
+    if args.batch:
+        run_batch(args.batch, args.r0, args.alpha, args.beta, args.L, args.signature, args.jobs)
+        return
+    if args.n is None:
+        ap.error("n is required without --batch")
 
     n = args.n
-    cls = coil_classify(n)
+    cls, factors = classify(n)
 
     if args.json:
         out = {"n": n, "class": cls}
         if cls == "semiprime":
-            out["footprint"] = footprint_for_semiprime(n, args.r0, args.alpha, args.beta, args.L)
+            out["footprint"] = footprint_for_semiprime(n, args.r0, args.alpha, args.beta, args.L, factors)
         print(json.dumps(out, indent=2))
         return
 
     # Text output
     print(f"{n} → {cls}")
     if cls == "semiprime":
-        fp = footprint_for_semiprime(n, args.r0, args.alpha, args.beta, args.L)
+        fp = footprint_for_semiprime(n, args.r0, args.alpha, args.beta, args.L, factors)
         p, q = fp["primes"]
         print(f"  factors: p={p}, q={q} (bit_gap={fp['bit_gap']}, balance={fp['balance']:.6f})")
         d = fp["distances"]
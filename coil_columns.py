@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+# coil_columns.py — columnar chunk files for coil_scanner rows
+#
+# A .coil file is a run of self-contained chunks (no file header, so shard
+# files concatenate into a valid file).  Each chunk holds its rows column by
+# column as fixed-width little-endian arrays, so a reader maps the file and
+# views a column as a NumPy array without parsing anything:
+#
+#   head     48 bytes: magic "COILCH01", rows u32, diag rows u32,
+#            n_min u64, n_max u64, factorization bytes u64, diag bytes u64
+#   n, spf, lpf              u64[rows]
+#   fact_off                 u64[rows+1]   factorization i = fact[off[i]:off[i+1]]
+#   diag_off                 u64[diag+1]
+#   diag_row                 u32[diag]     row of each diagnostics record
+#   cls, omega, Omega        u8[rows]      cls indexes CLASSES
+#   fact, diag               bytes         ASCII "p^e*q", DIAG_FIELDS joined by SEP
+#   zero padding to a multiple of 8
+#
+# Diagnostics (coil_scanner --mode full/sampled) are kept only for the rows
+# that have them, as the strings the CSV holds joined by SEP.  Rows are
+# in ascending n within a chunk and chunks ascend, as the scanner writes
+# them; range queries find chunks from n_min/n_max and rows by bisection.
+# A chunk cut short by a crash is ignored by the reader and cut off when
+# the file is opened for appending.  n must be below 2^64.
+#
+#   python coil_scanner.py --stop 10000000 --out coil.coil
+#   python coil_columns.py info coil.coil
+#   python coil_columns.py csv coil.coil --lo 5000000 --hi 5001000
+#
+#   from coil_columns import ColumnFile
+#   with ColumnFile("coil.coil") as cf:
+#       cols = cf.columns(5_000_000, 6_000_000)   # {"n": array, "cls": ..., ...}
+
+import os, sys, csv, mmap, struct, argparse
+from array import array
+
+MAGIC   = b"COILCH01"
+HEAD    = struct.Struct("<8sIIQQQQ")
+CLASSES = ("prime", "semiprime", "composite")
+CHUNK_ROWS = 1 << 16
+SEP     = "\x1f"
+DIAG_FIELDS = ("equal_L", "equal_half", "equal_product", "equal_remainder",
+               "ptest_L", "ptest_discriminant", "ptest_sqrt_disc_exact",
+               "ptest_root1", "ptest_root2")
+
+def _pad(k):
+    return -k % 8
+
+def _le(a: array) -> bytes:
+    if sys.byteorder != "little":
+        a = array(a.typecode, a)
+        a.byteswap()
+    return a.tobytes()
+
+def _chunk_size(rows, diag, fact_bytes, diag_bytes):
+    body = 8 * (3 * rows + rows + 1 + diag + 1) + 4 * diag + 3 * rows + fact_bytes + diag_bytes
+    return HEAD.size + body + _pad(body)
+
+def _scan_chunks(buf, size):
+    """[(offset, rows, diag, n_min, n_max, fact_bytes, diag_bytes)] of the complete chunks, and where they end."""
+    out, off = [], 0
+    while off + HEAD.size <= size:
+        magic, rows, diag, lo, hi, fb, db = HEAD.unpack_from(buf, off)
+        if magic != MAGIC:
+            raise ValueError(f"bad chunk at byte {off}")
+        end = off + _chunk_size(rows, diag, fb, db)
+        if end > size:
+            break
+        out.append((off, rows, diag, lo, hi, fb, db))
+        off = end
+    return out, off
+
+def valid_end(path) -> int:
+    """Length of the complete chunks at the start of path (0 if missing)."""
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        return 0
+    with open(path, "rb") as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return _scan_chunks(mm, len(mm))[1]
+
+# ------------------ write ------------------
+class ColumnWriter:
+    """Buffers rows in typed arrays and writes a chunk every chunk_rows rows (and on flush/close)."""
+
+    def __init__(self, path, append=False, chunk_rows=CHUNK_ROWS):
+        self.path, self.chunk_rows = path, chunk_rows
+        if append and os.path.exists(path):
+            end = valid_end(path)
+            self._fh = open(path, "r+b")
+            self._fh.truncate(end)
+            self._fh.seek(end)
+        else:
+            self._fh = open(path, "wb")
+        self._reset()
+
+    def _reset(self):
+        self._n, self._spf, self._lpf = array("Q"), array("Q"), array("Q")
+        self._cls, self._omega, self._Omega = array("B"), array("B"), array("B")
+        self._fact_off, self._fact = array("Q", [0]), bytearray()
+        self._diag_row, self._diag_off, self._diag = array("I"), array("Q", [0]), bytearray()
+
+    def add(self, n, kind, cnt, diag=None):
+        """One scanner row: classification, Counter({p: e}), diagnostics dict or None."""
+        if n >= 1 << 64:
+            raise ValueError(f"n={n} does not fit the u64 columns; write CSV instead")
+        self._n.append(n)
+        self._cls.append(CLASSES.index(kind))
+        self._omega.append(len(cnt))
+        self._Omega.append(sum(cnt.values()))
+        self._spf.append(min(cnt) if cnt else n)
+        self._lpf.append(max(cnt) if cnt else n)
+        self._fact += "*".join(f"{p}" if m == 1 else f"{p}^{m}" for p, m in sorted(cnt.items())).encode()
+        self._fact_off.append(len(self._fact))
+        if diag is not None:
+            self._diag_row.append(len(self._n) - 1)
+            self._diag += SEP.join("" if diag.get(k) is None else str(diag[k]) for k in DIAG_FIELDS).encode()
+            self._diag_off.append(len(self._diag))
+        if len(self._n) >= self.chunk_rows:
+            self.flush()
+
+    def flush(self):
+        rows = len(self._n)
+        if rows:
+            parts = [HEAD.pack(MAGIC, rows, len(self._diag_row), self._n[0], self._n[-1],
+                               len(self._fact), len(self._diag))]
+            parts += [_le(a) for a in (self._n, self._spf, self._lpf, self._fact_off, self._diag_off, self._diag_row)]
+            parts += [self._cls.tobytes(), self._omega.tobytes(), self._Omega.tobytes(),
+                      bytes(self._fact), bytes(self._diag)]
+            body = sum(len(p) for p in parts) - HEAD.size
+            parts.append(b"\0" * _pad(body))
+            self._fh.write(b"".join(parts))
+            self._reset()
+        self._fh.flush()
+
+    def commit(self) -> int:
+        """Write the buffered rows as a chunk; the byte offset the file is complete up to."""
+        self.flush()
+        return self._fh.tell()
+
+    def fileno(self):
+        return self._fh.fileno()
+
+    def close(self):
+        if self._fh is not None:
+            self.flush()
+            self._fh.close()
+            self._fh = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+# ------------------ read ------------------
+def _np():
+    import numpy as np
+    return np
+
+class ColumnFile:
+    """Memory-mapped .coil file; columns() and rows() select by n range without decoding other chunks."""
+
+    def __init__(self, path):
+        self.path = path
+        self._fh = open(path, "rb")
+        size = os.path.getsize(path)
+        self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self._chunks, self.end = _scan_chunks(self._mm, size)
+
+    def __len__(self):
+        return sum(c[1] for c in self._chunks)
+
+    @property
+    def first_n(self):
+        return self._chunks[0][3] if self._chunks else None
+
+    @property
+    def last_n(self):
+        return self._chunks[-1][4] if self._chunks else None
+
+    def _views(self, c):
+        np = _np()
+        off, rows, diag, _, _, fb, db = c
+        at, v = off + HEAD.size, {}
+        for name, dtype, k in (("n", "<u8", rows), ("spf", "<u8", rows), ("lpf", "<u8", rows),
+                               ("fact_off", "<u8", rows + 1), ("diag_off", "<u8", diag + 1),
+                               ("diag_row", "<u4", diag), ("cls", "u1", rows), ("omega", "u1", rows),
+                               ("Omega", "u1", rows)):
+            v[name] = np.frombuffer(self._mm, dtype=dtype, count=k, offset=at)
+            at += v[name].nbytes
+        v["fact"], v["diag"] = (at, fb), (at + fb, db)
+        return v
+
+    def _select(self, lo, hi):
+        """(views, first row, end row) per chunk overlapping lo <= n <= hi."""
+        np = _np()
+        for c in self._chunks:
+            if (lo is not None and c[4] < lo) or (hi is not None and c[3] > hi):
+                continue
+            v = self._views(c)
+            a = 0 if lo is None else int(np.searchsorted(v["n"], lo, side="left"))
+            b = c[1] if hi is None else int(np.searchsorted(v["n"], hi, side="right"))
+            if a < b:
+                yield v, a, b
+
+    def columns(self, lo=None, hi=None) -> dict:
+        """{"n", "cls", "omega", "Omega", "spf", "lpf"}: arrays over lo <= n <= hi (views for a single chunk)."""
+        np = _np()
+        names = ("n", "cls", "omega", "Omega", "spf", "lpf")
+        parts = [{k: v[k][a:b] for k in names} for v, a, b in self._select(lo, hi)]
+        if len(parts) == 1:
+            return parts[0]
+        return {k: np.concatenate([p[k] for p in parts]) if parts else
+                np.zeros(0, dtype="u1" if k in ("cls", "omega", "Omega") else "<u8") for k in names}
+
+    def factorizations(self, lo=None, hi=None) -> list:
+        out = []
+        for v, a, b in self._select(lo, hi):
+            at, off = v["fact"][0], v["fact_off"]
+            blob = self._mm[at + int(off[a]):at + int(off[b])].decode()
+            base = int(off[a])
+            out += [blob[int(off[i]) - base:int(off[i + 1]) - base] for i in range(a, b)]
+        return out
+
+    def rows(self, lo=None, hi=None):
+        """Rows as the dicts coil_scanner writes to CSV (all values strings, "" where empty)."""
+        for v, a, b in self._select(lo, hi):
+            at, fo = v["fact"][0], v["fact_off"].tolist()
+            dat, do = v["diag"][0], v["diag_off"].tolist()
+            diag = dict(zip(v["diag_row"].tolist(), range(len(v["diag_row"]))))
+            cols = [v[k][a:b].tolist() for k in ("n", "cls", "Omega", "omega", "spf", "lpf")]
+            for i, (n, cls, Om, om, spf, lpf) in enumerate(zip(*cols), a):
+                row = {"n": str(n), "classification": CLASSES[cls], "omega_total": str(Om),
+                       "omega_distinct": str(om), "smallest_prime_factor": str(spf),
+                       "largest_prime_factor": str(lpf),
+                       "factorization": self._mm[at + fo[i]:at + fo[i + 1]].decode()}
+                d = diag.get(i)
+                row.update(zip(DIAG_FIELDS, self._mm[dat + do[d]:dat + do[d + 1]].decode().split(SEP))
+                           if d is not None else dict.fromkeys(DIAG_FIELDS, ""))
+                yield row
+
+    def copy_to(self, fh, block=1 << 23):
+        """Write the complete chunks to fh (concatenated files stay valid)."""
+        for at in range(0, self.end, block):
+            fh.write(self._mm[at:min(at + block, self.end)])
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            try:
+                self._mm.close()
+            except BufferError:     # arrays from columns() still view it; unmapped when they go
+                pass
+        self._mm = b""
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Inspect and export coil_scanner columnar files.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    i = sub.add_parser("info", help="chunks, rows and n range")
+    i.add_argument("path")
+    c = sub.add_parser("csv", help="write rows in the scanner's CSV layout to stdout")
+    c.add_argument("path")
+    c.add_argument("--lo", type=int)
+    c.add_argument("--hi", type=int)
+    args = ap.parse_args(argv)
+
+    with ColumnFile(args.path) as cf:
+        if args.cmd == "info":
+            print(f"{args.path}: {len(cf)} rows in {len(cf._chunks)} chunks, n {cf.first_n}..{cf.last_n}, "
+                  f"{cf.end} bytes" + (f" (+{os.path.getsize(args.path) - cf.end} incomplete)"
+                                       if os.path.getsize(args.path) > cf.end else ""))
+            cols = cf.columns()
+            counts = _np().bincount(cols["cls"], minlength=len(CLASSES)) if len(cols["n"]) else [0] * len(CLASSES)
+            for name, k in zip(CLASSES, counts):
+                print(f"  {name:10s} {int(k)}")
+        else:
+            from coil_scanner import FIELDS
+            w = csv.DictWriter(sys.stdout, fieldnames=FIELDS)
+            w.writeheader()
+            w.writerows(cf.rows(args.lo, args.hi))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,8 @@
 #!/usr/bin/env python3
-import csv, sys, os, argparse, io, gzip, gc
+import csv, sys, os, argparse, io, gzip, gc, json
 from bisect import bisect_left
 from collections import Counter
+from coil_columns import ColumnWriter, ColumnFile
 from tangent_prime_test import (
     factor, is_probable_prime,
     tangent_equal_split_info, tangent_prime_test_split_info,
@@ -40,7 +41,26 @@ def want_diagnostics(kind, cnt, samples, mode, period):
     if sum(cnt.values()) >= 5: return True
     return False
 
+def diagnostics(n: int) -> dict:
+    eq = tangent_equal_split_info(n)
+    pt = tangent_prime_test_split_info(n)
+    roots = pt.get("roots", (None, None))
+    r1, r2 = (roots + (None, None))[:2] if isinstance(roots, tuple) else (None, None)
+    return {
+        "equal_L": str(eq.get("L","")),
+        "equal_half": str(eq.get("half","")),
+        "equal_product": str(eq.get("product","")),
+        "equal_remainder": str(eq.get("remainder","")),
+        "ptest_L": pt.get("L",""),
+        "ptest_discriminant": pt.get("discriminant",""),
+        "ptest_sqrt_disc_exact": bool(pt.get("sqrt_disc_exact", False)),
+        "ptest_root1": r1,
+        "ptest_root2": r2,
+    }
+
 def write_row(w, n, kind, cnt, want_diag: bool):
+    if isinstance(w, ColumnWriter):
+        w.add(n, kind, cnt, diagnostics(n) if want_diag else None); return
     row = {
         "n": n,
         "classification": kind,
@@ -51,21 +71,7 @@ def write_row(w, n, kind, cnt, want_diag: bool):
         "factorization": factor_str(cnt),
     }
     if want_diag:
-        eq = tangent_equal_split_info(n)
-        pt = tangent_prime_test_split_info(n)
-        roots = pt.get("roots", (None, None))
-        r1, r2 = (roots + (None, None))[:2] if isinstance(roots, tuple) else (None, None)
-        row.update({
-            "equal_L": str(eq.get("L","")),
-            "equal_half": str(eq.get("half","")),
-            "equal_product": str(eq.get("product","")),
-            "equal_remainder": str(eq.get("remainder","")),
-            "ptest_L": pt.get("L",""),
-            "ptest_discriminant": pt.get("discriminant",""),
-            "ptest_sqrt_disc_exact": bool(pt.get("sqrt_disc_exact", False)),
-            "ptest_root1": r1,
-            "ptest_root2": r2,
-        })
+        row.update(diagnostics(n))
     w.writerow(row)
 
 def _open_maybe_gzip_for_read(path):
@@ -79,8 +85,13 @@ def _open_maybe_gzip_for_read(path):
         pass
     return open(path, "r", encoding="utf-8", newline="")
 
+def _is_columnar(path):
+    return path.endswith(".coil")
+
 def find_resume_point(path):
     if not os.path.exists(path) or os.path.getsize(path)==0: return None
+    if _is_columnar(path):
+        with ColumnFile(path) as cf: return cf.last_n
     last = None
     try:
         with _open_maybe_gzip_for_read(path) as fh:
@@ -90,66 +101,227 @@ def find_resume_point(path):
     try: return int(last.get("n",""))
     except Exception: return None
 
-def _open_for_write(path, append: bool):
-    if path.endswith(".gz"):
-        rawfh = open(path, "ab" if append else "wb")
-        return io.TextIOWrapper(gzip.GzipFile(fileobj=rawfh, mode="ab" if append else "wb"),
-                                encoding="utf-8", newline="")
+class _GzipMembers:
+    """Text writer to a gzip file that ends a gzip member at every commit(),
+    so the file is a valid multi-member gzip when cut at a committed offset."""
+
+    def __init__(self, raw):
+        self.raw, self.text = raw, None
+
+    def write(self, s):
+        if self.text is None:
+            self.text = io.TextIOWrapper(gzip.GzipFile(fileobj=self.raw, mode="wb"),
+                                         encoding="utf-8", newline="")
+        return self.text.write(s)
+
+    def flush(self):
+        if self.text is not None: self.text.flush()
+
+    def commit(self) -> int:
+        """End the member; the byte offset it ends at."""
+        if self.text is not None:
+            self.text.close()       # writes the gzip trailer; fileobj=raw stays open
+            self.text = None
+        self.raw.flush()
+        return self.raw.tell()
+
+    def fileno(self):
+        return self.raw.fileno()
+
+    def close(self):
+        self.commit(); self.raw.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+def _open_for_write(path, append: bool, gz=None):
+    if path.endswith(".gz") if gz is None else gz:
+        return _GzipMembers(open(path, "ab" if append else "wb"))
     return open(path, "a" if append else "w", newline="", encoding="utf-8")
 
+def _commit(fh) -> int:
+    """Flush rows to the OS at a point where the file may be cut; returns the byte offset."""
+    if hasattr(fh, "commit"):
+        off = fh.commit()
+    else:
+        fh.flush(); off = fh.buffer.tell()
+    os.fsync(fh.fileno())
+    return off
+
+# ------------------ checkpoints ------------------
+# <out>.ckpt (JSON, replaced atomically) is rewritten every --checkpoint-every
+# samples: byte offset of the committed rows (for gzip the end of a member,
+# for .coil the end of a chunk), the last n written and the scan state after
+# it.  A restart cuts the file back to the offset and carries on from that
+# state, so the output matches an uninterrupted run and nothing is parsed.
+# Files without a usable checkpoint fall back to find_resume_point.
+
+CKPT_VERSION = 1
+
+def checkpoint_path(out_path):
+    return out_path + ".ckpt"
+
+def write_checkpoint(out_path, ckpt):
+    path = checkpoint_path(out_path)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(ckpt, fh); fh.flush(); os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+def read_checkpoint(out_path):
+    """The checkpoint of out_path if it still describes the file, else None."""
+    path = checkpoint_path(out_path)
+    try:
+        with open(path, encoding="utf-8") as fh:
+            ckpt = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    if ckpt.get("version") != CKPT_VERSION or not os.path.exists(out_path) \
+            or os.path.getsize(out_path) < ckpt["offset"]:
+        return None
+    return ckpt
+
+def _open_rows(path, append: bool, like=None):
+    """(file, writer) for scanner rows: columnar chunks for .coil, else CSV (gzip for .gz).
+    like: the path whose suffix picks the format (for temporary names)."""
+    like = like or path
+    if _is_columnar(like):
+        cw = ColumnWriter(path, append)
+        return cw, cw
+    fh = _open_for_write(path, append, like.endswith(".gz"))
+    w = csv.DictWriter(fh, fieldnames=FIELDS)
+    if not append: w.writeheader()
+    return fh, w
+
+FIELDS = [
+    "n","classification","omega_total","omega_distinct",
+    "smallest_prime_factor","largest_prime_factor","factorization",
+    "equal_L","equal_half","equal_product","equal_remainder",
+    "ptest_L","ptest_discriminant","ptest_sqrt_disc_exact",
+    "ptest_root1","ptest_root2",
+]
+MEM_CYCLE = 20000
+
+class ScanState:
+    """Where a scan is and its adaptive sampling state.  (n, i, jump_blocks,
+    easy_streak) decide every later step; samples only picks diagnostics rows."""
+    __slots__ = ("n", "i", "jump_blocks", "easy_streak", "samples", "kind", "cnt")
+
+    def __init__(self, n, i=0, jump_blocks=1, easy_streak=0, samples=0):
+        self.n, self.i, self.jump_blocks, self.easy_streak, self.samples = n, i, jump_blocks, easy_streak, samples
+        self.kind = self.cnt = None
+
+    @classmethod
+    def fresh(cls, start):
+        return cls(next_wheel_candidate(start))
+
+    def as_list(self):
+        return [self.n, self.i, self.jump_blocks, self.easy_streak, self.samples]
+
+    def step(self, easy, batch, max_jump_blocks):
+        """Count the sample at self.n, adapt the jump and move to the next n."""
+        n = self.n
+        self.samples += 1
+        if easy:
+            self.easy_streak += 1
+            if self.easy_streak % batch == 0 and self.jump_blocks < max_jump_blocks:
+                self.jump_blocks *= 2
+                print(f"[progress] n={n} speed↑ jump_blocks={self.jump_blocks}", file=sys.stderr)
+        else:
+            self.easy_streak = 0
+            if self.jump_blocks > 1:
+                self.jump_blocks //= 2
+                print(f"[progress] n={n} speed↓ jump_blocks={self.jump_blocks}", file=sys.stderr)
+        self.n += OFFSETS[self.i]
+        self.i += 1
+        if self.i == len(OFFSETS):
+            self.i = 0
+            if self.jump_blocks > 1: self.n += 210 * (self.jump_blocks - 1)
+            self.n = next_wheel_candidate(self.n)
+
+def is_easy(n, kind, cnt):
+    return kind == "prime" or (min(cnt) if cnt else n) <= 1000
+
+def _classifier(stop, sieve_block):
+    # consecutive n: factor whole blocks with the segmented sieve (numbers past
+    # its range and --sieve-block 0 fall back to classify_and_count)
+    if sieve_block is not None and sieve_block <= 0:
+        return classify_and_count
+    from segment_sieve import BlockFactorer, MAX_N, BLOCK
+    sieve = BlockFactorer(block=sieve_block or BLOCK, stop=stop)
+    return lambda n: sieve.classify(n) if 2 <= n < MAX_N else classify_and_count(n)
+
+def scan(st, stop, w, classify, fh, batch=200, max_jump_blocks=512, progress_every=1_000_000,
+         mode="thin", diag_period=1000, commit=None, commit_every=10000):
+    """Write one row per n from st while st.n <= stop, adapting the jump as it goes.
+    commit(st, last_n) is called every commit_every samples and at the end."""
+    n = None
+    while st.n <= stop:
+        n = st.n
+        try:
+            kind, cnt = classify(n)
+            st.kind, st.cnt = kind, cnt
+            write_row(w, n, kind, cnt, want_diagnostics(kind, cnt, st.samples, mode, diag_period))
+        except Exception as e:
+            print(f"[warn] n={n} failed: {e}", file=sys.stderr)
+            if st.kind is None:
+                raise
+        st.step(is_easy(n, st.kind, st.cnt), batch, max_jump_blocks)
+        if st.samples % MEM_CYCLE == 0: gc.collect()
+        if st.samples % progress_every == 0:
+            print(f"[progress] n={n}", file=sys.stderr); fh.flush()
+        if commit is not None and st.samples % commit_every == 0:
+            commit(st, n)
+    if commit is not None and n is not None:
+        commit(st, n)
+
 def adaptive_coil(start, stop, out_path, batch=200, max_jump_blocks=512,
                   resume=True, progress_every=1_000_000,
-                  mode="thin", diag_period=1000):
-    fields = [
-        "n","classification","omega_total","omega_distinct",
-        "smallest_prime_factor","largest_prime_factor","factorization",
-        "equal_L","equal_half","equal_product","equal_remainder",
-        "ptest_L","ptest_discriminant","ptest_sqrt_disc_exact",
-        "ptest_root1","ptest_root2",
-    ]
+                  mode="thin", diag_period=1000, sieve_block=None, checkpoint_every=10000):
     if start > stop:
         print("Nothing to do.", file=sys.stderr); return
-    append = False
-    if resume:
+    params = {"start": start, "batch": batch, "max_jump_blocks": max_jump_blocks,
+              "mode": mode, "diag_period": diag_period}
+    append, st = False, None
+    ckpt = read_checkpoint(out_path) if resume else None
+    if ckpt is not None:
+        with open(out_path, "r+b") as raw:
+            raw.truncate(ckpt["offset"])     # drop rows written after the last commit
+        append = ckpt["offset"] > 0
+        if ckpt["params"] == params:
+            st = ScanState(*ckpt["state"])
+        else:
+            print(f"[resume] {checkpoint_path(out_path)} is for other parameters; "
+                  f"restarting the scan state after n={ckpt['last_n']}", file=sys.stderr)
+            start = max(start, ckpt["last_n"] + 1)
+    elif resume:
         last_n = find_resume_point(out_path)
         if last_n is not None:
             start = max(start, last_n+1); append = True
-            if start > stop:
-                print("Nothing to do.", file=sys.stderr); return
-    fh = _open_for_write(out_path, append)
+    if st is None:
+        if start > stop:
+            print("Nothing to do.", file=sys.stderr); return
+        st = ScanState.fresh(start)
+    elif st.n > stop:
+        print("Nothing to do.", file=sys.stderr); return
+    if not append and os.path.exists(checkpoint_path(out_path)):
+        os.remove(checkpoint_path(out_path))
+    classify = _classifier(stop, sieve_block)
+    fh, w = _open_rows(out_path, append)
+
+    def commit(st, last_n):
+        write_checkpoint(out_path, {"version": CKPT_VERSION, "offset": _commit(fh), "last_n": last_n,
+                                    "state": st.as_list(), "params": params})
     with fh:
-        w = csv.DictWriter(fh, fieldnames=fields)
-        if not append: w.writeheader()
-        n = next_wheel_candidate(start)
-        samples = 0; jump_blocks = 1; easy_streak = 0; MEM_CYCLE = 20000
-        while n <= stop:
-            for off in OFFSETS:
-                if n > stop: break
-                try:
-                    kind, cnt = classify_and_count(n)
-                    write_row(w, n, kind, cnt, want_diagnostics(kind, cnt, samples, mode, diag_period))
-                except KeyboardInterrupt:
-                    print("\nInterrupted — partial results saved to", out_path, file=sys.stderr); return
-                except Exception as e:
-                    print(f"[warn] n={n} failed: {e}", file=sys.stderr)
-                samples += 1
-                spf = min(cnt) if cnt else n
-                if kind == "prime" or spf <= 1000:
-                    easy_streak += 1
-                    if easy_streak % batch == 0 and jump_blocks < max_jump_blocks:
-                        jump_blocks *= 2
-                        print(f"[progress] n={n} speed↑ jump_blocks={jump_blocks}", file=sys.stderr)
-                else:
-                    easy_streak = 0
-                    if jump_blocks > 1:
-                        jump_blocks //= 2
-                        print(f"[progress] n={n} speed↓ jump_blocks={jump_blocks}", file=sys.stderr)
-                if samples % MEM_CYCLE == 0: gc.collect()
-                if samples % progress_every == 0:
-                    print(f"[progress] n={n}", file=sys.stderr); fh.flush()
-                n += off
-            if jump_blocks > 1: n += 210 * (jump_blocks - 1)
-            if n <= stop: n = next_wheel_candidate(n)
+        try:
+            scan(st, stop, w, classify, fh, batch, max_jump_blocks, progress_every,
+                 mode, diag_period, commit if checkpoint_every > 0 else None, checkpoint_every)
+        except KeyboardInterrupt:
+            print("\nInterrupted — partial results saved to", out_path, file=sys.stderr); return
     print(f"Done. Wrote {out_path}")
     print("Tip: use --mode sampled to keep diagnostics sparse and RAM flat.")
 
@@ -166,32 +338,231 @@ def shard_loop(start, stop, shard_size, out_template, **kwargs):
         adaptive_coil(lo, hi, out_path, **kwargs)
         idx += 1; n = hi+1
 
+# ------------------ parallel shards ------------------
+# Where the scan goes next depends only on whether each n it visits is
+# "easy" (prime or smallest factor <= 1000), so a parallel run is split in
+# three: workers sieve each shard for that one bit per n, the main process
+# walks the shards in order with the real scan state (a few operations per
+# visited n; jump_blocks and the sample count carry over shard boundaries),
+# and workers factor and write the visited n of each shard.  Idle workers
+# take the next queued shard, so small shards balance uneven ones.  The
+# rows are those of one unsharded adaptive_coil run, cut into shard files;
+# the manifest is rewritten as each shard's write lands, recording it with
+# its entry/exit state, and a rerun keeps those whose entry state still
+# matches.  Only about 2 x jobs shards are sieved ahead of the walk.
+
+def _easy_bits(lo, hi, sieve_block):
+    """Packed bit per n in [lo, hi], set where the scan counts n as easy."""
+    import numpy as np
+    easy = np.zeros(hi - lo + 1, dtype=bool)
+    a, b = max(lo, 2), hi + 1
+    if sieve_block is None or sieve_block > 0:
+        from segment_sieve import FactorBlock, MAX_N, BLOCK
+        b = min(b, MAX_N)
+        for x in range(a, b, sieve_block or BLOCK):
+            fb = FactorBlock(x, min(x + (sieve_block or BLOCK), b))
+            easy[x - lo:fb.hi - lo] = fb.small_or_prime(1000)
+    else:
+        b = a
+    wheel = set(WHEEL)
+    for n in [n for n in range(lo, a)] + list(range(max(b, lo), hi + 1)):
+        if n % 210 in wheel:
+            easy[n - lo] = is_easy(n, *classify_and_count(n))
+    return np.packbits(easy).tobytes()
+
+def _walk(st, lo, hi, bits, batch, max_jump_blocks, progress_every):
+    """Advance st through [lo, hi] on the easy bits; [(n, sample number)] visited."""
+    visited = []
+    while st.n <= hi:
+        k = st.n - lo
+        visited.append((st.n, st.samples))
+        st.step(bits[k >> 3] >> (7 - (k & 7)) & 1, batch, max_jump_blocks)
+        if st.samples % progress_every == 0:
+            print(f"[progress] n={visited[-1][0]}", file=sys.stderr)
+    return visited
+
+def _write_shard(path, hi, visited, opts):
+    classify = _classifier(hi, opts["sieve_block"])
+    tmp = path + ".tmp"
+    rows = 0
+    fh, w = _open_rows(tmp, False, like=path)
+    with fh:
+        for n, s in visited:
+            try:
+                kind, cnt = classify(n)
+                write_row(w, n, kind, cnt, want_diagnostics(kind, cnt, s, opts["mode"], opts["diag_period"]))
+                rows += 1
+            except Exception as e:
+                print(f"[warn] n={n} failed: {e}", file=sys.stderr)
+    os.replace(tmp, path)
+    return rows
+
+def _write_manifest(path, man):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as fh:
+        json.dump(man, fh, indent=1)
+    os.replace(tmp, path)
+
+def parallel_shards(start, stop, shard_size, out_template, jobs, manifest_path,
+                    resume=True, **opts):
+    """Scan [start, stop] in shard_size shards on `jobs` processes; same rows as one adaptive_coil run."""
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+    if start > stop:
+        print("Nothing to do.", file=sys.stderr); return None
+    params = {"start": start, "stop": stop, "shard_size": shard_size, "out_template": out_template,
+              **{k: opts[k] for k in ("batch", "max_jump_blocks", "mode", "diag_period")}}
+    shards, lo = [], start
+    while lo <= stop:
+        hi = min(stop, lo + shard_size - 1)
+        shards.append({"idx": len(shards), "lo": lo, "hi": hi,
+                       "path": out_template.format(lo=lo, hi=hi, idx=len(shards)),
+                       "status": "pending", "rows": 0, "entry": None, "exit": None})
+        lo = hi + 1
+    if resume and os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as fh:
+            old = json.load(fh)
+        if old.get("params") != params:
+            raise SystemExit(f"{manifest_path} was written for other parameters; "
+                             f"remove it or pass --no-resume")
+        for rec, prev in zip(shards, old["shards"]):
+            if prev["status"] == "done" and os.path.exists(prev["path"]):
+                rec.update(prev)
+    man = {"params": params, "shards": shards}
+    _write_manifest(manifest_path, man)
+
+    todo = [r["idx"] for r in shards if r["status"] != "done"]
+    print(f"[parallel] {len(shards)} shards, {len(shards) - len(todo)} already done, "
+          f"{jobs} workers", file=sys.stderr)
+    # at most `ahead` bit vectors and `ahead` shard writes in flight, so
+    # writes start as soon as the walk reaches a shard and memory stays bounded
+    ahead = 2 * jobs
+    pool = ProcessPoolExecutor(max_workers=jobs)
+    bits, writing = {}, {}
+
+    def prefetch():
+        while todo and len(bits) < ahead:
+            i = todo.pop(0)
+            bits[i] = pool.submit(_easy_bits, shards[i]["lo"], shards[i]["hi"], opts["sieve_block"])
+
+    def settle(fut=None, max_writing=None):
+        """Record finished writes in the manifest as they land, until fut is done
+        and no more than max_writing writes are running."""
+        while True:
+            done = [f for f in writing if f.done()]
+            for f in done:
+                shards[writing.pop(f)].update(rows=f.result(), status="done")
+            if done:
+                _write_manifest(manifest_path, man)
+            if (fut is None or fut.done()) and (max_writing is None or len(writing) <= max_writing):
+                return
+            wait(([fut] if fut is not None and not fut.done() else []) + list(writing),
+                 return_when=FIRST_COMPLETED)
+
+    try:
+        st = ScanState.fresh(start)
+        for rec in shards:
+            if rec["status"] == "done" and rec["entry"] == st.as_list():
+                st = ScanState(*rec["exit"]); continue
+            prefetch()
+            if rec["idx"] not in bits:     # finished, but after a different entry state
+                bits[rec["idx"]] = pool.submit(_easy_bits, rec["lo"], rec["hi"], opts["sieve_block"])
+            fut = bits.pop(rec["idx"])
+            settle(fut, max_writing=ahead - 1)
+            prefetch()
+            rec["entry"] = st.as_list()
+            visited = _walk(st, rec["lo"], rec["hi"], fut.result(),
+                            opts["batch"], opts["max_jump_blocks"], opts["progress_every"])
+            rec.update(status="writing", rows=0, exit=st.as_list())
+            writing[pool.submit(_write_shard, rec["path"], rec["hi"], visited, opts)] = rec["idx"]
+            _write_manifest(manifest_path, man)
+        settle(max_writing=0)
+    except KeyboardInterrupt:
+        pool.shutdown(wait=False, cancel_futures=True)
+        print("\nInterrupted — finished shards are listed in", manifest_path, file=sys.stderr)
+        return None
+    pool.shutdown()
+    print(f"Done. {len(shards)} shards, manifest {manifest_path}")
+    return man
+
+def merge_shards(man, out_path):
+    """One ordered file from the shard files (shards are disjoint, ascending ranges).
+    .coil shards into a .coil file are concatenated chunk by chunk."""
+    paths = [rec["path"] for rec in man["shards"]]
+    if _is_columnar(out_path):
+        if not all(map(_is_columnar, paths)):
+            raise SystemExit("--merge into a .coil file needs .coil shards")
+        with open(out_path, "wb") as out:
+            for p in paths:
+                with ColumnFile(p) as cf:
+                    cf.copy_to(out)
+        with ColumnFile(out_path) as cf:
+            rows = len(cf)
+    else:
+        rows = 0
+        with _open_for_write(out_path, False) as fh:
+            w = csv.DictWriter(fh, fieldnames=FIELDS)
+            w.writeheader()
+            for p in paths:
+                if _is_columnar(p):
+                    with ColumnFile(p) as cf:
+                        for row in cf.rows():
+                            w.writerow(row); rows += 1
+                    continue
+                with _open_maybe_gzip_for_read(p) as src:
+                    for row in csv.DictReader(src):
+                        w.writerow(row); rows += 1
+    print(f"Merged {len(paths)} shards into {out_path} ({rows} rows)")
+
 def main():
     ap = argparse.ArgumentParser(description="Wheel-accelerated adaptive coil scanner.")
     ap.add_argument("--start", type=int, default=2)
     ap.add_argument("--stop",  type=int, required=True)
-    ap.add_argument("--out",   type=str, default="coil.csv")
+    ap.add_argument("--out",   type=str, default="coil.csv",
+        help="CSV (.gz to gzip) or, ending in .coil, columnar chunks (coil_columns.py)")
     ap.add_argument("--shard-size", type=int, default=0)
     ap.add_argument("--out-template", type=str,
         default="coil.n{lo:06d}-{hi:06d}.csv.gz",
-        help="Used when --shard-size>0; supports {lo},{hi},{idx}. Add .gz to gzip.")
+        help="Used when --shard-size>0; supports {lo},{hi},{idx}. Add .gz to gzip, "
+             "end in .coil for columnar chunks (see coil_columns.py).")
     ap.add_argument("--batch", type=int, default=200)
     ap.add_argument("--max-jump-blocks", type=int, default=512)
     ap.add_argument("--mode", choices=["thin","full","sampled"], default="thin")
     ap.add_argument("--diag-period", type=int, default=1000)
     ap.add_argument("--progress-every", type=int, default=1_000_000)
     ap.add_argument("--no-resume", action="store_true")
+    ap.add_argument("--sieve-block", type=int, default=None,
+        help="numbers factored per sieve block (default 65536); 0 factors each n on its own")
+    ap.add_argument("--jobs", type=int, default=0,
+        help="scan shards in this many processes (needs --shard-size); scan state carries across shards")
+    ap.add_argument("--manifest", type=str, default="coil.manifest.json",
+        help="with --jobs: shard list with entry/exit scan state, used to resume")
+    ap.add_argument("--merge", type=str, default=None,
+        help="with --jobs: also write all shards, in order, into this one file")
+    ap.add_argument("--checkpoint-every", type=int, default=10000,
+        help="samples between checkpoints in <out>.ckpt (0: none; resume then re-reads the output)")
     args = ap.parse_args()
-    if args.shard_size > 0:
+    if args.jobs > 0:
+        if args.shard_size <= 0:
+            ap.error("--jobs needs --shard-size")
+        man = parallel_shards(args.start, args.stop, args.shard_size, args.out_template, args.jobs,
+                              args.manifest, resume=not args.no_resume,
+                              batch=args.batch, max_jump_blocks=args.max_jump_blocks,
+                              mode=args.mode, diag_period=args.diag_period,
+                              progress_every=args.progress_every, sieve_block=args.sieve_block)
+        if man and args.merge:
+            merge_shards(man, args.merge)
+    elif args.shard_size > 0:
         shard_loop(args.start, args.stop, args.shard_size, args.out_template,
                    batch=args.batch, max_jump_blocks=args.max_jump_blocks,
                    resume=not args.no_resume, mode=args.mode,
-                   diag_period=args.diag_period, progress_every=args.progress_every)
+                   diag_period=args.diag_period, progress_every=args.progress_every,
+                   sieve_block=args.sieve_block, checkpoint_every=args.checkpoint_every)
     else:
         adaptive_coil(args.start, args.stop, args.out,
                       batch=args.batch, max_jump_blocks=args.max_jump_blocks,
                       resume=not args.no_resume, mode=args.mode,
-                      diag_period=args.diag_period, progress_every=args.progress_every)
+                      diag_period=args.diag_period, progress_every=args.progress_every,
+                      sieve_block=args.sieve_block, checkpoint_every=args.checkpoint_every)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# corpus.py — prebuilt binary corpus of numbers with known factors
+#
+# Builds the bench.py shapes (balanced, lopsided, close, smooth, prime,
+# prime_power) once, in parallel, into a file of fixed-size records, so
+# benchmarks and load tests start instantly and replay the same bytes.
+#
+# File layout (all big-endian):
+#   header   128 bytes: magic "RSACRP01", version u16, width u16,
+#            record size u32, count u64, seed i64, shape names (comma list,
+#            NUL padded) — a record's shape byte indexes that list
+#   record   bits u16     bucket bit size
+#            shape u8     index into the header's shape list
+#            balance u8   100 * bits(p) / bits(n), p the smallest prime factor
+#            smooth u8    bits of the largest prime factor of p-1, minimised
+#                         over the prime factors (an upper bound when the
+#                         cofactor left after trial division is composite)
+#            n, p, q      each a length byte + big-endian bytes, zero padded
+#                         to `width`; n = p*q (q = 1 for primes)
+# Record i starts at 128 + i*record_size, so readers index the mmap directly;
+# Corpus yields Record views that decode an integer only when it is read.
+#
+# Bucket (bits, shape) is generated in chunks of CHUNK numbers, chunk c from
+# its own seeded stream (chunk 0 is bench.corpus's stream): the file depends
+# on seed/bits/shapes/count only, not on --jobs, and bench.py with a count up
+# to CHUNK sees the same numbers either way.
+#
+#   python corpus.py build corpus.rsc --bits 32,48,64,80 --count 1000 -j 8
+#   python corpus.py info corpus.rsc
+#   python corpus.py dump corpus.rsc --bits 64 --shape close --limit 5
+#   python bench.py --corpus-file corpus.rsc
+#   python loadgen.py --corpus corpus.rsc
+
+import os, sys, mmap, time, random, struct, argparse
+
+ROOT = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, ROOT)
+
+from bench import SHAPES, BITS, SEED, is_prime, make_case
+
+MAGIC   = b"RSACRP01"
+VERSION = 1
+HEADER  = struct.Struct(">8sHHIQq")
+HEADER_SIZE = 128
+TAGS    = struct.Struct(">HBBB")
+CHUNK   = 256
+SMOOTH_LIMIT = 1 << 16
+
+# ------------------ tags ------------------
+_TD_PRIMES = []
+
+def smooth_bits(p: int) -> int:
+    """Bits of the largest prime factor of p-1 (upper bound if a composite cofactor remains)."""
+    if not _TD_PRIMES:
+        _TD_PRIMES.extend(x for x in range(2, SMOOTH_LIMIT) if is_prime(x))
+    m, big = p - 1, 1
+    if m < 2:
+        return 0
+    for d in _TD_PRIMES:
+        if d * d > m:
+            break
+        if m % d == 0:
+            big = d
+            while m % d == 0:
+                m //= d
+    return max(big, m).bit_length()
+
+def tags(bits: int, shape: str, n: int, p: int, q: int):
+    factors = {p} if q == 1 or q % p == 0 else {p, q}
+    balance = round(100 * p.bit_length() / n.bit_length())
+    return bits, SHAPES.index(shape), balance, min(255, min(smooth_bits(f) for f in factors))
+
+# ------------------ build ------------------
+def _chunk(seed, bits, shape, c, count):
+    rng = random.Random(f"{seed}:{bits}:{shape}" + (f":{c}" if c else ""))
+    out = []
+    for _ in range(count):
+        n, p, q = make_case(rng, bits, shape)
+        out.append((tags(bits, shape, n, p, q), n, p, q))
+    return out
+
+def _pack(width, rec):
+    (bits, shape, balance, smooth), n, p, q = rec
+    buf = bytearray(TAGS.pack(bits, shape, balance, smooth))
+    for v in (n, p, q):
+        b = v.to_bytes((v.bit_length() + 7) // 8 or 1, "big")
+        buf += bytes((len(b),)) + b.ljust(width, b"\0")
+    return bytes(buf)
+
+def build(path, seed=SEED, bits_list=BITS, shapes=SHAPES, count=100, jobs=None, progress=None):
+    """Generate and write the corpus; returns the record count."""
+    from concurrent.futures import ProcessPoolExecutor
+    work = [(seed, bits, shape, c, min(CHUNK, count - c * CHUNK))
+            for bits in bits_list for shape in shapes for c in range((count + CHUNK - 1) // CHUNK)]
+    jobs = jobs or os.cpu_count() or 1
+    if jobs > 1 and len(work) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(work))) as pool:
+            futs = [pool.submit(_chunk, *w) for w in work]
+            chunks = []
+            for w, f in zip(work, futs):
+                chunks.append(f.result())
+                if progress:
+                    progress(*w[1:3], len(chunks), len(work))
+    else:
+        chunks = []
+        for w in work:
+            chunks.append(_chunk(*w))
+            if progress:
+                progress(*w[1:3], len(chunks), len(work))
+    recs = [r for ch in chunks for r in ch]
+    width = max(((r[1].bit_length() + 7) // 8 for r in recs), default=1)
+    if width > 255:
+        raise ValueError("numbers above 2040 bits do not fit the one-byte length prefix")
+    size = TAGS.size + 3 * (1 + width)
+    names = ",".join(SHAPES).encode()
+    header = HEADER.pack(MAGIC, VERSION, width, size, len(recs), seed) + names
+    if len(header) > HEADER_SIZE:
+        raise ValueError("shape list does not fit the header")
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as fh:
+        fh.write(header.ljust(HEADER_SIZE, b"\0"))
+        for r in recs:
+            fh.write(_pack(width, r))
+    os.replace(tmp, path)
+    return len(recs)
+
+# ------------------ read ------------------
+class Record:
+    """View of one record in the mapped file; integers are decoded on access."""
+    __slots__ = ("_buf", "_off", "_width")
+
+    def __init__(self, buf, off, width):
+        self._buf, self._off, self._width = buf, off, width
+
+    def _int(self, k):
+        at = self._off + TAGS.size + k * (1 + self._width)
+        ln = self._buf[at]
+        return int.from_bytes(self._buf[at + 1:at + 1 + ln], "big")
+
+    n = property(lambda self: self._int(0))
+    p = property(lambda self: self._int(1))
+    q = property(lambda self: self._int(2))
+    bits    = property(lambda self: TAGS.unpack_from(self._buf, self._off)[0])
+    shape   = property(lambda self: SHAPES[self._buf[self._off + 2]])
+    balance = property(lambda self: self._buf[self._off + 3])
+    smooth  = property(lambda self: self._buf[self._off + 4])
+
+    def as_dict(self) -> dict:
+        return {"n": self.n, "p": self.p, "q": self.q, "bits": self.bits, "shape": self.shape,
+                "balance": self.balance, "smooth": self.smooth}
+
+class Corpus:
+    """Memory-mapped corpus file: len(), indexing and iteration yield Record views."""
+
+    def __init__(self, path):
+        self.path = path
+        self._fh = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:  # empty file
+            self._fh.close()
+            raise ValueError(f"{path}: not a corpus file")
+        if len(self._mm) < HEADER_SIZE:
+            self.close()
+            raise ValueError(f"{path}: not a corpus file")
+        magic, version, self.width, self.record_size, self.count, self.seed = HEADER.unpack_from(self._mm)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path}: not a corpus file (or version {version} != {VERSION})")
+        names = self._mm[HEADER.size:HEADER_SIZE].rstrip(b"\0").decode().split(",")
+        if names != list(SHAPES[:len(names)]):
+            self.close()
+            raise ValueError(f"{path}: shape table {names} does not match bench.SHAPES")
+        if len(self._mm) != HEADER_SIZE + self.count * self.record_size:
+            self.close()
+            raise ValueError(f"{path}: truncated ({len(self._mm)} bytes)")
+        self._index = None
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError(i)
+        return Record(self._mm, HEADER_SIZE + i * self.record_size, self.width)
+
+    def __iter__(self):
+        for off in range(HEADER_SIZE, HEADER_SIZE + self.count * self.record_size, self.record_size):
+            yield Record(self._mm, off, self.width)
+
+    def raw(self, i) -> memoryview:
+        off = HEADER_SIZE + i * self.record_size
+        return memoryview(self._mm)[off:off + self.record_size]
+
+    def index(self) -> dict:
+        """{(bits, shape): [record numbers]}, from the tag bytes only."""
+        if self._index is None:
+            idx, mm = {}, self._mm
+            for i in range(self.count):
+                bits, shape, _, _ = TAGS.unpack_from(mm, HEADER_SIZE + i * self.record_size)
+                idx.setdefault((bits, SHAPES[shape]), []).append(i)
+            self._index = idx
+        return self._index
+
+    def select(self, bits=None, shape=None) -> list:
+        return [i for (b, s), ids in self.index().items()
+                if (bits is None or b == bits) and (shape is None or s == shape) for i in ids]
+
+    def buckets(self) -> dict:
+        """{(bits, shape): [n, ...]} in file order, the shape of bench.corpus()."""
+        return {k: [self[i].n for i in ids] for k, ids in self.index().items()}
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._fh.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+def _csv(v, cast=str):
+    return [cast(x) for x in v.split(",") if x.strip()]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Build and inspect binary corpora of numbers with known factors.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    b = sub.add_parser("build", help="generate a corpus file")
+    b.add_argument("path")
+    b.add_argument("--bits", type=lambda v: _csv(v, int), default=list(BITS))
+    b.add_argument("--shapes", type=_csv, default=list(SHAPES))
+    b.add_argument("--count", type=int, default=100, help="numbers per (bits, shape) bucket")
+    b.add_argument("--seed", type=int, default=SEED)
+    b.add_argument("-j", "--jobs", type=int, default=None, help="worker processes (default: all CPUs)")
+    b.add_argument("-q", "--quiet", action="store_true")
+    i = sub.add_parser("info", help="header and bucket counts")
+    i.add_argument("path")
+    d = sub.add_parser("dump", help="print records as JSON lines")
+    d.add_argument("path")
+    d.add_argument("--bits", type=int)
+    d.add_argument("--shape")
+    d.add_argument("--limit", type=int)
+    args = ap.parse_args(argv)
+
+    if args.cmd == "build":
+        bad = [s for s in args.shapes if s not in SHAPES]
+        if bad:
+            ap.error(f"unknown shape: {', '.join(bad)}")
+        progress = None if args.quiet else \
+            (lambda bits, shape, done, total: print(f"  {done}/{total} {bits}/{shape}", file=sys.stderr, flush=True))
+        t0 = time.perf_counter()
+        n = build(args.path, args.seed, args.bits, args.shapes, args.count, args.jobs, progress)
+        print(f"wrote {args.path}: {n} records, {os.path.getsize(args.path)} bytes, "
+              f"{time.perf_counter() - t0:.1f}s")
+        return 0
+
+    import json
+    with Corpus(args.path) as c:
+        if args.cmd == "info":
+            print(f"{args.path}: {len(c)} records of {c.record_size} bytes (width {c.width}), seed {c.seed}")
+            for (bits, shape), ids in sorted(c.index().items(), key=lambda kv: (kv[0][0], SHAPES.index(kv[0][1]))):
+                print(f"  {bits:5d} {shape:12s} {len(ids)}")
+        else:
+            ids = c.select(args.bits, args.shape)[:args.limit]
+            for i in ids:
+                print(json.dumps({k: str(v) if k in ("n", "p", "q") else v for k, v in c[i].as_dict().items()}))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,119 @@
+# factor_pool.py — supervised pool of pre-forked factor workers
+#
+# Replaces "one multiprocessing.Process per request" in app_demo: workers are
+# started once, load their prime table up front and then serve tasks over a
+# pipe.  Each task carries its own deadline (no shared env var).  A worker
+# that runs past its deadline is killed together with any ecm child it
+# started, and a replacement is forked in the background, so the next request
+# never waits for a spawn.
+
+import os, signal, time, queue, threading, multiprocessing as mp
+
+# one pool per gunicorn worker: together they should fill the cores, not each of them
+POOL_SIZE     = int(os.getenv("FACTOR_POOL_SIZE", str(max(1, (os.cpu_count() or 1)
+                                                          // max(1, int(os.getenv("WEB_CONCURRENCY", "1")))))))
+KILL_GRACE_S  = 0.1     # past the task deadline before the worker is killed
+READY_TIMEOUT = 30.0
+RESPAWN_DELAY = 1.0     # after a worker fails to come up
+
+def _worker_main(conn):
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()  # own process group so ecm children die with us
+    from tangent_prime_test import factor, load_prime_table
+    import profiling
+    load_prime_table()
+    factor(1000003 * 1000033)  # warm the code paths once
+    conn.send(("ready", os.getpid()))
+    while True:
+        try:
+            n, max_seconds, profile_mode = conn.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            conn.send(("ok", profiling.run(profile_mode, factor, n, max_seconds=max_seconds)))
+        except Exception as e:
+            conn.send(("err", str(e)))
+
+class _Worker:
+    def __init__(self, ctx):
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_worker_main, args=(child,), daemon=True)
+        self.proc.start()
+        child.close()
+
+    def wait_ready(self):
+        try:
+            return self.conn.poll(READY_TIMEOUT) and self.conn.recv()[0] == "ready"
+        except (EOFError, OSError):
+            return False
+
+    def kill(self):
+        try:
+            if hasattr(os, "killpg"):
+                os.killpg(self.proc.pid, signal.SIGKILL)
+            else:
+                self.proc.kill()
+        except (ProcessLookupError, PermissionError):
+            pass
+        self.proc.join(1)
+        self.conn.close()
+
+class FactorPool:
+    def __init__(self, size=POOL_SIZE):
+        self.size = max(1, int(size))
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+        # forkserver: workers come from a clean single-threaded process, not
+        # from a copy of a gunicorn worker with its request threads
+        methods = mp.get_all_start_methods()
+        self._ctx = mp.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+    def _spawn(self):
+        while True:
+            w = _Worker(self._ctx)
+            if w.wait_ready():
+                self._idle.put(w)
+                return
+            w.kill()
+            time.sleep(RESPAWN_DELAY)
+
+    def _replace(self):
+        threading.Thread(target=self._spawn, daemon=True).start()
+
+    def start(self):
+        with self._lock:
+            if not self._started:
+                self._started = True
+                for _ in range(self.size):
+                    self._replace()
+
+    def run(self, n: int, timeout_ms: int, profile_mode=None):
+        """(factors, None, profile) or (None, "timeout" | "error:...", None).  timeout_ms <= 0
+        means no limit; profile is the worker's profiling.run() result for profile_mode."""
+        self.start()
+        limit = timeout_ms / 1000.0 if timeout_ms and timeout_ms > 0 else None
+        t0 = time.monotonic()
+        while True:
+            left = None if limit is None else limit - (time.monotonic() - t0)
+            if left is not None and left <= 0:
+                return None, "timeout", None
+            try:
+                w = self._idle.get(timeout=left)
+            except queue.Empty:
+                return None, "timeout", None
+            if w.proc.is_alive():
+                break
+            w.kill(); self._replace()
+        left = None if limit is None else max(0.001, limit - (time.monotonic() - t0))
+        try:
+            w.conn.send((n, 0 if left is None else left, profile_mode))
+            if w.conn.poll(None if left is None else left + KILL_GRACE_S):
+                tag, payload = w.conn.recv()
+                self._idle.put(w)
+                return (payload[0], None, payload[1]) if tag == "ok" else (None, "error:" + payload, None)
+            err = "timeout"
+        except (EOFError, OSError) as e:
+            err = "error:worker died (" + e.__class__.__name__ + ")"
+        w.kill(); self._replace()
+        return None, err, None
@@ -1,10 +1,14 @@
 import os, sys; sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
+os.environ.setdefault("TRACE_LOG", "1")  # span logs of real traffic (before rsacrack is imported)
 from flask import Flask, request, jsonify
 from rsacrack.pipeline_smart import factor_smart
 from rsacrack import is_probable_prime
+from rsacrack.tracing import Tracer
 import time
+import rate_limit, metrics, profiling
 
 app = Flask(__name__)
+metrics.init_app(app)
 
 @app.post("/factor")
 def factor_endpoint():
@@ -17,12 +21,23 @@ def factor_endpoint():
     
     time_ms = int(data.get("time_ms", 3000))
     strategy = data.get("strategy", "smart")
+    want_trace = str(data.get("trace", "")).lower() in ("1", "true", "yes")
+    profile_mode = profiling.requested(request, data)
+    limited = rate_limit.limit("smart", n.bit_length(), time_ms)
+    if limited: return limited
     
     # Use the correct parameter name: max_ms
-    res = factor_smart(n, max_ms=time_ms)
+    tracer = Tracer("smart", n)
+    res, profile = profiling.run(profile_mode, factor_smart, n, max_ms=time_ms, tracer=tracer)
+    metrics.record_factor(res["method"] if res else None, time.time() - t0, n.bit_length(), bool(res))
     
     if not res:
-        d = jsonify({"status": "timeout", "n": str(n), "time_ms": time_ms, "strategy": strategy})
+        out = {"status": "timeout", "n": str(n), "time_ms": time_ms, "strategy": strategy}
+        if want_trace:
+            out["trace"] = tracer.to_list()
+        if profile:
+            out["profile"] = profile
+        d = jsonify(out)
         d.headers["X-Compute-ms"] = str(int((time.time()-t0)*1000))
         return d
     
@@ -38,7 +53,7 @@ def factor_endpoint():
         method_val = res['method']
         steps_val = res['steps']
     
-    d = jsonify({
+    out = {
         "status": "ok",
         "n": str(n),
         "p": str(p_val),
@@ -48,6 +63,11 @@ def factor_endpoint():
         "is_p_prime": is_probable_prime(p_val),
         "is_q_prime": is_probable_prime(q_val),
         "strategy": strategy
-    })
+    }
+    if want_trace:
+        out["trace"] = tracer.to_list()
+    if profile:
+        out["profile"] = profile
+    d = jsonify(out)
     d.headers["X-Compute-ms"] = str(int((time.time()-t0)*1000))
     return d
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# import_bench.py — cold-start (import time) budget for every entry point
+#
+# Each entry point is imported in a fresh interpreter with -X importtime,
+# repeated a few times (best run wins), and reported as:
+#   total   — cumulative import time of the entry module
+#   direct  — what each of its direct imports costs (cumulative)
+#   self    — the modules that are slowest on their own
+# --check exits 1 when an entry point is over its budget or fails to import,
+# so CI can catch a heavy import creeping back into module scope.  Budgets are
+# the slowest measured runner's best-of-5 total plus ~40%, so the gate holds
+# on shared CI machines and still trips on a real regression (a numpy, sympy
+# or requests import at module scope costs 100+ ms).
+#
+#   python import_bench.py                 # all entry points
+#   python import_bench.py app asgi --top 5
+#   python import_bench.py --check --json
+
+import os, sys, json, argparse, subprocess
+
+ROOT = os.path.abspath(os.path.dirname(__file__))
+
+# name: (module, extra sys.path entries relative to ROOT, budget ms)
+ENTRY_POINTS = {                                                # measured ms: dev box, slow runner
+    "app":             ("app",             ["."],        450),  # 150, 320: flask + redis + rq
+    "web":             ("app",             ["web", "."], 450),  # 150, 335
+    "app_demo":        ("app_demo",        ["."],        450),  # 135
+    "asgi":            ("asgi_app",        ["."],        200),  # 50, 130: asyncio
+    "factor_server":   ("factor_server",   ["."],        400),  # 115, 290: flask
+    "worker_main":     ("worker_main",     ["."],        30),   # 3 (requests is imported in main)
+    "rho_worker":      ("rho_worker",      ["."],        120),  # 36, 83: gmpy2
+    "rho_workers":     ("rho_workers",     ["."],        50),   # 9
+    "coil_classifier": ("coil_classifier", ["."],        40),   # 7
+    "coil_scanner":    ("coil_scanner",    ["."],        120),  # 31
+}
+
+def _parse(stderr: str):
+    """[(self_us, cumulative_us, depth, name)] from -X importtime output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cum_us, name = line[len("import time:"):].split("|", 2)
+            depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+            rows.append((int(self_us), int(cum_us), depth, name.strip()))
+        except ValueError:
+            pass
+    return rows
+
+def _run(code: str, python: str):
+    p = subprocess.run([python, "-X", "importtime", "-c", code], cwd=ROOT,
+                       capture_output=True, text=True, env=dict(os.environ, PYTHONWARNINGS="ignore"))
+    return p.returncode, _parse(p.stderr), p.stderr
+
+def measure(module: str, paths, python=sys.executable, repeat=3):
+    """Best-of-repeat breakdown of importing module, or {"error": ...}."""
+    code = f"import sys; sys.path[:0] = {[os.path.join(ROOT, p) for p in paths]!r}; import {module}"
+    best = None
+    for _ in range(max(1, repeat)):
+        rc, rows, err = _run(code, python)
+        if rc != 0:
+            return {"error": (err.strip().splitlines() or ["import failed"])[-1]}
+        top = [i for i, r in enumerate(rows) if r[2] == 0 and r[3] == module]
+        if not top:
+            return {"error": f"{module} not found in importtime output"}
+        end = top[-1]
+        # children are listed before their parent; walk back while deeper than 0
+        start = end
+        while start > 0 and rows[start - 1][2] > 0:
+            start -= 1
+        tree = rows[start:end + 1]
+        total = rows[end][1]
+        if best is None or total < best["total_us"]:
+            best = {"total_us": total, "tree": tree}
+    tree = best["tree"]
+    direct = sorted(((r[1], r[3]) for r in tree if r[2] == 1), reverse=True)
+    selfs = sorted(((r[0], r[3]) for r in tree), reverse=True)
+    return {"total_ms": round(best["total_us"] / 1000, 1), "modules": len(tree),
+            "direct": [(n, round(us / 1000, 1)) for us, n in direct],
+            "self": [(n, round(us / 1000, 1)) for us, n in selfs]}
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Import-time (cold start) benchmark per entry point.")
+    ap.add_argument("entries", nargs="*", help=f"subset of: {', '.join(ENTRY_POINTS)}")
+    ap.add_argument("--repeat", type=int, default=3)
+    ap.add_argument("--top", type=int, default=8, help="rows per breakdown")
+    ap.add_argument("--python", default=sys.executable)
+    ap.add_argument("--json", action="store_true")
+    ap.add_argument("--check", action="store_true", help="exit 1 if any entry is over budget or fails to import")
+    args = ap.parse_args(argv)
+
+    names = args.entries or list(ENTRY_POINTS)
+    unknown = [n for n in names if n not in ENTRY_POINTS]
+    if unknown:
+        ap.error(f"unknown entry point(s): {', '.join(unknown)}")
+
+    results, over = {}, []
+    for name in names:
+        module, paths, budget = ENTRY_POINTS[name]
+        r = measure(module, paths, args.python, args.repeat)
+        r["budget_ms"] = budget
+        r["direct"] = r.get("direct", [])[:args.top]
+        r["self"] = r.get("self", [])[:args.top]
+        if "error" in r or r["total_ms"] > budget:
+            over.append(name)
+        results[name] = r
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, r in results.items():
+            if "error" in r:
+                print(f"{name:16s}  ERROR  {r['error']}")
+                continue
+            flag = "  OVER BUDGET" if name in over else ""
+            print(f"{name:16s} {r['total_ms']:8.1f} ms  (budget {r['budget_ms']} ms, {r['modules']} modules){flag}")
+            print("    direct: " + ", ".join(f"{n} {ms}" for n, ms in r["direct"]))
+            print("    self:   " + ", ".join(f"{n} {ms}" for n, ms in r["self"]))
+    return 1 if (args.check and over) else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,461 @@
+#!/usr/bin/env python3
+# loadgen.py — open-loop load test of the Flask + gunicorn + RQ stack
+#
+# Starts the stack locally (gunicorn with the given workers/threads, rho RQ
+# workers, and Redis: REDIS_URL if one answers, else an in-memory fakeredis
+# TCP server), or targets a running one with --url.  fakeredis drops RQ's
+# MULTI/EXEC pipelines, so on it no RQ workers are started and the queue
+# kinds (submit, status) are left out of the mix.  Requests from a weighted
+# mix are fired at a fixed arrival rate regardless of how fast the server
+# answers (open loop), and latency is measured from the scheduled send time,
+# so a slow server shows up as latency instead of a lower offered load.  The
+# whole schedule, numbers included, is drawn before the clock starts.
+#
+# Reported per run: offered and achieved rate, p50/p90/p99/max latency,
+# 2xx/429/4xx/5xx/connection-error rates, and for rho submissions the RQ
+# queue wait (started_at - enqueued_at) of the jobs they created.
+# --saturate steps the rate up until p99 exceeds --slo-ms, errors exceed
+# --max-errors or throughput falls behind the offered rate.
+#
+#   python loadgen.py --rate 20 --duration 30 --mix quick=4,queue=2,submit=1
+#   python loadgen.py --workers 4 --threads 4 --saturate --rate 10 --slo-ms 500
+#   python loadgen.py --url http://127.0.0.1:8000 --rate 50 --json
+#   python loadgen.py --corpus corpus.rsc   # numbers from corpus.py instead of generated
+
+import os, sys, json, time, random, socket, signal, argparse, threading, subprocess
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+ROOT = os.path.abspath(os.path.dirname(__file__))
+sys.path.insert(0, ROOT)
+
+from bench import make_number, percentile
+
+# ------------------ request mix ------------------
+# name -> fn(rng, state) -> (method, path, body bytes or None, content type)
+def _number(rng, st, bits, shape):
+    """A number of the given bucket: from the --corpus file when it has that bucket, else generated."""
+    if st.corpus is not None:
+        ids = st.corpus.index().get((bits, shape))
+        if ids:
+            return st.corpus[rng.choice(ids)].n
+    return make_number(rng, bits, shape)
+
+def _quick(rng, st):
+    return "POST", "/api/quick_factor", json.dumps({"n": str(_number(rng, st, 48, "balanced"))}), "application/json"
+
+def _rho(rng, st):
+    return "POST", "/api/rho", json.dumps({"n": str(_number(rng, st, 56, "balanced")), "it": 200_000}), "application/json"
+
+def _submit(rng, st):
+    n = _number(rng, st, rng.choice((48, 64, 80)), "balanced")
+    return "POST", "/api/rho/submit", json.dumps({"N": str(n), "budget": 500_000}), "application/json"
+
+def _status(rng, st):
+    with st.lock:
+        jid = rng.choice(st.job_ids) if st.job_ids else "none"
+    return "GET", f"/api/job/{jid}", None, None
+
+def _batch(rng, st):
+    lines = [json.dumps({"n": str(_number(rng, st, 40, rng.choice(("balanced", "lopsided", "prime"))))})
+             for _ in range(10)]
+    return "POST", "/api/factor/batch?budget_ms=2000", "\n".join(lines), "application/x-ndjson"
+
+MIX = {
+    "quick":  _quick,
+    "rho":    _rho,
+    "submit": _submit,
+    "status": _status,
+    "queue":  lambda rng, st: ("GET", "/api/queue", None, None),
+    "health": lambda rng, st: ("GET", "/api/health", None, None),
+    "batch":  _batch,
+}
+DEFAULT_MIX = "quick=4,queue=2,health=1,submit=1,status=1"
+RQ_KINDS = ("submit", "status")   # need a real Redis: RQ enqueues in MULTI/EXEC
+LIVE_KINDS = ("status",)          # built at send time: they pick from the jobs submitted so far
+
+def parse_mix(spec: str) -> dict:
+    out = {}
+    for part in spec.split(","):
+        name, _, w = part.partition("=")
+        name = name.strip()
+        if name not in MIX:
+            raise ValueError(f"unknown request type {name!r} (known: {', '.join(MIX)})")
+        out[name] = float(w or 1)
+    return out
+
+# ------------------ local stack ------------------
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _redis_up(url: str) -> bool:
+    try:
+        from redis import Redis
+        Redis.from_url(url, socket_connect_timeout=0.5).ping()
+        return True
+    except Exception:
+        return False
+
+def _fake_redis(port):
+    from fakeredis import TcpFakeServer
+    TcpFakeServer(("127.0.0.1", port), server_type="redis").serve_forever()
+
+class Stack:
+    """gunicorn + rho workers (+ in-memory Redis, and then no rho workers, when none is reachable)."""
+
+    def __init__(self, app="app:app", workers=2, threads=4, rq_workers=2, redis_url=None,
+                 rate_limit=True, log_dir=None):
+        self.app, self.workers, self.threads, self.rq_workers = app, workers, threads, rq_workers
+        self.redis_url, self.rate_limit = redis_url, rate_limit
+        self.log_dir = log_dir
+        self.procs, self.fake = [], None
+        self.url = None
+
+    def _log(self, name):
+        if not self.log_dir:
+            return subprocess.DEVNULL
+        os.makedirs(self.log_dir, exist_ok=True)
+        return open(os.path.join(self.log_dir, name + ".log"), "ab")
+
+    def start(self, health="/api/health", wait_s=60):
+        url = self.redis_url or os.getenv("REDIS_URL", "redis://localhost:6379/0")
+        if not _redis_up(url):
+            # own process: sharing the GIL with the client threads would make Redis the bottleneck
+            import multiprocessing as mp
+            port = _free_port()
+            self.fake = mp.get_context("spawn").Process(target=_fake_redis, args=(port,), daemon=True)
+            self.fake.start()
+            url = f"redis://127.0.0.1:{port}/0"
+            for _ in range(100):
+                if _redis_up(url):
+                    break
+                time.sleep(0.1)
+        self.redis_url = url
+        # loadgen is the one proxy in front: the server keys buckets on the X-Forwarded-For it adds
+        env = dict(os.environ, REDIS_URL=url, TRACE_LOG="0", RL_ENABLED="1" if self.rate_limit else "0",
+                   RL_TRUSTED_PROXIES="1")
+        port = _free_port()
+        self.url = f"http://127.0.0.1:{port}"
+        self.procs.append(subprocess.Popen(
+            ["gunicorn", "-w", str(self.workers), "--threads", str(self.threads), "-b", f"127.0.0.1:{port}",
+             "--timeout", "120", self.app], cwd=ROOT, env=env, stdout=self._log("gunicorn"), stderr=subprocess.STDOUT,
+            start_new_session=True))
+        if self.rq_workers > 0 and self.fake is None:
+            self.procs.append(subprocess.Popen(
+                [sys.executable, "rho_workers.py", "--workers", str(self.rq_workers), "--url", url],
+                cwd=ROOT, env=env, stdout=self._log("rq"), stderr=subprocess.STDOUT, start_new_session=True))
+        deadline = time.monotonic() + wait_s
+        while time.monotonic() < deadline:
+            if self.procs[0].poll() is not None:
+                raise RuntimeError("gunicorn exited during startup (see --log-dir)")
+            try:
+                status, _ = _one_request(self.url, "GET", health, None, None, timeout=2)
+                if status < 500:
+                    return self
+            except OSError:
+                pass
+            time.sleep(0.2)
+        raise RuntimeError(f"{self.url}{health} did not come up within {wait_s}s")
+
+    def stop(self):
+        for p in self.procs:
+            try:
+                os.killpg(p.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for p in self.procs:
+            try:
+                p.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                os.killpg(p.pid, signal.SIGKILL)
+                p.wait()
+        self.procs = []
+        if self.fake is not None:
+            self.fake.terminate()
+            self.fake.join()
+            self.fake = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+# ------------------ client ------------------
+_local = threading.local()
+
+def _conn(base, timeout):
+    c = getattr(_local, "conn", None)
+    if c is None:
+        u = urlsplit(base)
+        cls = http.client.HTTPSConnection if u.scheme == "https" else http.client.HTTPConnection
+        c = _local.conn = cls(u.hostname, u.port, timeout=timeout)
+    return c
+
+def _one_request(base, method, path, body, ctype, timeout=30, headers=None):
+    """(status, body bytes) on a per-thread keep-alive connection; one reconnect on a stale socket."""
+    hdrs = dict(headers or {})
+    if ctype:
+        hdrs["Content-Type"] = ctype
+    for attempt in (0, 1):
+        c = _conn(base, timeout)
+        try:
+            c.request(method, path, body=body.encode() if isinstance(body, str) else body, headers=hdrs)
+            r = c.getresponse()
+            return r.status, r.read()
+        except (http.client.HTTPException, OSError):
+            c.close()
+            _local.conn = None
+            if attempt:
+                raise
+
+class _State:
+    def __init__(self, corpus=None):
+        self.corpus = corpus
+        self.lock = threading.Lock()
+        self.job_ids = []
+        self.samples = []    # (kind, scheduled_t, latency_s, status or None)
+
+def _fire(base, st, kind, req, scheduled, timeout, client_ip):
+    method, path, body, ctype = req
+    try:
+        status, payload = _one_request(base, method, path, body, ctype, timeout,
+                                       headers={"X-Forwarded-For": client_ip} if client_ip else None)
+    except Exception:
+        status, payload = None, b""
+    lat = time.monotonic() - scheduled
+    if kind == "submit" and status == 200:
+        try:
+            jid = json.loads(payload).get("job_id")
+            if jid:
+                with st.lock:
+                    st.job_ids.append(jid)
+        except ValueError:
+            pass
+    with st.lock:
+        st.samples.append((kind, scheduled, lat, status))
+
+def plan_load(rate, duration, mix, rng, st, poisson=True, clients=1000):
+    """[(offset_s, kind, request or None, client ip)] for one run; LIVE_KINDS requests stay None."""
+    names, weights = list(mix), [mix[k] for k in mix]
+    plan, t = [], 0.0
+    while t < duration:
+        kind = rng.choices(names, weights)[0]
+        req = None if kind in LIVE_KINDS else MIX[kind](rng, st)
+        k = rng.randrange(clients) if clients else None
+        plan.append((t, kind, req, None if k is None else f"10.0.{k // 256}.{k % 256}"))
+        t += rng.expovariate(rate) if poisson else 1.0 / rate
+    return plan
+
+def run_load(base, rate, duration, mix, seed=1, poisson=True, clients=1000, concurrency=512, timeout=30.0,
+             corpus=None):
+    """Open-loop run at `rate` req/s for `duration` s; returns the raw _State.
+    corpus: a corpus.Corpus to draw numbers from instead of generating them."""
+    rng = random.Random(seed)
+    st = _State(corpus)
+    plan = plan_load(rate, duration, mix, rng, st, poisson, clients)  # generating numbers is slow: not on the clock
+    pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="loadgen")
+    t0 = time.monotonic()
+    i = 0
+    try:
+        for offset, kind, req, client_ip in plan:
+            t_next = t0 + offset
+            delay = t_next - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            if req is None:
+                req = MIX[kind](rng, st)
+            pool.submit(_fire, base, st, kind, req, t_next, timeout, client_ip)
+            i += 1
+    finally:
+        pool.shutdown(wait=True)  # in-flight requests finish (bounded by timeout)
+    st.offered, st.duration, st.sent = rate, duration, i
+    return st
+
+# ------------------ results ------------------
+def queue_waits(redis_url, job_ids):
+    """RQ wait of submitted jobs: started_at - enqueued_at; still-queued jobs are counted separately."""
+    if not job_ids or not redis_url:
+        return None
+    try:
+        from redis import Redis
+        from rq.job import Job
+        conn = Redis.from_url(redis_url)
+        waits, queued = [], 0
+        now = time.time()
+        for job in Job.fetch_many(job_ids, connection=conn):
+            if job is None or job.enqueued_at is None:
+                continue
+            if job.started_at is None:
+                queued += 1
+                waits.append(now - job.enqueued_at.timestamp())  # lower bound
+            else:
+                waits.append((job.started_at - job.enqueued_at).total_seconds())
+        waits.sort()
+        return {"jobs": len(waits), "still_queued": queued,
+                "p50_s": _r(percentile(waits, 50)), "p90_s": _r(percentile(waits, 90)),
+                "p99_s": _r(percentile(waits, 99)), "max_s": _r(waits[-1] if waits else None)}
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+def _r(v, nd=3):
+    return None if v is None else round(v, nd)
+
+def summarize(st, redis_url=None) -> dict:
+    samples = st.samples
+    done = [s for s in samples if s[3] is not None]
+    lats = sorted(s[2] * 1000.0 for s in done)
+    n = len(samples) or 1
+    classes = {"2xx": 0, "429": 0, "4xx": 0, "5xx": 0, "conn_error": 0}
+    for s in samples:
+        if s[3] is None:
+            classes["conn_error"] += 1
+        elif s[3] == 429:
+            classes["429"] += 1
+        else:
+            classes[f"{s[3] // 100}xx" if s[3] // 100 in (2, 4, 5) else "4xx"] += 1
+    by_kind = {}
+    for kind in sorted({s[0] for s in samples}):
+        kl = sorted(s[2] * 1000.0 for s in samples if s[0] == kind and s[3] is not None)
+        by_kind[kind] = {"count": sum(1 for s in samples if s[0] == kind),
+                         "p50_ms": _r(percentile(kl, 50), 1), "p99_ms": _r(percentile(kl, 99), 1)}
+    last = max((s[1] + s[2] for s in done), default=0)
+    first = min((s[1] for s in samples), default=0)
+    span = max(st.duration, last - first) if samples else st.duration
+    return {
+        "offered_rps": st.offered, "sent": st.sent, "duration_s": st.duration,
+        "achieved_rps": _r(len(done) / span if span else 0.0, 2),
+        "p50_ms": _r(percentile(lats, 50), 1), "p90_ms": _r(percentile(lats, 90), 1),
+        "p99_ms": _r(percentile(lats, 99), 1), "max_ms": _r(lats[-1] if lats else None, 1),
+        "status": classes,
+        "rate_429": _r(classes["429"] / n, 4), "rate_5xx": _r(classes["5xx"] / n, 4),
+        "rate_errors": _r((classes["5xx"] + classes["conn_error"]) / n, 4),
+        "by_kind": by_kind,
+        "queue_wait": queue_waits(redis_url, st.job_ids),
+    }
+
+def saturated(r, slo_ms, max_errors, min_ratio=0.95):
+    """Reason this run is past saturation, or None."""
+    if r["rate_errors"] > max_errors:
+        return f"errors {r['rate_errors']:.1%} > {max_errors:.1%}"
+    if r["p99_ms"] is not None and r["p99_ms"] > slo_ms:
+        return f"p99 {r['p99_ms']:.0f} ms > {slo_ms:.0f} ms"
+    if r["achieved_rps"] < r["offered_rps"] * min_ratio:
+        return f"throughput {r['achieved_rps']:.1f} < {min_ratio:.0%} of {r['offered_rps']:.1f}"
+    return None
+
+def saturate(base, args, mix, redis_url, corpus=None):
+    steps, rate, last_ok = [], args.rate, None
+    while rate <= args.max_rate:
+        st = run_load(base, rate, args.duration, mix, args.seed, not args.uniform, args.clients,
+                      args.concurrency, args.timeout, corpus)
+        r = summarize(st, redis_url)
+        r["saturated"] = saturated(r, args.slo_ms, args.max_errors)
+        steps.append(r)
+        _print_run(r, args.quiet)
+        if r["saturated"]:
+            break
+        last_ok = rate
+        rate = round(rate * args.step, 2)
+        time.sleep(args.cooldown)
+    return {"steps": steps, "saturation_rps": last_ok}
+
+def _print_run(r, quiet=False):
+    if quiet:
+        return
+    s = r["status"]
+    print(f"offered {r['offered_rps']:7.1f}/s  achieved {r['achieved_rps']:7.1f}/s  "
+          f"p50 {r['p50_ms'] or 0:7.1f}  p90 {r['p90_ms'] or 0:7.1f}  p99 {r['p99_ms'] or 0:7.1f}  max {r['max_ms'] or 0:7.1f} ms  "
+          f"2xx {s['2xx']} 429 {s['429']} 4xx {s['4xx']} 5xx {s['5xx']} err {s['conn_error']}"
+          + (f"  SATURATED: {r['saturated']}" if r.get("saturated") else ""), flush=True)
+    qw = r.get("queue_wait")
+    if qw and "error" not in qw:
+        print(f"    queue wait: {qw['jobs']} jobs, p50 {qw['p50_s']}s p99 {qw['p99_s']}s max {qw['max_s']}s "
+              f"({qw['still_queued']} still queued)")
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Open-loop load generator for the rsacrack stack.")
+    ap.add_argument("--url", help="target a running server instead of starting one")
+    ap.add_argument("--redis-url", help="Redis of the target (queue wait); started stacks pick their own")
+    ap.add_argument("--app", default="app:app", help="gunicorn app to start")
+    ap.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    ap.add_argument("--threads", type=int, default=4, help="gunicorn threads per worker")
+    ap.add_argument("--rq-workers", type=int, default=2, help="rho RQ workers (0: none)")
+    ap.add_argument("--no-rate-limit", action="store_true", help="start the app with RL_ENABLED=0")
+    ap.add_argument("--log-dir", help="keep gunicorn/rq output here")
+    ap.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted request types: {', '.join(MIX)}")
+    ap.add_argument("--rate", type=float, default=10.0, help="arrivals per second (start rate with --saturate)")
+    ap.add_argument("--duration", type=float, default=20.0, help="seconds per run / step")
+    ap.add_argument("--uniform", action="store_true", help="fixed gaps instead of Poisson arrivals")
+    ap.add_argument("--clients", type=int, default=1000, help="distinct X-Forwarded-For addresses, <= 65536 (0: none)")
+    ap.add_argument("--concurrency", type=int, default=512, help="max requests in flight")
+    ap.add_argument("--timeout", type=float, default=30.0)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--corpus", metavar="PATH", help="draw numbers from a corpus.py file (buckets 40/48/56/64/80 bits)")
+    ap.add_argument("--saturate", action="store_true", help="step the rate up until saturation")
+    ap.add_argument("--step", type=float, default=1.5, help="rate multiplier per step")
+    ap.add_argument("--max-rate", type=float, default=5000.0)
+    ap.add_argument("--slo-ms", type=float, default=1000.0, help="p99 latency that counts as saturated")
+    ap.add_argument("--max-errors", type=float, default=0.01, help="5xx + connection error fraction")
+    ap.add_argument("--cooldown", type=float, default=2.0, help="seconds between steps")
+    ap.add_argument("--json", action="store_true")
+    ap.add_argument("-q", "--quiet", action="store_true")
+    args = ap.parse_args(argv)
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        ap.error(str(e))
+    corpus = None
+    if args.corpus:
+        from corpus import Corpus
+        try:
+            corpus = Corpus(args.corpus)
+        except (OSError, ValueError) as e:
+            ap.error(str(e))
+
+    stack = None
+    if args.url:
+        base, redis_url = args.url.rstrip("/"), args.redis_url
+    else:
+        stack = Stack(args.app, args.workers, args.threads, args.rq_workers, args.redis_url,
+                      rate_limit=not args.no_rate_limit, log_dir=args.log_dir).start()
+        base, redis_url = stack.url, stack.redis_url
+        if stack.fake is not None:
+            dropped = [k for k in RQ_KINDS if k in mix]
+            mix = {k: w for k, w in mix.items() if k not in RQ_KINDS}
+            if not mix:
+                stack.stop()
+                ap.error(f"--mix {args.mix!r} needs a real Redis (set REDIS_URL or --redis-url)")
+            if dropped:
+                print(f"no Redis reachable: running on fakeredis without rq workers, "
+                      f"dropped {', '.join(dropped)} from the mix", file=sys.stderr, flush=True)
+        if not args.quiet:
+            print(f"stack: {base} gunicorn -w {args.workers} --threads {args.threads}, "
+                  f"{args.rq_workers if stack.fake is None else 0} rq workers, redis {redis_url}", flush=True)
+    try:
+        if args.saturate:
+            out = saturate(base, args, mix, redis_url, corpus)
+            if not args.quiet:
+                print(f"saturation ≈ {out['saturation_rps']} req/s"
+                      if out["saturation_rps"] else "saturated at the start rate")
+        else:
+            st = run_load(base, args.rate, args.duration, mix, args.seed, not args.uniform, args.clients,
+                          args.concurrency, args.timeout, corpus)
+            out = summarize(st, redis_url)
+            _print_run(out, args.quiet or args.json)
+        out["config"] = {"url": base, "workers": args.workers, "threads": args.threads,
+                         "rq_workers": args.rq_workers, "mix": mix, "started_stack": stack is not None}
+        if args.json:
+            print(json.dumps(out, indent=2))
+    finally:
+        if stack is not None:
+            stack.stop()
+        if corpus is not None:
+            corpus.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,6 @@
 #!/usr/bin/env python3
 
 import math
-import matplotlib.pyplot as plt
-import numpy as np
 
 def is_prime(n: int) -> bool:
     """Check if n is prime."""
@@ -19,6 +17,7 @@ def is_prime(n: int) -> bool:
 
 def generate_coil(limit=200, step=1):
     """Generate coordinates of the number coil (spiral)."""
+    import numpy as np
     t = np.linspace(0, limit, limit*10)
     x = t * np.cos(step * t)
     y = t * np.sin(step * t)
@@ -26,6 +25,7 @@ def generate_coil(limit=200, step=1):
 
 def plot_primes(limit=200):
     """Overlay primes as dots on the number coil."""
+    import matplotlib.pyplot as plt
     x, y = generate_coil(limit)
     plt.figure(figsize=(8,8))
     plt.plot(x, y, alpha=0.3, label="All Numbers Coil")
@@ -0,0 +1,238 @@
+# metrics.py — Prometheus text-format metrics shared by every process
+#
+# Each process (gunicorn worker, ASGI pool process, RQ worker) aggregates
+# counters and histograms in memory and adds them to one Redis hash
+# (HINCRBYFLOAT, atomic) at most every METRICS_FLUSH_S, so the numbers are
+# the sum over all processes and hosts and survive worker restarts.  Queue
+# and worker gauges are read from Redis when /metrics is scraped.  Nothing
+# here may fail a request: Redis errors keep the data for the next flush.
+
+import os, time, atexit, threading
+
+KEY        = "rsacrack:metrics"
+FLUSH_S    = float(os.getenv("METRICS_FLUSH_S", "5"))
+ENABLED    = os.getenv("METRICS_ENABLED", "1") not in ("0", "false", "no")
+BUCKETS    = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 1800, 7200)
+BIT_CLASSES = (32, 64, 96, 128, 192, 256, 384, 512)
+
+# name -> (type, help)
+METRICS = {
+    "rsacrack_http_request_seconds":       ("histogram", "Request latency by route and status class."),
+    "rsacrack_factor_seconds":             ("histogram", "Factoring time by winning method."),
+    "rsacrack_factor_total":               ("counter",   "Factoring attempts by bit-length class and outcome."),
+    "rsacrack_ecm_subprocess_total":       ("counter",   "gmp-ecm subprocess runs by outcome."),
+    "rsacrack_ecm_subprocess_seconds":     ("histogram", "gmp-ecm subprocess wall time."),
+    "rsacrack_rq_jobs_total":              ("counter",   "RQ jobs finished by queue class and outcome."),
+    "rsacrack_worker_busy_seconds_total":  ("counter",   "Seconds RQ workers spent running jobs, by queue class."),
+    "rsacrack_queue_wait_seconds":         ("histogram", "Observed RQ queue wait (started_at - enqueued_at) by queue class."),
+    "rsacrack_queue_depth":                ("gauge",     "Jobs waiting per queue."),
+    "rsacrack_queue_wait_estimate_seconds": ("gauge",    "Estimated wait for a job submitted now, per size class."),
+    "rsacrack_workers":                    ("gauge",     "RQ workers by state."),
+    "rsacrack_worker_busy_ratio":          ("gauge",     "Fraction of RQ workers running a job."),
+    "rsacrack_metrics_store_up":           ("gauge",     "1 if the shared Redis store was readable for this scrape."),
+}
+
+# method strings used around the code base -> one label value each
+_METHODS = (
+    ("trial", "trial"), ("fermat", "fermat"), ("hart", "fermat"), ("p+1", "p+1"), ("p-1", "p-1"),
+    ("squfof", "squfof"), ("sqfof", "squfof"), ("ecm", "ecm"), ("lotto", "lotto"),
+    ("rho", "rho-brent"), ("prime", "prime-test"),
+)
+
+def method_label(method) -> str:
+    m = str(method or "").lower().replace("trial+", "")  # "trial+rho": rho won
+    for key, label in _METHODS:
+        if key in m:
+            return label
+    return "none" if not m else "other"
+
+def bits_label(bits: int) -> str:
+    for b in BIT_CLASSES:
+        if bits <= b:
+            return f"le{b}"
+    return f"gt{BIT_CLASSES[-1]}"
+
+# ------------------ in-process aggregation ------------------
+_lock = threading.Lock()
+_pending = {}          # exposition line key -> increment
+_last_flush = time.monotonic()
+
+def _series(name, labels, **extra):
+    items = dict(labels, **extra)
+    if not items:
+        return name
+    return name + "{" + ",".join(f'{k}="{items[k]}"' for k in sorted(items)) + "}"
+
+def _add(key, v):
+    _pending[key] = _pending.get(key, 0.0) + v
+
+def inc(name, value=1.0, **labels):
+    if not ENABLED:
+        return
+    with _lock:
+        _add(_series(name, labels), float(value))
+    maybe_flush()
+
+def observe(name, seconds, **labels):
+    """Histogram sample; buckets are stored cumulative, as exposed."""
+    if not ENABLED:
+        return
+    with _lock:
+        for le in BUCKETS:  # every bucket exists, even at 0
+            _add(_series(name + "_bucket", labels, le=le), 1.0 if seconds <= le else 0.0)
+        _add(_series(name + "_bucket", labels, le="+Inf"), 1.0)
+        _add(_series(name + "_sum", labels), float(seconds))
+        _add(_series(name + "_count", labels), 1.0)
+    maybe_flush()
+
+def flush(conn=None):
+    global _pending, _last_flush
+    with _lock:
+        batch, _pending = _pending, {}
+        _last_flush = time.monotonic()
+    if not batch:
+        return
+    try:
+        if conn is None:
+            from redis_client import get_redis
+            conn = get_redis(socket_timeout=0.25, socket_connect_timeout=0.25)
+        pipe = conn.pipeline(transaction=False)
+        for k, v in batch.items():
+            pipe.hincrbyfloat(KEY, k, v)
+        pipe.execute()
+    except Exception:
+        with _lock:
+            for k, v in batch.items():
+                _add(k, v)
+
+def maybe_flush():
+    if time.monotonic() - _last_flush >= FLUSH_S:
+        flush()
+
+atexit.register(flush)
+
+# ------------------ recording helpers ------------------
+def record_factor(method, seconds, bits, success=True):
+    observe("rsacrack_factor_seconds", seconds, method=method_label(method) if success else "none")
+    inc("rsacrack_factor_total", bits=bits_label(bits), outcome="ok" if success else "fail")
+
+def run_ecm_counted(run_ecm, n, **kwargs):
+    """run_ecm(n, **kwargs) with its subprocess counted by outcome."""
+    t0 = time.perf_counter()
+    f, log = run_ecm(n, **kwargs)
+    log_s = str(log or "")
+    if f:
+        outcome = "found"
+    elif log_s == "ecm not installed":
+        outcome = "unavailable"
+    elif log_s == "ECM timeout":
+        outcome = "timeout"
+    else:
+        outcome = "none"
+    inc("rsacrack_ecm_subprocess_total", outcome=outcome)
+    if outcome != "unavailable":
+        observe("rsacrack_ecm_subprocess_seconds", time.perf_counter() - t0)
+    return f, log
+
+def record_queue_wait(queue_class, seconds):
+    observe("rsacrack_queue_wait_seconds", max(0.0, seconds), queue_class=queue_class)
+
+def record_job(queue_class, seconds, outcome):
+    inc("rsacrack_rq_jobs_total", queue_class=queue_class, outcome=outcome)
+    inc("rsacrack_worker_busy_seconds_total", seconds, queue_class=queue_class)
+    flush()  # jobs are rare and long; don't sit on the numbers
+
+# ------------------ exposition ------------------
+def _gauges(conn):
+    """Current queue/worker gauges as {series: value}."""
+    import rho_queues
+    from rq import Worker
+    out = {}
+    avg = rho_queues.ewma(conn)
+    for cls, q in rho_queues.queues(conn).items():
+        depth = conn.llen(q.key)
+        out[_series("rsacrack_queue_depth", {"queue": q.name})] = depth
+        out[_series("rsacrack_queue_wait_estimate_seconds", {"queue_class": cls})] = \
+            rho_queues.wait_estimate(conn, cls, depth + 1, avg) or 0.0
+    legacy = rho_queues.legacy_queue(conn)
+    out[_series("rsacrack_queue_depth", {"queue": legacy.name})] = conn.llen(legacy.key)
+    states = {"busy": 0, "idle": 0, "other": 0}
+    for w in Worker.all(connection=conn):
+        st = w.get_state()
+        states[st if st in ("busy", "idle") else "other"] += 1
+    for st, c in states.items():
+        out[_series("rsacrack_workers", {"state": st})] = c
+    total = sum(states.values())
+    out["rsacrack_worker_busy_ratio"] = states["busy"] / total if total else 0.0
+    return out
+
+def _fmt(v):
+    v = float(v)
+    return str(int(v)) if v.is_integer() else repr(v)
+
+def render(conn=None) -> str:
+    """Text exposition format (version 0.0.4)."""
+    try:
+        if conn is None:
+            from redis_client import get_redis
+            conn = get_redis(socket_timeout=1.0, socket_connect_timeout=0.5)
+        flush(conn)
+        series = {k.decode() if isinstance(k, bytes) else k: float(v) for k, v in conn.hgetall(KEY).items()}
+        series["rsacrack_metrics_store_up"] = 1
+    except Exception:
+        # Redis down: at least show what this process has not flushed yet
+        with _lock:
+            series = dict(_pending)
+        series["rsacrack_metrics_store_up"] = 0
+        conn = None
+    if conn is not None:
+        try:
+            series.update(_gauges(conn))
+        except Exception:
+            pass
+    by_name = {}
+    for s, v in series.items():
+        base = s.split("{", 1)[0]
+        for suffix in ("_bucket", "_sum", "_count"):
+            if base.endswith(suffix) and base[:-len(suffix)] in METRICS:
+                base = base[:-len(suffix)]
+        by_name.setdefault(base, []).append((s, v))
+    lines = []
+    for name in sorted(by_name):
+        kind, help_ = METRICS.get(name, ("untyped", ""))
+        lines += [f"# HELP {name} {help_}", f"# TYPE {name} {kind}"]
+        lines += [f"{s} {_fmt(v)}" for s, v in sorted(by_name[name], key=_sort_key)]
+    return "\n".join(lines) + "\n"
+
+def _sort_key(item):
+    # histogram buckets in numeric le order, next to their sum/count
+    s = item[0]
+    i = s.find('le="')
+    if i < 0:
+        return (s, 0.0)
+    j = s.index('"', i + 4)
+    le = s[i + 4:j]
+    return (s[:i] + s[j + 1:], float("inf") if le == "+Inf" else float(le))
+
+# ------------------ Flask glue ------------------
+def init_app(app):
+    """Time every request by route template and status class; adds GET /metrics."""
+    from flask import request, g, Response
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_t0 = time.perf_counter()
+
+    @app.after_request
+    def _metrics_stop(resp):
+        t0 = g.pop("_metrics_t0", None)
+        if t0 is not None and request.endpoint != "metrics":
+            route = request.url_rule.rule if request.url_rule is not None else "unmatched"
+            observe("rsacrack_http_request_seconds", time.perf_counter() - t0,
+                    route=route, method=request.method, status=f"{resp.status_code // 100}xx")
+        return resp
+
+    if "metrics" not in app.view_functions:
+        app.add_url_rule("/metrics", endpoint="metrics",
+                         view_func=lambda: Response(render(), mimetype="text/plain; version=0.0.4"))
+    return app
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+# profiling.py — on-demand profiles of factoring requests and slow RQ jobs
+#
+# Two modes:
+#   sample    — a thread samples the profiled thread's Python stack every
+#               PROFILE_INTERVAL_MS (low overhead, safe on long jobs)
+#   cprofile  — deterministic cProfile, one profile per engine stage
+# Samples and calls are grouped by the engine stage active at the time
+# (rsacrack.tracing spans, JobProgress.stage in RQ jobs).  A profile is
+# {"mode", "wall_s", "stages": {stage: {"seconds", "top": [...]}}, "collapsed"}
+# where "collapsed" is the collapsed-stack text (stage;frame;frame N) that
+# flamegraph.pl / speedscope read directly.
+#
+# Requests: admin only — ?profile=1 (or "profile": "cprofile" in the JSON
+# body) plus an X-Admin-Token header equal to ADMIN_TOKEN.  Profiling is off
+# when ADMIN_TOKEN is unset.
+# RQ jobs: the sampler starts once a job has run RHO_PROFILE_SLOW_S (0
+# disables), so fast jobs are never sampled; what it saw from then on is
+# stored in job.meta["profile"].
+#
+#   python profiling.py job <job_id> -o job.folded      # export a job's stacks
+#   flamegraph.pl job.folded > job.svg
+
+import os, sys, time, hmac, threading
+
+ADMIN_TOKEN    = os.getenv("ADMIN_TOKEN", "")
+INTERVAL_MS    = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+TOP_N          = int(os.getenv("PROFILE_TOP", "25"))
+MAX_STACKS     = 2000      # collapsed lines kept (heaviest first); keeps job.meta small
+JOB_SLOW_S     = float(os.getenv("RHO_PROFILE_SLOW_S", "30"))
+MODES          = ("sample", "cprofile")
+NO_STAGE       = "-"
+
+def is_admin(token) -> bool:
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(str(token or ""), ADMIN_TOKEN)
+
+def requested(request, data=None):
+    """Profiler mode asked for by an admin request, else None."""
+    raw = request.args.get("profile")
+    if raw is None and data is not None:
+        raw = data.get("profile")
+    raw = str(raw or "").lower()
+    if raw in ("", "0", "false", "no") or not is_admin(request.headers.get("X-Admin-Token")):
+        return None
+    return raw if raw in MODES else "sample"
+
+def _frame_name(code) -> str:
+    mod = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{mod}:{code.co_name}"
+
+def _stage_name(stage) -> str:
+    return f"[{stage or NO_STAGE}]"
+
+class Profile:
+    """Context manager profiling the calling thread."""
+
+    def __init__(self, mode="sample", interval_ms=INTERVAL_MS, delay_s=0.0):
+        if mode not in MODES:
+            raise ValueError(f"unknown profile mode {mode!r}")
+        if delay_s and mode != "sample":
+            raise ValueError("delay_s needs mode 'sample'")
+        self.mode, self.interval = mode, max(0.5, float(interval_ms)) / 1000.0
+        self.delay = max(0.0, float(delay_s))   # sampling starts this long after start()
+        self.tid = threading.get_ident()
+        self.wall_s = 0.0
+        # sample mode
+        self._stacks = {}          # (stage, frame, ...) -> samples
+        self._stop = threading.Event()
+        self._thread = None
+        self._root = None
+        # cprofile mode
+        self._profiles = {}        # stage -> cProfile.Profile
+        self._active = None
+
+    # ---------- sampling ----------
+    def _sample_loop(self):
+        from rsacrack.tracing import current_stage
+        if self.delay and self._stop.wait(self.delay):
+            return
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.tid)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and frame is not self._root:  # frames above the profiled call are noise
+                stack.append(_frame_name(frame.f_code))
+                frame = frame.f_back
+            stack.reverse()
+            key = (current_stage(self.tid),) + tuple(stack)
+            self._stacks[key] = self._stacks.get(key, 0) + 1
+
+    # ---------- deterministic ----------
+    def _switch(self, stage):
+        import cProfile
+        if self._active is not None:
+            self._active.disable()
+        prof = self._profiles.get(stage)
+        if prof is None:
+            prof = self._profiles[stage] = cProfile.Profile()
+        self._active = prof
+        prof.enable()
+
+    def __enter__(self):
+        return self.start(sys._getframe(1))
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+    def start(self, root=None):
+        """Start profiling; stacks are cut at the frame root (the caller of the profiled code)."""
+        from rsacrack import tracing
+        self._t0 = time.perf_counter()
+        self._root = root
+        if self.mode == "sample":
+            self._thread = threading.Thread(target=self._sample_loop, name="profile-sampler", daemon=True)
+            self._thread.start()
+        else:
+            tracing._stage_hooks[self.tid] = self._switch
+            self._switch(tracing.current_stage())
+        return self
+
+    def stop(self):
+        from rsacrack import tracing
+        if self.mode == "sample":
+            self._stop.set()
+            self._thread.join()
+        else:
+            tracing._stage_hooks.pop(self.tid, None)
+            if self._active is not None:
+                self._active.disable()
+                self._active = None
+        self.wall_s = time.perf_counter() - self._t0
+        self._root = None
+
+    # ---------- output ----------
+    def _sample_result(self, top):
+        stages = {}
+        for (stage, *frames), count in self._stacks.items():
+            st = stages.setdefault(stage or NO_STAGE, {"samples": 0, "cum": {}, "self": {}})
+            st["samples"] += count
+            for f in set(frames):
+                st["cum"][f] = st["cum"].get(f, 0) + count
+            if frames:
+                st["self"][frames[-1]] = st["self"].get(frames[-1], 0) + count
+        # samples are late while the profiled thread holds the GIL; spread the
+        # measured wall time over them instead of trusting the nominal interval
+        total = sum(st["samples"] for st in stages.values())
+        unit = max(0.0, self.wall_s - self.delay) / total if total else self.interval
+        out = {}
+        for stage, st in stages.items():
+            fns = sorted(st["cum"], key=lambda f: (-st["cum"][f], f))[:top]
+            out[stage] = {
+                "seconds": round(st["samples"] * unit, 4),
+                "samples": st["samples"],
+                "top": [{"function": f, "cum_s": round(st["cum"][f] * unit, 4),
+                         "self_s": round(st["self"].get(f, 0) * unit, 4)} for f in fns],
+            }
+        lines = sorted(((";".join((_stage_name(k[0]),) + k[1:]), c) for k, c in self._stacks.items()),
+                       key=lambda x: -x[1])
+        return out, lines
+
+    def _cprofile_result(self, top):
+        import pstats
+        out, lines = {}, []
+        for stage, prof in self._profiles.items():
+            stats = pstats.Stats(prof).stats  # (file, line, fn) -> (cc, nc, tt, ct, callers)
+            if not stats:
+                continue
+            name = lambda k: f"{os.path.splitext(os.path.basename(k[0]))[0]}:{k[2]}"
+            total = sum(v[2] for v in stats.values())
+            rows = sorted(stats.items(), key=lambda kv: -kv[1][3])[:top]
+            out[stage or NO_STAGE] = {
+                "seconds": round(total, 4),
+                "top": [{"function": name(k), "cum_s": round(v[3], 4), "self_s": round(v[2], 4), "calls": v[1]}
+                        for k, v in rows],
+            }
+            # cProfile keeps caller -> callee edges only, so stacks are two frames deep
+            for k, (cc, nc, tt, ct, callers) in stats.items():
+                if callers:
+                    for ck, cv in callers.items():
+                        us = int(cv[2] * 1e6)
+                        if us:
+                            lines.append((f"{_stage_name(stage)};{name(ck)};{name(k)}", us))
+                elif int(tt * 1e6):
+                    lines.append((f"{_stage_name(stage)};{name(k)}", int(tt * 1e6)))
+        lines.sort(key=lambda x: -x[1])
+        return out, lines
+
+    def result(self, top=TOP_N) -> dict:
+        stages, lines = (self._sample_result if self.mode == "sample" else self._cprofile_result)(top)
+        res = {"mode": self.mode, "wall_s": round(self.wall_s, 4), "stages": stages,
+               "collapsed": "\n".join(f"{s} {c}" for s, c in lines[:MAX_STACKS])}
+        if self.mode == "sample":
+            res["interval_ms"] = self.interval * 1000
+            if self.delay:
+                res["delay_s"] = self.delay
+            res["unit"] = "samples"
+        else:
+            res["unit"] = "microseconds"
+        return res
+
+def run(mode, fn, *args, **kwargs):
+    """(fn(*args, **kwargs), profile dict or None); mode None runs fn unprofiled."""
+    if not mode:
+        return fn(*args, **kwargs), None
+    with Profile(mode) as prof:
+        res = fn(*args, **kwargs)
+    return res, prof.result()
+
+def write_collapsed(profile: dict, path: str) -> None:
+    with open(path, "w") as fh:
+        fh.write(profile.get("collapsed", "") + "\n")
+
+# ------------------ RQ jobs ------------------
+class JobProfile:
+    """Samples an RQ job past its first JOB_SLOW_S; keeps that profile in job.meta."""
+
+    def __init__(self, job):
+        self.job = job
+        self.prof = Profile("sample", delay_s=JOB_SLOW_S) if (job is not None and JOB_SLOW_S > 0) else None
+
+    def __enter__(self):
+        if self.prof is not None:
+            self.prof.start(sys._getframe(1))
+        return self
+
+    def __exit__(self, *exc):
+        if self.prof is None:
+            return False
+        self.prof.stop()
+        if self.prof.wall_s >= JOB_SLOW_S:
+            try:
+                self.job.meta["profile"] = self.prof.result()
+                self.job.save_meta()
+            except Exception:
+                pass  # profiling must never fail the job
+        return False
+
+def main(argv=None):
+    import argparse, json
+    ap = argparse.ArgumentParser(description="Export profiles stored by RQ jobs.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    j = sub.add_parser("job", help="profile of a slow RQ job (job.meta['profile'])")
+    j.add_argument("job_id")
+    j.add_argument("-o", "--out", help="write collapsed stacks here (default: print the summary JSON)")
+    args = ap.parse_args(argv)
+
+    from rq.job import Job
+    from redis_client import get_redis
+    job = Job.fetch(args.job_id, connection=get_redis())
+    prof = job.get_meta(refresh=True).get("profile")
+    if not prof:
+        print(f"job {args.job_id} has no profile (ran < {JOB_SLOW_S:g}s?)", file=sys.stderr)
+        return 1
+    if args.out:
+        write_collapsed(prof, args.out)
+        print(f"wrote {args.out} ({prof['collapsed'].count(chr(10)) + 1} stacks, {prof['wall_s']}s)")
+    else:
+        print(json.dumps({k: v for k, v in prof.items() if k != "collapsed"}, indent=2))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
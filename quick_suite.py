@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
-import csv, json, random, urllib.request, urllib.parse, time
+import os, csv, json, random, urllib.request, urllib.parse, time
 from math import log10
 
-BASE = "https://rsacrack.com"
+# live-server suite; offline, in-process numbers come from bench.py
+BASE = os.getenv("RSACRACK_URL", "http://127.0.0.1:8080").rstrip("/")
 UA   = {"User-Agent": "rsacrack-quick-suite"}
 TIMEOUT = 12
 
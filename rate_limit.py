@@ -0,0 +1,109 @@
+# rate_limit.py — cost-weighted token bucket shared through Redis
+#
+# Every client IP has one bucket (rl:<ip>) holding up to RL_BURST units and
+# refilled at RL_RATE units per second; a unit is roughly one millisecond of
+# CPU.  A request is charged what it is expected to cost (estimate_cost), so a
+# 64-bit lotto call takes a few units and a 512-bit, 50M-iteration rho job
+# empties the bucket.  A job dearer than the whole bucket is let in only when
+# the bucket is full and leaves it in debt for the rest of its cost, so a
+# multi-hour job locks the client out for about as long as it runs.  The
+# check-and-charge is one Lua script, so all gunicorn workers and nodes share
+# the same budget.  If Redis is unreachable the limiter lets requests through
+# rather than taking the site down with it.
+#
+# The client is the peer address, or with RL_TRUSTED_PROXIES=k (k reverse
+# proxies in front, each appending to X-Forwarded-For) the k-th address from
+# the right of that header; entries further left are whatever the client sent.
+
+import os, time, math
+
+RATE    = float(os.getenv("RL_RATE", "1000"))     # units/s: one core-second per second
+BURST   = float(os.getenv("RL_BURST", "60000"))   # units: one core-minute
+ENABLED = os.getenv("RL_ENABLED", "1") not in ("0", "false", "no")
+TRUSTED_PROXIES = int(os.getenv("RL_TRUSTED_PROXIES", "0"))
+
+BASE_COST = 5.0               # parsing, primality test, JSON
+DEFAULT_BUDGET_MS = {         # when the caller gave no budget
+    "lotto": 700, "quick": 3000, "factor": 10000, "smart": 10000, "ecm": 30000,
+}
+RHO_NS_PER_ITER_64 = 1000.0   # pure-Python rho step at 64 bits
+
+def rho_cost_ms(bits: int, iters: int) -> float:
+    """Predicted CPU time of iters rho steps on a bits-bit modulus (uncapped)."""
+    return iters * RHO_NS_PER_ITER_64 * max(1.0, bits / 64.0) ** 2 / 1e6
+
+def estimate_cost(method: str, bits: int, budget_ms: float | None = None, iters: int | None = None) -> float:
+    """Expected CPU cost in milliseconds (may exceed BURST; see charge()).
+
+    Iteration-bound methods (rho) scale with iters and roughly bits^2 (bigint
+    multiply); time-bound ones cost their budget.  budget_ms <= 0 means "no
+    limit", which the worker timeout bounds, and is charged a full bucket.
+    """
+    if iters is not None:
+        cost = rho_cost_ms(bits, iters)
+    else:
+        if budget_ms is None:
+            budget_ms = DEFAULT_BUDGET_MS.get(method, 1000)
+        cost = budget_ms if budget_ms > 0 else BURST
+    return BASE_COST + cost
+
+# KEYS[1]=bucket  ARGV: capacity, rate, cost, now  -> {allowed, tokens, retry_after_s}
+# cost > capacity needs a full bucket and leaves tokens negative (debt repaid at rate)
+_BUCKET_LUA = """
+local cap, rate, cost, now = tonumber(ARGV[1]), tonumber(ARGV[2]), tonumber(ARGV[3]), tonumber(ARGV[4])
+local b = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(b[1]) or cap
+local ts = tonumber(b[2]) or now
+tokens = math.min(cap, tokens + math.max(0, now - ts) * rate)
+local need = math.min(cost, cap)
+local ok, wait = 0, 0
+if tokens >= need then
+  tokens = tokens - cost
+  ok = 1
+else
+  wait = (need - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((cap - tokens) / rate * 1000) + 1000)
+return {ok, tostring(tokens), tostring(wait)}
+"""
+
+def _redis():
+    # short timeouts: a slow Redis must not stall every request
+    from redis_client import get_redis
+    return get_redis(socket_timeout=0.25, socket_connect_timeout=0.25)
+
+def charge(key: str, cost: float, conn=None):
+    """(allowed, retry_after_s, tokens_left); fails open on Redis errors."""
+    if not ENABLED:
+        return True, 0, None
+    try:
+        conn = conn or _redis()
+        ok, tokens, wait = conn.register_script(_BUCKET_LUA)(
+            keys=[f"rl:{key}"], args=[BURST, RATE, cost, time.time()])
+        return bool(int(ok)), int(math.ceil(float(wait))), float(tokens)
+    except Exception:
+        return True, 0, None
+
+def client_addr(remote: str | None, xff: str = "") -> str:
+    """Client address: the peer, or the hop the RL_TRUSTED_PROXIES-th trusted proxy saw."""
+    if TRUSTED_PROXIES > 0 and xff:
+        hops = [h.strip() for h in xff.split(",") if h.strip()]
+        if len(hops) >= TRUSTED_PROXIES:
+            return hops[-TRUSTED_PROXIES]
+    return remote or "-"
+
+# ------------------ Flask glue ------------------
+def client_ip(request) -> str:
+    return client_addr(request.remote_addr, request.headers.get("X-Forwarded-For", ""))
+
+def limit(method: str, bits: int, budget_ms=None, iters=None):
+    """None if the current request may run, else a 429 response to return."""
+    from flask import request, jsonify
+    ok, retry, _ = charge(client_ip(request), estimate_cost(method, bits, budget_ms, iters))
+    if ok:
+        return None
+    resp = jsonify({"error": "too many requests", "retry_after": retry})
+    resp.status_code = 429
+    resp.headers["Retry-After"] = str(max(1, retry))
+    return resp
@@ -0,0 +1,21 @@
+# redis_client.py — one lazily created Redis client per process
+#
+# Importing redis/rq costs ~100 ms, which every gunicorn worker and container
+# cold start used to pay at import time even for routes that never touch the
+# queue.  get_redis() imports and connects on first use instead, and makes a
+# fresh client after a fork so processes never share sockets.
+
+import os
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+
+_clients = {}
+
+def get_redis(**kwargs):
+    """Shared client for REDIS_URL; kwargs (e.g. socket_timeout) select a separate one."""
+    key = (os.getpid(), tuple(sorted(kwargs.items())))
+    conn = _clients.get(key)
+    if conn is None:
+        from redis import Redis
+        conn = _clients[key] = Redis.from_url(REDIS_URL, **kwargs)
+    return conn
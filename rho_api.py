@@ -1,17 +1,29 @@
-import os, time
+import time, uuid
 from datetime import datetime
-from flask import Blueprint, request, jsonify, Response
-from redis import Redis
-from rq import Queue
-from rq.job import Job
-from rq.exceptions import NoSuchJobError
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+
+import rho_events, rho_index, rho_snapshot, rho_queues, rate_limit
+from redis_client import get_redis
 
 rho_bp = Blueprint("rho_bp", __name__)
 
-# Redis / RQ
-redis_url = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-redis_conn = Redis.from_url(redis_url)
-rho_q = Queue("rho", connection=redis_conn, default_timeout=60*60*12)  # 12h
+# Redis / RQ: imported and connected on first use, not when the app loads
+def _redis():
+    return get_redis()
+
+def _queues():
+    return rho_queues.queues(_redis())          # small / medium / large
+
+def _legacy_queue():
+    return rho_queues.legacy_queue(_redis())    # pre-split "rho" queue, still drained
+
+def _fetch(job_id):
+    from rq.job import Job
+    from rq.exceptions import NoSuchJobError
+    try:
+        return Job.fetch(job_id, connection=_redis())
+    except NoSuchJobError:
+        return None
 
 # ------------------ helpers ------------------
 def _age_secs(dt: datetime | None) -> float | None:
@@ -19,7 +31,7 @@ def _age_secs(dt: datetime | None) -> float | None:
         return None
     return max(0.0, time.time() - dt.timestamp())
 
-def _job_dict(job: Job) -> dict:
+def _job_dict(job: "Job") -> dict:
     d = {
         "job_id": job.id,
         "status": job.get_status(),
@@ -42,42 +54,53 @@ def _job_dict(job: Job) -> dict:
         pass
     return d
 
+def _all_queues():
+    return list(_queues().values()) + [_legacy_queue()]
+
+def _queue_place(job: "Job") -> dict:
+    """Per-class position and wait estimate of a queued job."""
+    cls = rho_queues.class_of(job.origin or "")
+    if cls is None or job.get_status() != "queued":
+        return {}
+    pos = rho_snapshot.position(_redis(), _queues()[cls], job.id)
+    return {"queue_class": cls, "queue_position": pos,
+            "wait_estimate_s": rho_queues.wait_estimate(_redis(), cls, pos)}
+
 def ip_can_start(ip: str) -> bool:
-    """Allow only one active (queued or started) job per IP."""
+    """True if ip is below its active-job limit (read-only; submit reserves atomically)."""
     try:
-        for jid in rho_q.started_job_registry.get_job_ids():
-            j = Job.fetch(jid, connection=redis_conn)
-            if (j.meta or {}).get("ip") == ip:
-                return False
-        for jid in rho_q.get_job_ids():
-            j = Job.fetch(jid, connection=redis_conn)
-            if (j.meta or {}).get("ip") == ip:
-                return False
+        return rho_index.active_count(_redis(), ip) < rho_index.MAX_ACTIVE_PER_IP
     except Exception:
-        pass
-    return True
+        return True
 
 # ------------------ API ------------------
 @rho_bp.get("/api/health")
 def health():
     ok, msg = True, "ok"
     try:
-        redis_conn.ping()
+        _redis().ping()
     except Exception as e:
         ok, msg = False, f"redis error: {e.__class__.__name__}"
-    return jsonify({"ok": ok, "msg": msg, "queue": {"name": rho_q.name, "size": rho_q.count}, "time": int(time.time())})
+    try:
+        size = sum(rho_snapshot.snapshot(_redis(), q)["size"] for q in _all_queues()) if ok else None
+    except Exception:
+        size = None
+    return jsonify({"ok": ok, "msg": msg, "queue": {"name": "rho", "size": size}, "time": int(time.time())})
 
 @rho_bp.get("/api/queue")
 def queue_info():
-    ids = rho_q.get_job_ids()
-    head = ids[:10]
-    def age(jid):
-        try:
-            j = Job.fetch(jid, connection=redis_conn)
-            return _age_secs(j.enqueued_at)
-        except Exception:
-            return None
-    return jsonify({"queue": rho_q.name, "size": len(ids), "head": [{"job_id": jid, "age_sec": age(jid)} for jid in head]})
+    avg = rho_queues.ewma(_redis())
+    classes, head = {}, []
+    for cls, q in _queues().items():
+        snap = rho_snapshot.snapshot(_redis(), q)
+        snap.update(queue=q.name, avg_run_s=round(avg[cls], 2),
+                    wait_estimate_s=rho_queues.wait_estimate(_redis(), cls, snap["size"] + 1, avg))
+        classes[cls] = snap
+        head += [dict(h, queue_class=cls) for h in snap["head"]]
+    legacy = rho_snapshot.snapshot(_redis(), _legacy_queue())
+    return jsonify({"queue": "rho", "size": sum(c["size"] for c in classes.values()) + legacy["size"],
+                    "started": sum(c["started"] for c in classes.values()) + legacy["started"],
+                    "head": head[:rho_snapshot.HEAD_N], "classes": classes})
 
 @rho_bp.post("/api/rho/submit")
 def rho_submit():
@@ -93,47 +116,97 @@ def rho_submit():
     if budget > 50_000_000:
         return jsonify({"error": "Budget too large; cap is 50,000,000."}), 400
 
-    xff = request.headers.get("X-Forwarded-For", "")
-    ip = (xff.split(",")[0].strip() if xff else request.remote_addr)
+    ip = rate_limit.client_ip(request)
 
-    if not ip_can_start(ip):
+    limited = rate_limit.limit("rho", bits, iters=budget)
+    if limited: return limited
+    cls = rho_queues.classify(bits, budget)
+    q = _queues()[cls]
+    job_id = uuid.uuid4().hex
+    try:
+        reserved = rho_index.acquire(_redis(), ip, job_id)
+    except Exception:
+        reserved = True  # index unavailable: enqueue will surface a real Redis outage
+    if not reserved:
         return jsonify({"error": "One active job per IP. Wait or cancel the running job."}), 429
 
-    job = rho_q.enqueue("rho_worker.pollard_rho_job", N, budget,
-                        meta={"bits": bits, "budget": budget, "ip": ip, "submitted": time.time()})
-    ids = rho_q.get_job_ids()
-    pos = ids.index(job.id) + 1 if job.id in ids else 1
+    try:
+        from rq.job import Callback
+        pipe = _redis().pipeline()      # MULTI/EXEC: the job and its position entry land together
+        job = q.enqueue("rho_worker.pollard_rho_job", N, budget, job_id=job_id,
+                        meta={"bits": bits, "budget": budget, "ip": ip, "submitted": time.time(), "class": cls},
+                        on_success=Callback(rho_index.on_success),
+                        on_failure=Callback(rho_index.on_failure),
+                        on_stopped=Callback(rho_index.on_stopped),
+                        pipeline=pipe)
+        rho_snapshot.track(pipe, q, job.id)
+        rho_snapshot.invalidate(pipe, q)
+        pipe.execute()
+    except Exception:
+        rho_index.release(_redis(), ip, job_id)
+        raise
+    try:
+        pos = rho_snapshot.position(_redis(), q, job.id) or 1
+        wait = rho_queues.wait_estimate(_redis(), cls, pos)
+    except Exception:
+        pos, wait = 1, None
     note = "Warning: \u2265 256-bit inputs can be very slow and may not finish." if bits >= 256 else ""
-    return jsonify({"job_id": job.id, "status": job.get_status(), "bits": bits, "queue_position": pos, "note": note})
+    return jsonify({"job_id": job.id, "status": job.get_status(), "bits": bits, "queue_class": cls,
+                    "queue_position": pos, "wait_estimate_s": wait, "note": note})
 
 @rho_bp.get("/api/job/<job_id>")
 def job_status(job_id):
+    job = _fetch(job_id)
+    if job is None:
+        return jsonify({"error": "unknown job"}), 404
+    d = _job_dict(job)
     try:
-        job = Job.fetch(job_id, connection=redis_conn)
-    except NoSuchJobError:
+        d.update(_queue_place(job))
+    except Exception:
+        pass
+    return jsonify(d)
+
+@rho_bp.get("/api/job/<job_id>/events")
+def job_events(job_id):
+    """SSE stream of stage transitions and batched progress published by the worker."""
+    job = _fetch(job_id)
+    if job is None:
         return jsonify({"error": "unknown job"}), 404
-    return jsonify(_job_dict(job))
+    # each stream holds this request thread: cap them so /healthz and the API keep threads
+    if not rho_events.sync_slots.acquire(blocking=False):
+        resp = jsonify({"error": "too many event streams; poll /api/job/<id> instead"})
+        resp.status_code, resp.headers["Retry-After"] = 503, "5"
+        return resp
+    last_id = request.headers.get("Last-Event-ID") or "0-0"
+    def gen():
+        yield rho_events.sse("status", _job_dict(job))
+        yield from rho_events.sse_stream(_redis(), job_id, last_id, max_s=rho_events.SYNC_STREAM_S)
+    resp = Response(stream_with_context(gen()), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    resp.call_on_close(rho_events.sync_slots.release)
+    return resp
 
 @rho_bp.post("/api/job/<job_id>/abort")
 def job_abort(job_id):
-    try:
-        job = Job.fetch(job_id, connection=redis_conn)
-    except NoSuchJobError:
+    job = _fetch(job_id)
+    if job is None:
         return jsonify({"error": "unknown job"}), 404
     try:
         if job.get_status() == "started":
             try:
                 from rq.command import send_stop_job_command
-                send_stop_job_command(redis_conn, job_id)
+                send_stop_job_command(_redis(), job_id)
             except Exception:
                 pass
         job.cancel()
+        rho_index.release(_redis(), (job.meta or {}).get("ip"), job_id)
+        from rq import Queue
+        oq = Queue(job.origin, connection=_redis())
+        rho_snapshot.untrack(_redis(), oq, job_id)
+        rho_snapshot.invalidate(_redis(), oq)
     except Exception as e:
         return jsonify({"error": f"cancel failed: {e.__class__.__name__}"}), 400
-    try:
-        job = Job.fetch(job_id, connection=redis_conn)
-    except Exception:
-        pass
+    job = _fetch(job_id) or job
     return jsonify({"ok": True, "job_id": job_id, "status": getattr(job, "get_status", lambda: None)()})
 
 # ------------------ UI assets ------------------
@@ -201,6 +274,34 @@ RHO_V2_JS = r"""(function(){
       await sleep(1000);
     }
   }
+  function watch(job_id){
+    // server push; falls back to polling when SSE is unavailable
+    return new Promise(function(resolve){
+      if(!window.EventSource){ poll(job_id).then(resolve); return; }
+      const es = new EventSource("/api/job/" + job_id + "/events");
+      function data(e){ try{ return JSON.parse(e.data); }catch(_){ return {}; } }
+      es.addEventListener("status", function(e){
+        const j = data(e);
+        const age = (typeof j.age_sec === "number") ? j.age_sec.toFixed(2) : j.age_sec;
+        out("[" + j.status + "] age=" + age + "s");
+      });
+      es.addEventListener("stage", function(e){
+        const j = data(e); out("[stage] " + j.stage + " t=" + j.t + "s");
+      });
+      es.addEventListener("progress", function(e){
+        const j = data(e); out("[" + j.stage + "] iters=" + j.iters + " t=" + j.t + "s");
+      });
+      es.addEventListener("done", function(e){
+        const j = data(e); es.close();
+        if (j.status === "finished" && j.result){ out("Result: " + j.result); resolve(); }
+        else if (j.status === "finished"){ poll(job_id).then(resolve); }
+        else { out("Stopped."); resolve(); }
+      });
+      es.onerror = function(){
+        if (es.readyState === EventSource.CLOSED){ poll(job_id).then(resolve); }
+      };
+    });
+  }
   window.addEventListener("DOMContentLoaded", function(){
     out("Ready.");
     const btn = $("#runBtn"), N = $("#N"), budget = $("#budget");
@@ -212,7 +313,7 @@ RHO_V2_JS = r"""(function(){
         const bVal = parseInt(budget && budget.value, 10) || 500000;
         const j = await postJSON("/api/rho/submit", {N: nVal, budget: bVal});
         out("Job " + j.job_id + " queued at position " + j.queue_position + " (bits=" + j.bits + ")");
-        await poll(j.job_id);
+        await watch(j.job_id);
       }catch(e){ out("Error: " + e); } finally { btn.disabled = false; }
     });
   });
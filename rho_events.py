@@ -0,0 +1,137 @@
+# rho_events.py — per-job progress stream for rho jobs (Redis Streams)
+#
+# Workers append stage transitions and batched iteration counts to
+# rho:events:<job_id>; /api/job/<id>/events replays that stream as
+# Server-Sent Events.  A stream (rather than pub/sub) lets late or
+# reconnecting watchers resume from Last-Event-ID without missing anything.
+#
+# asgi_app serves the stream without holding a thread.  The Flask route holds
+# a request thread per watcher, so each process serves at most
+# RHO_SSE_MAX_STREAMS of them, each for SYNC_STREAM_S (503 beyond that;
+# EventSource retries and the job can still be polled).
+
+import os, json, time, threading
+from rsacrack.tracing import set_stage
+
+STREAM_MAXLEN = 200                 # approximate cap per job
+STREAM_TTL    = 60*60*24            # seconds; refreshed on every write
+PROGRESS_EVERY_S = float(os.getenv("RHO_PROGRESS_INTERVAL_S", "0.5"))
+BLOCK_MS      = 15000               # XREAD block; a keepalive is sent when it expires
+MAX_STREAM_S  = 600                 # one response; EventSource reconnects with Last-Event-ID
+SYNC_STREAM_S = 60                  # the same for a thread-per-stream server
+SYNC_MAX_STREAMS = int(os.getenv("RHO_SSE_MAX_STREAMS", "2"))
+sync_slots = threading.BoundedSemaphore(SYNC_MAX_STREAMS)   # per process
+TERMINAL      = ("finished", "failed", "canceled", "stopped")
+
+def stream_key(job_id: str) -> str:
+    return f"rho:events:{job_id}"
+
+# ------------------ publisher (worker side) ------------------
+class JobProgress:
+    """Best-effort publisher: stages go out immediately, iteration counts at most every PROGRESS_EVERY_S."""
+
+    def __init__(self, conn, job_id):
+        self.conn, self.key = conn, stream_key(job_id)
+        self.t0 = time.monotonic()
+        self._next_iters = self.t0 + PROGRESS_EVERY_S
+        self._stage = None
+
+    @classmethod
+    def current(cls):
+        """Publisher for the RQ job being executed, or a no-op one outside a worker."""
+        try:
+            from rq import get_current_job
+            job = get_current_job()
+        except Exception:
+            job = None
+        return cls(job.connection, job.id) if job is not None else _NullProgress()
+
+    def _publish(self, event, data):
+        data = dict(data, t=round(time.monotonic() - self.t0, 3))
+        try:
+            pipe = self.conn.pipeline(transaction=False)
+            pipe.xadd(self.key, {"event": event, "data": json.dumps(data)},
+                      maxlen=STREAM_MAXLEN, approximate=True)
+            pipe.expire(self.key, STREAM_TTL)
+            pipe.execute()
+        except Exception:
+            pass  # progress must never fail the job
+
+    def stage(self, name, **info):
+        self._stage = name
+        set_stage(name)
+        self._publish("stage", dict(info, stage=name))
+
+    def iters(self, count):
+        now = time.monotonic()
+        if now >= self._next_iters:
+            self._next_iters = now + PROGRESS_EVERY_S
+            self._publish("progress", {"stage": self._stage, "iters": int(count)})
+
+    def done(self, result):
+        self._publish("done", {"status": "finished", "result": str(result)[:512]})
+
+class _NullProgress:
+    def stage(self, name, **info): pass
+    def iters(self, count): pass
+    def done(self, result): pass
+
+# ------------------ reader (API side) ------------------
+def sse(event, data, eid=None):
+    head = f"id: {eid}\n" if eid else ""
+    return f"{head}event: {event}\ndata: {data if isinstance(data, str) else json.dumps(data)}\n\n"
+
+def _entry(eid, fields):
+    eid = eid.decode() if isinstance(eid, bytes) else eid
+    ev = fields.get(b"event", fields.get("event", b"message"))
+    data = fields.get(b"data", fields.get("data", b"{}"))
+    return eid, (ev.decode() if isinstance(ev, bytes) else ev), (data.decode() if isinstance(data, bytes) else data)
+
+def job_status(conn, job_id):
+    from rq.job import Job
+    try:
+        return Job.fetch(job_id, connection=conn).get_status()
+    except Exception:
+        return None
+
+def sse_stream(conn, job_id, last_id="0-0", max_s=MAX_STREAM_S):
+    """Generator of SSE frames for one job; ends after the 'done' event or max_s."""
+    key, deadline = stream_key(job_id), time.monotonic() + max_s
+    yield "retry: 3000\n\n"
+    while time.monotonic() < deadline:
+        block = max(1, min(BLOCK_MS, int((deadline - time.monotonic()) * 1000)))
+        resp = conn.xread({key: last_id}, count=100, block=block)
+        if not resp:
+            # nothing new: the job may have ended without publishing (crash, cancel)
+            status = job_status(conn, job_id)
+            if status is None or status in TERMINAL:
+                yield sse("done", {"status": status}); return
+            yield ": keepalive\n\n"
+            continue
+        for _key, entries in resp:
+            for eid, fields in entries:
+                last_id, event, data = _entry(eid, fields)
+                yield sse(event, data, last_id)
+                if event == "done":
+                    return
+
+async def sse_stream_async(conn, job_id, last_id="0-0"):
+    """Same as sse_stream for a redis.asyncio connection (used by asgi_app, which
+    cancels it when the client disconnects)."""
+    key, deadline = stream_key(job_id), time.monotonic() + MAX_STREAM_S
+    yield "retry: 3000\n\n"
+    while time.monotonic() < deadline:
+        resp = await conn.xread({key: last_id}, count=100, block=BLOCK_MS)
+        if not resp:
+            status = await conn.hget(f"rq:job:{job_id}", "status")
+            status = status.decode() if isinstance(status, bytes) else status
+            if status is None or status in TERMINAL:
+                yield sse("done", {"status": status}); return
+            yield ": keepalive\n\n"
+            continue
+        for _key, entries in resp:
+            for eid, fields in entries:
+                last_id, event, data = _entry(eid, fields)
+                yield sse(event, data, last_id)
+                if event == "done":
+                    return
@@ -0,0 +1,77 @@
+# rho_index.py — per-IP index of active (queued or started) rho jobs
+#
+# rho:active:ip:<ip> is a small Redis zset of job ids (score: reserve time).  A submit reserves a
+# slot with one atomic script call (no scan over the queue), the job's RQ
+# success/failure/stopped callbacks and the abort route remove it again.
+# Jobs that vanish without a callback (worker SIGKILL, flushed job) are
+# pruned lazily when they would block a submit, and the key expires anyway
+# after the longest a job can live.
+
+import os, time
+
+MAX_ACTIVE_PER_IP = int(os.getenv("RHO_MAX_ACTIVE_PER_IP", "1"))
+INDEX_TTL = 60*60*13        # > queue default_timeout (12h): safety net only
+_LIVE = ("queued", "started", "deferred", "scheduled")
+RESERVE_GRACE_S = 60         # a reserved id may not have its rq:job hash yet
+
+def ip_key(ip: str) -> str:
+    return f"rho:active:ip:{ip}"
+
+# KEYS[1]=zset  ARGV: job_id, limit, ttl, now  -> 1 reserved, 0 full
+_ACQUIRE_LUA = """
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[2]) then return 0 end
+redis.call('ZADD', KEYS[1], ARGV[4], ARGV[1])
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[3]))
+return 1
+"""
+
+def _prune(conn, ip: str) -> int:
+    """Drop members whose job is gone or no longer live; returns how many."""
+    key = ip_key(ip)
+    members = [(m.decode() if isinstance(m, bytes) else m, t) for m, t in conn.zrange(key, 0, -1, withscores=True)]
+    if not members:
+        return 0
+    pipe = conn.pipeline(transaction=False)
+    for jid, _t in members:
+        pipe.hget(f"rq:job:{jid}", "status")
+    now, stale = time.time(), []
+    for (jid, t), st in zip(members, pipe.execute()):
+        st = st.decode() if isinstance(st, bytes) else st
+        if st is None and now - t < RESERVE_GRACE_S:
+            continue  # reserved, enqueue still in flight
+        if st not in _LIVE:
+            stale.append(jid)
+    if stale:
+        conn.zrem(key, *stale)
+    return len(stale)
+
+def acquire(conn, ip: str, job_id: str, limit: int = MAX_ACTIVE_PER_IP) -> bool:
+    """Reserve an active-job slot for ip under job_id (before enqueueing it)."""
+    script = conn.register_script(_ACQUIRE_LUA)  # EVALSHA, loaded on first miss
+    args = [job_id, limit, INDEX_TTL, time.time()]
+    if script(keys=[ip_key(ip)], args=args):
+        return True
+    return _prune(conn, ip) > 0 and bool(script(keys=[ip_key(ip)], args=args))
+
+def release(conn, ip: str | None, job_id: str) -> None:
+    if ip:
+        conn.zrem(ip_key(ip), job_id)
+
+def active_count(conn, ip: str) -> int:
+    return int(conn.zcard(ip_key(ip)))
+
+# ------------------ RQ callbacks (run in the worker) ------------------
+def _release_job(job, connection):
+    try:
+        release(connection, (job.meta or {}).get("ip"), job.id)
+    except Exception:
+        pass  # the TTL / lazy prune cleans up
+
+def on_success(job, connection, result, *args, **kwargs):
+    _release_job(job, connection)
+
+def on_failure(job, connection, type, value, traceback):
+    _release_job(job, connection)
+
+def on_stopped(job, connection):
+    _release_job(job, connection)
@@ -0,0 +1,87 @@
+# rho_queues.py — size-class routing for rho jobs
+#
+# Submit predicts a job's CPU time from bits x budget and puts it on
+# rho-small, rho-medium or rho-large, each with a timeout to match, so a
+# 40-bit job never waits behind a 400-bit 50M-iteration one.  Workers are
+# started by rho_workers.py with per-class queue orders (reserved small-only
+# workers plus a weighted share of first preferences).  Each class keeps an
+# EWMA of job run time in Redis, which turns a queue position into a wait
+# estimate.
+
+import os
+
+from rate_limit import rho_cost_ms
+
+CLASSES = ("small", "medium", "large")
+SMALL_MS  = float(os.getenv("RHO_SMALL_MS", "2000"))     # predicted CPU time
+MEDIUM_MS = float(os.getenv("RHO_MEDIUM_MS", "60000"))
+TIMEOUTS  = {"small": 60*10, "medium": 60*60*2, "large": 60*60*12}
+LEGACY_QUEUE = "rho"          # jobs enqueued before the split; still drained
+EWMA_KEY   = "rho:ewma"
+EWMA_ALPHA = 0.2
+EWMA_SEED  = {"small": 1.0, "medium": 30.0, "large": 600.0}   # seconds, until measured
+
+def queue_name(cls: str) -> str:
+    return f"rho-{cls}"
+
+def class_of(queue: str) -> str | None:
+    return queue[4:] if queue.startswith("rho-") and queue[4:] in CLASSES else None
+
+def classify(bits: int, budget: int) -> str:
+    ms = rho_cost_ms(bits, budget)
+    if ms < SMALL_MS:
+        return "small"
+    return "medium" if ms < MEDIUM_MS else "large"
+
+def queues(conn) -> dict:
+    from rq import Queue
+    return {c: Queue(queue_name(c), connection=conn, default_timeout=TIMEOUTS[c]) for c in CLASSES}
+
+def legacy_queue(conn):
+    from rq import Queue
+    return Queue(LEGACY_QUEUE, connection=conn, default_timeout=TIMEOUTS["large"])
+
+# ------------------ run-time EWMA and wait estimates ------------------
+# KEYS[1]=hash  ARGV: field, sample, alpha
+_EWMA_LUA = """
+local old = tonumber(redis.call('HGET', KEYS[1], ARGV[1]))
+local x = tonumber(ARGV[2])
+if old then x = old + tonumber(ARGV[3]) * (x - old) end
+redis.call('HSET', KEYS[1], ARGV[1], tostring(x))
+return tostring(x)
+"""
+
+def record(conn, cls: str, seconds: float) -> None:
+    conn.register_script(_EWMA_LUA)(keys=[EWMA_KEY], args=[cls, float(seconds), EWMA_ALPHA])
+
+def record_current(seconds: float) -> None:
+    """Called by the worker at the end of a job; best effort."""
+    try:
+        from rq import get_current_job
+        job = get_current_job()
+        cls = class_of(job.origin) if job is not None else None
+        if cls:
+            record(job.connection, cls, seconds)
+    except Exception:
+        pass
+
+def ewma(conn) -> dict:
+    raw = conn.hgetall(EWMA_KEY)
+    out = dict(EWMA_SEED)
+    for k, v in raw.items():
+        k = k.decode() if isinstance(k, bytes) else k
+        if k in out:
+            out[k] = float(v)
+    return out
+
+def wait_estimate(conn, cls: str, position: int | None, avg: dict | None = None) -> float | None:
+    """Seconds until a job at 1-based position starts: (jobs ahead + half a running one) x mean run time / workers."""
+    if not position:
+        return None
+    avg = avg or ewma(conn)
+    try:
+        from rq import Queue, Worker
+        workers = Worker.count(queue=Queue(queue_name(cls), connection=conn))
+    except Exception:
+        workers = 0
+    return round((position - 0.5) * avg[cls] / max(1, workers), 1)
@@ -0,0 +1,112 @@
+# rho_snapshot.py — cheap queue views for /api/queue, /api/health and submit
+#
+# - snapshot(): queue length, started count and the first HEAD_N jobs with
+#   their enqueue times, read in one pipeline and shared between all web
+#   workers through a short-TTL Redis key (uptime probes hit this constantly);
+#   submit and abort drop it so the change shows on the next read
+# - positions: rho:positions:<queue> is a zset of queued job ids scored by an
+#   enqueue sequence number, so a job's position is a ZRANK instead of a scan
+#   of the whole queue list.  Submit adds the id in the same MULTI/EXEC as the
+#   enqueue.  On every lookup the oldest tracked id still in the queue list is
+#   found from the head (jobs the zset does not know, e.g. legacy ones, are
+#   skipped); ids scored below it have been picked up (the queue is FIFO) and
+#   are trimmed.
+
+import os, json, time
+
+SNAPSHOT_TTL_S = float(os.getenv("RHO_SNAPSHOT_TTL_S", "2"))
+HEAD_N = 10
+
+def _s(v):
+    return v.decode() if isinstance(v, bytes) else v
+
+def snapshot_key(q) -> str:
+    return f"rho:snapshot:{q.name}"
+
+def positions_key(q) -> str:
+    return f"rho:positions:{q.name}"
+
+def _seq_key(q) -> str:
+    return f"rho:positions:{q.name}:seq"
+
+# ------------------ snapshot ------------------
+def _build(conn, q) -> dict:
+    from rq.utils import utcparse
+    pipe = conn.pipeline(transaction=False)
+    pipe.llen(q.key)
+    pipe.lrange(q.key, 0, HEAD_N - 1)
+    pipe.zcard(q.started_job_registry.key)
+    size, head, started = pipe.execute()
+    head = [_s(j) for j in head]
+    pipe = conn.pipeline(transaction=False)
+    for jid in head:
+        pipe.hget(f"rq:job:{jid}", "enqueued_at")
+    enq = []
+    for raw in (pipe.execute() if head else []):
+        try:
+            enq.append(utcparse(_s(raw)).timestamp() if raw else None)
+        except Exception:
+            enq.append(None)
+    return {"size": int(size), "started": int(started), "built_at": time.time(),
+            "head": [{"job_id": jid, "enqueued_at": t} for jid, t in zip(head, enq)]}
+
+def snapshot(conn, q) -> dict:
+    """Cached queue view; ages are computed at read time."""
+    key = snapshot_key(q)
+    raw = conn.get(key)
+    snap = json.loads(raw) if raw else None
+    if snap is None:
+        snap = _build(conn, q)
+        conn.set(key, json.dumps(snap), px=max(1, int(SNAPSHOT_TTL_S * 1000)))
+    now = time.time()
+    for h in snap["head"]:
+        t = h.pop("enqueued_at", None)
+        h["age_sec"] = max(0.0, now - t) if t else None
+    snap["stale_sec"] = round(max(0.0, now - snap.pop("built_at")), 3)
+    return snap
+
+def invalidate(conn, q) -> None:
+    """Drop the cached view so the next read rebuilds it; called on submit
+    and abort.  conn may be the submit pipeline."""
+    conn.delete(snapshot_key(q))
+
+# ------------------ positions ------------------
+# KEYS: positions zset, queue list   ARGV: job_id  -> 1-based position or nil
+_POSITION_LUA = """
+local n = redis.call('LLEN', KEYS[2])
+local hs, i = nil, 0
+while i < n and not hs do
+  for _, id in ipairs(redis.call('LRANGE', KEYS[2], i, i + 99)) do
+    hs = redis.call('ZSCORE', KEYS[1], id)
+    if hs then break end
+  end
+  i = i + 100
+end
+if not hs then
+  redis.call('DEL', KEYS[1])
+  return nil
+end
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', '(' .. hs)
+local r = redis.call('ZRANK', KEYS[1], ARGV[1])
+if r then return r + 1 end
+return nil
+"""
+
+# KEYS: positions zset, sequence counter   ARGV: job_id
+_TRACK_LUA = """
+redis.call('ZADD', KEYS[1], redis.call('INCR', KEYS[2]), ARGV[1])
+"""
+
+def track(conn, q, job_id: str) -> None:
+    """Record job_id at the tail.  conn may be the pipeline that enqueues the
+    job, so both land together; the caller executes it."""
+    conn.eval(_TRACK_LUA, 2, positions_key(q), _seq_key(q), job_id)
+
+def untrack(conn, q, job_id: str) -> None:
+    conn.zrem(positions_key(q), job_id)
+
+def position(conn, q, job_id: str) -> int | None:
+    """1-based position among queued jobs, None once it left the queue."""
+    script = conn.register_script(_POSITION_LUA)
+    r = script(keys=[positions_key(q), q.key], args=[job_id])
+    return int(r) if r is not None else None
@@ -3,6 +3,11 @@ import random, math
 from math import gcd
 import time
 
+from rho_events import JobProgress
+from rho_queues import record_current, class_of
+from profiling import JobProfile
+import metrics
+
 def _timeit(fn, *a, **kw):
     t0 = time.perf_counter()
     r  = fn(*a, **kw)
@@ -208,7 +213,7 @@ def _mini_ecm(n, curves=6, B1=50_000):
     return None
 
 # ---- Pollard Rho (Brent + block-GCD) ----------------------------------------
-def _rho_brent_block(n, budget=500_000, seed=None, c=None, m=256):
+def _rho_brent_block(n, budget=500_000, seed=None, c=None, m=256, progress=None):
     n = mpz(n)
     if n % 2 == 0: return 2, 0
     if c is None:
@@ -233,6 +238,8 @@ def _rho_brent_block(n, budget=500_000, seed=None, c=None, m=256):
             g = gcd(int(q), int(n))
             if 1 < g < n:
                 return int(g), iters
+            if progress is not None:
+                progress.iters(iters)
             k += m
         r *= 2
         g = gcd(abs(int(y - x)), int(n))
@@ -242,6 +249,48 @@ def _rho_brent_block(n, budget=500_000, seed=None, c=None, m=256):
 
 # ---- Orchestrator ------------------------------------------------------------
 def pollard_rho_job(N, budget=500_000):
+    prog = JobProgress.current()
+    t0 = time.monotonic()
+    _wait_metrics()
+    try:
+        with JobProfile(_current_job()):
+            res = _pollard_rho(N, budget, prog)
+    except BaseException:
+        _job_metrics(N, "rho", time.monotonic() - t0, "failed")
+        raise
+    elapsed = time.monotonic() - t0
+    record_current(elapsed)
+    _job_metrics(N, res.get("algo"), elapsed, "found" if res.get("factor") else "exhausted")
+    prog.done(res)
+    return res
+
+def _current_job():
+    try:
+        from rq import get_current_job
+        return get_current_job()
+    except Exception:
+        return None
+
+def _wait_metrics():
+    try:
+        job = _current_job()
+        if job is not None and job.enqueued_at and job.started_at:
+            metrics.record_queue_wait(class_of(job.origin) or "legacy",
+                                      (job.started_at - job.enqueued_at).total_seconds())
+    except Exception:
+        pass  # metrics must never fail the job
+
+def _job_metrics(N, algo, seconds, outcome):
+    try:
+        job = _current_job()
+        cls = class_of(job.origin) if job is not None else None
+        bits = int(_to_int(N)).bit_length()
+        metrics.record_factor(algo, seconds, bits, outcome == "found")
+        metrics.record_job(cls or "legacy", seconds, outcome)
+    except Exception:
+        pass  # metrics must never fail the job
+
+def _pollard_rho(N, budget, prog):
     n = _to_int(N)
     n = mpz(n)
     if n <= 1:
@@ -249,29 +298,36 @@ def pollard_rho_job(N, budget=500_000):
     if n % 2 == 0:
         return {"algo":"trial","iters":0,"factor":2,"cofactor":int(n//2)}
 
+    prog.stage("started", bits=int(n.bit_length()), budget=int(budget))
+
     # 0) small trial
 
     # --- Williams p+1 quick pass (2^t-smooth) BEFORE p-1 ---
+    prog.stage("p+1")
     g = _pplus1_pow2(n, B1=(1<<64), t_max=80, tries=64)
     if g:
         return {'algo': 'Williams p+1 (2-smooth)', 'iters': 0,
                 'factor': int(g), 'cofactor': int(n//g)}
+    prog.stage("trial")
     f = _small_trial(n, limit=min(1_000_000, max(50_000, int(budget//50))))
     if f:
         return {"algo":"trial","iters":0,"factor":int(f),"cofactor":int(n//f)}
 
     # 1) p-1 micro-stage
     B1 = min(100_000, max(20_000, int(budget//25)))
+    prog.stage("p-1", B1=B1)
     f = _pminus1_stage1(n, B1=B1, base=2)
     if f:
         return {"algo":"p-1","iters":B1,"factor":int(f),"cofactor":int(n//f)}
 
     # 2) near-square sweep (Hart/Fermat)
+    prog.stage("hart_olf")
     f = _hart_olf(n, k_limit=min(20000, max(2000, int(budget//50))))
     if f:
         return {"algo":"hart_olf","iters":0,"factor":int(f),"cofactor":int(n//f)}
 
     # 3) SQUFOF (for smaller factors)
+    prog.stage("squfof")
     f = _squfof(n, iters=min(250_000, max(50_000, int(budget//4))))
     if f:
         return {"algo":"squfof","iters":0,"factor":int(f),"cofactor":int(n//f)}
@@ -280,12 +336,14 @@ def pollard_rho_job(N, budget=500_000):
     if n.bit_length() > 90:
         curves = 6 if budget < 1_000_000 else 12
         B1_ecm = 30_000 if budget < 1_000_000 else 50_000
+        prog.stage("ecm-s1", curves=curves, B1=B1_ecm)
         f = _mini_ecm(n, curves=curves, B1=B1_ecm)
         if f:
             return {"algo":"ecm-s1","iters":curves,"factor":int(f),"cofactor":int(n//f)}
 
     # 5) fallback: Brent ρ + block-GCD
-    f, it = _rho_brent_block(n, budget=max(10_000, int(budget)), m=256)
+    prog.stage("rho", budget=max(10_000, int(budget)))
+    f, it = _rho_brent_block(n, budget=max(10_000, int(budget)), m=256, progress=prog)
     if f:
         return {"algo":"Pollard Rho (Brent+blockGCD)","iters":int(it),"factor":int(f),"cofactor":int(n//f)}
     return {"algo":"Pollard Rho (Brent+blockGCD)","iters":int(it),"note":"budget exhausted","factor":None,"cofactor":None}
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# rho_workers.py — start and supervise the RQ workers for the rho size classes
+#
+# RQ workers drain their queues in strict order, so the share each class gets
+# is set by which queue a worker lists first:
+#   - RHO_SMALL_RESERVED workers only ever take rho-small (tiny jobs always
+#     have someone free within one small job's run time); at least one worker
+#     is never reserved, so every class and the legacy queue keep a consumer
+#     (with a single worker nothing is reserved)
+#   - the rest get a first preference by smooth weighted round robin over
+#     RHO_WEIGHTS, then fall back to the other classes smallest first, then to
+#     the legacy "rho" queue, so no worker idles while any class has work
+#
+#   python rho_workers.py              # RHO_WORKERS workers (default: cores)
+#   python rho_workers.py --plan       # print the queue order of each worker
+#
+# Replaces "rq worker rho" in the rsacrack-rq unit.
+
+import os, sys, time, signal, socket, argparse, subprocess
+
+from rho_queues import CLASSES, LEGACY_QUEUE, queue_name
+
+def _weights(spec: str) -> dict:
+    w = {c: 0 for c in CLASSES}
+    for part in spec.split(","):
+        if ":" in part:
+            k, v = part.split(":", 1)
+            if k.strip() in w:
+                w[k.strip()] = max(0, int(v))
+    return w
+
+def plan(total: int, reserved: int, weights: dict) -> list:
+    """Queue list for each worker, in dequeue order; at least one worker takes every queue."""
+    reserved = max(0, min(reserved, total - 1))
+    out = [[queue_name("small")] for _ in range(reserved)]
+    current = {c: 0 for c in CLASSES}
+    wsum = sum(weights.values()) or 1
+    for _ in range(total - reserved):
+        for c in CLASSES:
+            current[c] += weights.get(c, 0)
+        first = max(CLASSES, key=lambda c: current[c])
+        current[first] -= wsum
+        out.append([queue_name(first)] + [queue_name(c) for c in CLASSES if c != first] + [LEGACY_QUEUE])
+    return out
+
+def _spawn(i, queues, url):
+    name = f"rho-{socket.gethostname()}-{os.getpid()}-{i}"
+    return subprocess.Popen(["rq", "worker", "--url", url, "--name", name, *queues])
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Supervise RQ workers for the rho size-class queues.")
+    ap.add_argument("--workers", type=int, default=int(os.getenv("RHO_WORKERS", str(os.cpu_count() or 1))))
+    ap.add_argument("--reserved", type=int, default=int(os.getenv("RHO_SMALL_RESERVED", "1")))
+    ap.add_argument("--weights", default=os.getenv("RHO_WEIGHTS", "small:3,medium:2,large:1"))
+    ap.add_argument("--url", default=os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    ap.add_argument("--plan", action="store_true", help="print the per-worker queue order and exit")
+    args = ap.parse_args(argv)
+
+    layout = plan(max(1, args.workers), args.reserved, _weights(args.weights))
+    if args.plan:
+        for i, qs in enumerate(layout):
+            print(i, " ".join(qs))
+        return 0
+
+    procs = {i: _spawn(i, qs, args.url) for i, qs in enumerate(layout)}
+    stopping = False
+    def _stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for p in procs.values():
+            if p.poll() is None:
+                p.send_signal(signal.SIGTERM)  # rq: warm shutdown, finish the current job
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, _stop)
+
+    while True:
+        time.sleep(1.0)
+        if stopping:
+            if all(p.poll() is not None for p in procs.values()):
+                return 0
+            continue
+        for i, p in list(procs.items()):
+            if p.poll() is not None:
+                print(f"worker {i} exited with {p.returncode}; restarting", file=sys.stderr, flush=True)
+                procs[i] = _spawn(i, layout[i], args.url)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,9 @@
-from .factor_pipeline import (
-    factor_one,
-    is_probable_prime,
-    pollard_rho_brent,
-    small_trial_division,
-)
+# The engine is loaded on first use of one of these names, so importing a
+# light submodule (rsacrack.tracing) does not pull in the whole pipeline.
 __all__ = ["factor_one", "is_probable_prime", "pollard_rho_brent", "small_trial_division"]
+
+def __getattr__(name):
+    if name in __all__:
+        from . import factor_pipeline
+        return getattr(factor_pipeline, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
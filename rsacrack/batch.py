@@ -0,0 +1,105 @@
+# rsacrack/batch.py
+# Cheap screening of many integers at once:
+# - one primorial of all primes <= bound, reduced modulo every n of the batch
+#   with a remainder tree (Bernstein's batch trial division): O(log k) big
+#   multiplications/divisions instead of k * pi(bound) small ones
+# - gcd(n, primorial mod n) is the product of the distinct small primes of n
+# - the leftover cofactor gets one probable-prime test (gmpy2, else strong
+#   Miller–Rabin on the first 12 prime bases: deterministic below 3.3e24)
+
+from __future__ import annotations
+import math
+from functools import lru_cache
+from typing import Dict, List, Tuple
+
+try:
+    import gmpy2
+    mpz = gmpy2.mpz
+    def _gcd(a, b): return int(gmpy2.gcd(a, b))
+    def is_probable_prime(n: int) -> bool: return bool(gmpy2.is_prime(n))
+except Exception:
+    mpz = int
+    _gcd = math.gcd
+    _MR_BASES = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37)
+    def is_probable_prime(n: int) -> bool:
+        if n < 2: return False
+        for p in _MR_BASES:
+            if n % p == 0: return n == p
+        d = n - 1; s = (d & -d).bit_length() - 1; d >>= s
+        for a in _MR_BASES:
+            x = pow(a, d, n)
+            if x in (1, n-1): continue
+            for _ in range(s-1):
+                x = x*x % n
+                if x == n-1: break
+            else:
+                return False
+        return True
+
+DEFAULT_BOUND = 100_000
+
+@lru_cache(maxsize=4)
+def primes_upto(B: int) -> Tuple[int, ...]:
+    if B < 2:
+        return ()
+    sieve = bytearray(b"\x01") * (B + 1)
+    sieve[:2] = b"\x00\x00"
+    for p in range(2, math.isqrt(B) + 1):
+        if sieve[p]:
+            sieve[p*p::p] = bytes(len(range(p*p, B + 1, p)))
+    return tuple(i for i, v in enumerate(sieve) if v)
+
+def product_tree(xs: List[int]) -> List[list]:
+    """Levels bottom-up; the last level holds the product of all xs."""
+    tree = [[mpz(x) for x in xs] or [mpz(1)]]
+    while len(tree[-1]) > 1:
+        lv = tree[-1]
+        tree.append([lv[i] * lv[i+1] if i + 1 < len(lv) else lv[i] for i in range(0, len(lv), 2)])
+    return tree
+
+@lru_cache(maxsize=4)
+def primorial(B: int):
+    return product_tree(list(primes_upto(B)))[-1][0]
+
+def remainders(P, ns: List[int]) -> List[int]:
+    """[P mod n for n in ns] via a remainder tree."""
+    tree = product_tree(ns)
+    rems = [P % tree[-1][0]]
+    for level in reversed(tree[:-1]):
+        rems = [rems[i // 2] % x for i, x in enumerate(level)]
+    return [int(r) for r in rems]
+
+def _split_small(n: int, g: int, primes: Tuple[int, ...]) -> Dict[int, int]:
+    """Exponents of the small primes whose product is g (g | n, squarefree)."""
+    out: Dict[int, int] = {}
+    for p in primes:
+        if g == 1:
+            break
+        if p * p > g:
+            p = g  # what is left of g is itself one small prime
+        if g % p == 0:
+            g //= p
+            e = 0
+            while n % p == 0:
+                n //= p; e += 1
+            out[p] = e
+    return out
+
+def screen(ns: List[int], bound: int = DEFAULT_BOUND) -> List[Tuple[Dict[int, int], int, bool]]:
+    """
+    For each n (>= 2) return (small, cofactor, cofactor_is_prime):
+      small    — {p: e} for every prime p <= bound dividing n
+      cofactor — n with those removed (1 if n was fully smooth)
+    A composite cofactor has no prime factor <= bound, so it is >= bound^2.
+    """
+    primes = primes_upto(bound)
+    rems = remainders(primorial(bound), ns) if ns else []
+    out = []
+    for n, r in zip(ns, rems):
+        g = _gcd(n, r) if r else n  # r == 0: n divides the primorial, i.e. n is smooth and squarefree
+        small = _split_small(n, g, primes) if g > 1 else {}
+        m = n
+        for p, e in small.items():
+            m //= p ** e
+        out.append((small, m, m > 1 and (m < bound * bound or is_probable_prime(m))))
+    return out
@@ -0,0 +1,140 @@
+# rsacrack/classify.py
+# prime / semiprime / other without factoring n when it can be avoided
+# - trial division by chunked primorial gcd: the primes of each chunk
+#   (2^8, 2^9, ... 2^21) are multiplied once per process, and one gcd with
+#   the cofactor tests a whole chunk (factor_pipeline trial-divides one
+#   prime at a time)
+# - it stops as soon as every prime <= cbrt(cofactor) is tried: a composite
+#   cofactor with no factor up to its cube root has exactly two prime
+#   factors, so n is settled without splitting it
+# - once a small factor is found, one probable-prime test on the cofactor
+#   settles n: a prime cofactor adds one prime factor, a composite one two
+#   or more, which makes n "other"
+# - only a composite with no factor <= TRIAL_LIMIT that is bigger than
+#   TRIAL_LIMIT^3 (about 2^63) has to be split to tell semiprime from other
+# Full factorization runs only in factorize(), when the caller wants primes.
+#
+#   from rsacrack.classify import classify, factorize
+#   c = classify(n)            # c.kind, c.proof, c.primes (if known for free)
+#   f = factorize(n, c)        # {p: e}, reusing c's trial division
+
+from __future__ import annotations
+import math, time
+from bisect import bisect_right
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from .batch import mpz, _gcd, is_probable_prime, primes_upto, product_tree, _split_small
+from .factor_pipeline import pollard_rho_brent
+
+TRIAL_LIMIT = 1 << 21
+FIRST_CHUNK = 1 << 8
+SPLIT_MS    = 3000
+
+@lru_cache(maxsize=None)
+def _chunk(hi: int) -> Tuple[Tuple[int, ...], object]:
+    """Primes in (hi/2, hi] (all primes <= hi for the first chunk) and their product."""
+    primes = primes_upto(hi)
+    lo = 0 if hi <= FIRST_CHUNK else bisect_right(primes, hi // 2)
+    ps = primes[lo:]
+    return ps, product_tree(list(ps))[-1][0]
+
+@dataclass
+class Classification:
+    n: int
+    kind: str                   # "prime" | "semiprime" | "other" | "unknown" (split timed out)
+    proof: str                  # "prp", "trial", "cube-root", "split" or "" for unknown
+    small: Dict[int, int]       # prime factors <= bound, with exponents
+    cofactor: int               # n without them: 1, a prime, or composite with no factor <= bound
+    cofactor_prime: bool
+    bound: int                  # every prime <= bound was tried
+    split: Optional[Tuple[int, int]] = None   # factor pair of the cofactor, when one was needed
+
+    @property
+    def primes(self) -> Optional[Dict[int, int]]:
+        """{p: e} if the work done so far already gives every prime, else None."""
+        if self.cofactor == 1:
+            return dict(self.small)
+        if self.cofactor_prime:
+            return {**self.small, self.cofactor: 1}
+        if self.split and all(is_probable_prime(x) for x in self.split):
+            out = dict(self.small)
+            for x in self.split:
+                out[x] = out.get(x, 0) + 1
+            return out
+        return None
+
+def _kind(omega: int) -> str:
+    return "prime" if omega == 1 else "semiprime" if omega == 2 else "other"
+
+def split(m: int, time_ms: Optional[int] = SPLIT_MS) -> Optional[Tuple[int, int]]:
+    """A factor pair d <= m/d of composite m (Brent's rho), or None when time_ms runs out (None: no limit)."""
+    r = math.isqrt(m)
+    if r * r == m:
+        return r, r
+    deadline = None if time_ms is None else time.time() + time_ms / 1000.0
+    seed = m % (1 << 61)
+    while deadline is None or time.time() < deadline:
+        # the whole budget to one walk: restarting it would throw its progress away
+        left = 60000 if deadline is None else max(1, int((deadline - time.time()) * 1000))
+        d = pollard_rho_brent(m, time_ms=left, seed=seed)
+        if 1 < d < m:
+            return min(d, m // d), max(d, m // d)
+        seed += 1
+    return None
+
+def classify(n: int, limit: int = TRIAL_LIMIT, time_ms: Optional[int] = SPLIT_MS) -> Classification:
+    """Settle prime / semiprime / other for n >= 2 with as little factoring as the proof allows."""
+    if n < 2:
+        raise ValueError("n must be >= 2")
+    if is_probable_prime(n):
+        return Classification(n, "prime", "prp", {}, n, True, 1)
+    small: Dict[int, int] = {}
+    m, bound, hi = n, 1, FIRST_CHUNK
+    while m > 1 and bound ** 3 < m and bound < limit:
+        if small:
+            break                           # one PRP test on the cofactor settles it now
+        primes, P = _chunk(min(hi, limit))
+        g = _gcd(m, int(P % mpz(m)))
+        if g > 1:
+            for p, e in _split_small(m, g, primes).items():
+                small[p] = e
+                m //= p ** e
+        bound, hi = min(hi, limit), hi * 2
+    k = sum(small.values())
+    m_prime = m > 1 and (m <= bound * bound or is_probable_prime(m))
+    c = Classification(n, "", "trial", small, m, m_prime, bound)
+    if m == 1 or m_prime:
+        c.kind = _kind(k + (m > 1))
+    elif k >= 1:
+        c.kind = "other"                    # composite cofactor: k + 2 or more
+    elif m <= bound ** 3:
+        c.kind, c.proof = "semiprime", "cube-root"
+    else:
+        c.split = split(m, time_ms)
+        if c.split is None:
+            c.kind, c.proof = "unknown", ""
+        else:
+            c.proof = "split"
+            c.kind = "semiprime" if all(is_probable_prime(x) for x in c.split) else "other"
+    return c
+
+def factorize(n: int, c: Optional[Classification] = None, time_ms: Optional[int] = None) -> Dict[int, int]:
+    """
+    {p: e} of n >= 2, continuing from classify(n)'s trial division and split.
+    time_ms bounds each split (None: no limit); TimeoutError if one runs out.
+    """
+    c = c or classify(n, time_ms=time_ms)
+    out = dict(c.small)
+    stack = list(c.split) if c.split else [c.cofactor] if c.cofactor > 1 else []
+    while stack:
+        m = stack.pop()
+        if m <= c.bound * c.bound or is_probable_prime(m):
+            out[m] = out.get(m, 0) + 1
+            continue
+        pair = split(m, time_ms)
+        if pair is None:
+            raise TimeoutError(f"no factor of {m} within {time_ms} ms")
+        stack += pair
+    return dict(sorted(out.items()))
@@ -35,24 +35,29 @@ def _ecm_available() -> bool:
     return bool(ECM_BIN)
 
 # Trial division function
-def trial_division(n: int, timeout_s: float = 10.0) -> int | None:
+def trial_division(n: int, timeout_s: float = 10.0, stats: dict | None = None) -> int | None:
     t0 = time.time()
     if n % 2 == 0:
         return 2
     if n % 3 == 0:
         return 3
     limit = min(int(math.isqrt(n)) + 1, 1000000)
-    for i in range(5, limit, 6):
-        if time.time() - t0 > timeout_s:
-            return None
-        if n % i == 0:
-            return i
-        if n % (i + 2) == 0:
-            return i + 2
-    return None
+    i = 5
+    try:
+        for i in range(5, limit, 6):
+            if time.time() - t0 > timeout_s:
+                return None
+            if n % i == 0:
+                return i
+            if n % (i + 2) == 0:
+                return i + 2
+        return None
+    finally:
+        if stats is not None:
+            stats["iterations"] = 2 + 2 * ((i - 5) // 6 + 1)  # divisors tried
 
 # Fermat's factorization method - fixed implementation
-def fermat_try(n: int, timeout_s: float = 10.0) -> int | None:
+def fermat_try(n: int, timeout_s: float = 10.0, stats: dict | None = None) -> int | None:
     t0 = time.time()
     if n % 2 == 0:
         return 2
@@ -63,16 +68,20 @@ def fermat_try(n: int, timeout_s: float = 10.0) -> int | None:
         return root
     
     # Fermat's algorithm for odd numbers
-    x = math.isqrt(n) + 1
-    while time.time() - t0 < timeout_s:
-        y2 = x * x - n
-        y = math.isqrt(y2)
-        if y * y == y2:
-            factor = x - y
-            if factor != 1 and factor != n:  # Avoid trivial factors
-                return factor
-        x += 1
-    return None
+    x = x0 = math.isqrt(n) + 1
+    try:
+        while time.time() - t0 < timeout_s:
+            y2 = x * x - n
+            y = math.isqrt(y2)
+            if y * y == y2:
+                factor = x - y
+                if factor != 1 and factor != n:  # Avoid trivial factors
+                    return factor
+            x += 1
+        return None
+    finally:
+        if stats is not None:
+            stats["iterations"] = x - x0 + 1
 
 # Improved Pollard's Rho implementation using Brent's algorithm
 def pollard_rho(n: int, timeout_s: float = 10.0) -> int | None:
@@ -8,8 +8,12 @@
 
 from __future__ import annotations
 import math, random, time, subprocess, shutil
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional, Tuple, List
+try:
+    from .tracing import Tracer
+except ImportError:     # run as a script (the CLI at the bottom)
+    from tracing import Tracer
 
 # ---------- Utilities ----------
 
@@ -223,11 +227,8 @@ def quick_pplus1(n: int, B1: int = 100000, timeout_s: float = 2.5) -> int:
     lines = _run_ecm_lines(["ecm", "-q", "-pp1", str(B1), str(n)], timeout_s)
     return _parse_factor_from_ecm_lines(lines, n)
 
-def quick_ecm(n: int, digits: int, time_ms: int) -> int:
-    """
-    A small ECM burst scaled by size/time.
-    We pick a B1 and #curves heuristic; let ECM choose B2.
-    """
+def ecm_params(digits: int, time_ms: int) -> Tuple[int, int]:
+    """(B1, curves) for an ECM burst on a number of this size and budget."""
     if digits <= 40:
         B1, curves = 5000, 30
     elif digits <= 60:
@@ -240,7 +241,17 @@ def quick_ecm(n: int, digits: int, time_ms: int) -> int:
         curves = max(10, curves // 6)
     elif time_ms < 3000:
         curves = max(20, curves // 3)
+    return B1, curves
 
+def quick_ecm(n: int, digits: int, time_ms: int, stats: Optional[dict] = None) -> int:
+    """
+    A small ECM burst scaled by size/time.
+    We pick a B1 and #curves heuristic; let ECM choose B2.
+    stats["iterations"] is set to the number of curves run.
+    """
+    B1, curves = ecm_params(digits, time_ms)
+    if stats is not None:
+        stats["iterations"] = 0
     batch = min(25, curves)
     remaining = curves
     deadline = time.time() + (time_ms / 1000.0)
@@ -250,6 +261,8 @@ def quick_ecm(n: int, digits: int, time_ms: int) -> int:
             ["ecm", "-q", "-c", str(b), "-one", str(B1), str(n)],
             timeout_s=max(1.0, min(6.0, (deadline - time.time()) * 0.9))
         )
+        if stats is not None and lines:
+            stats["iterations"] += b
         f = _parse_factor_from_ecm_lines(lines, n)
         if f:
             return f
@@ -264,80 +277,115 @@ class FactorResult:
     p: int
     q: int
     steps: List[str]
+    trace: List[dict] = field(default_factory=list)
 
-def _finish(n: int, f: int, steps: List[str], method: str) -> FactorResult:
+def _finish(n: int, f: int, steps: List[str], method: str, tr: Tracer) -> FactorResult:
     p = f
     q = n // f
     if p > q: p, q = q, p
     steps.append(f"FOUND {method}: {p} × {q}")
-    return FactorResult(method=method, p=p, q=q, steps=steps)
+    return FactorResult(method=method, p=p, q=q, steps=steps, trace=tr.to_list())
+
+def _ecm_outcome(span, f: int, N: int) -> None:
+    if 1 < f < N:
+        span.outcome = "hit"
+    elif not shutil.which("ecm"):
+        span.outcome = "unavailable"
 
-def factor_one(n: int, time_ms: int = 3000) -> Optional[FactorResult]:
+def factor_one(n: int, time_ms: int = 3000, tracer: Optional[Tracer] = None) -> Optional[FactorResult]:
     """
     Main entry. Tries: trial -> p−1 -> p+1 -> ρ(Brent) -> ECM burst.
     Recurses once if a composite cofactor remains and budget allows.
+    Each stage is a span in result.trace; the top-level call also logs them.
     """
     start = time.time()
     steps: List[str] = []
+    tr = tracer or Tracer("pipeline", n)
+
+    def done(res: Optional[FactorResult]) -> Optional[FactorResult]:
+        if tracer is None:  # the recursive call's spans are logged by its parent
+            spans = tr.finish("ok" if res else "no factor")
+            if res:
+                res.trace = spans
+        return res
 
     if n <= 1:
         return None
-    if is_probable_prime(n):
+    with tr.span("prime-test", bits=n.bit_length()) as sp:
+        prime = is_probable_prime(n)
+        sp.outcome = "hit" if prime else "miss"
+    if prime:
         steps.append("n is probable prime (BPSW)")
-        return FactorResult(method="prime", p=n, q=1, steps=steps)
+        return done(FactorResult(method="prime", p=n, q=1, steps=steps, trace=tr.to_list()))
 
     # Peel small factors quickly
     N = n
-    N, f, last = small_trial_division(N, limit=100000)
+    with tr.span("trial", limit=100000) as sp:
+        N, f, last = small_trial_division(N, limit=100000)
+        sp.params["last_divisor"] = last
+        if f != 1:
+            sp.outcome = "hit"
     if f != 1:
         steps.append(f"trial division found {f}")
         if is_probable_prime(N):
-            return _finish(n, f, steps, "trial")
+            return done(_finish(n, f, steps, "trial", tr))
         # recurse once on remaining cofactor (use half budget)
-        sub = factor_one(N, max(500, time_ms // 2))
+        sub = factor_one(N, max(500, time_ms // 2), tracer=Tracer("pipeline", N, parent=tr))
         if sub and sub.q == 1:
-            return _finish(n, f, steps + sub.steps, "trial+recurse")
+            return done(_finish(n, f, steps + sub.steps, "trial+recurse", tr))
         if sub:
             p = f
             q = sub.p * sub.q
             steps += sub.steps
             g = math.gcd(n, p)
             if g == 1: g = math.gcd(n, q)
-            return _finish(n, g, steps, "trial+recurse")
+            return done(_finish(n, g, steps, "trial+recurse", tr))
 
     digits = len(str(N))
     rem_ms = max(200, int((start + time_ms/1000.0 - time.time()) * 1000))
 
     # Cheap algebraic methods first
     if rem_ms > 200:
-        f = quick_pminus1(N, B1=100000, timeout_s=min(2.5, rem_ms/1000.0))
+        with tr.span("p-1", B1=100000, timeout_ms=min(2500, rem_ms)) as sp:
+            f = quick_pminus1(N, B1=100000, timeout_s=min(2.5, rem_ms/1000.0))
+            _ecm_outcome(sp, f, N)
         if 1 < f < N:
             steps.append(f"p−1 found {f}")
-            return _finish(n, f, steps, "p-1")
+            return done(_finish(n, f, steps, "p-1", tr))
 
     rem_ms = max(150, int((start + time_ms/1000.0 - time.time()) * 1000))
     if rem_ms > 150:
-        f = quick_pplus1(N, B1=100000, timeout_s=min(2.5, rem_ms/1000.0))
+        with tr.span("p+1", B1=100000, timeout_ms=min(2500, rem_ms)) as sp:
+            f = quick_pplus1(N, B1=100000, timeout_s=min(2.5, rem_ms/1000.0))
+            _ecm_outcome(sp, f, N)
         if 1 < f < N:
             steps.append(f"p+1 found {f}")
-            return _finish(n, f, steps, "p+1")
+            return done(_finish(n, f, steps, "p+1", tr))
 
     # Pollard-ρ (Brent) with batch-GCD
     rem_ms = max(300, int((start + time_ms/1000.0 - time.time()) * 1000))
-    f = pollard_rho_brent(N, time_ms=min(1500, rem_ms))
+    with tr.span("rho-brent", timeout_ms=min(1500, rem_ms)) as sp:
+        f = pollard_rho_brent(N, time_ms=min(1500, rem_ms))
+        if 1 < f < N:
+            sp.outcome = "hit"
     if 1 < f < N:
         steps.append(f"ρ(Brent) found {f}")
-        return _finish(n, f, steps, "rho-brent")
+        return done(_finish(n, f, steps, "rho-brent", tr))
 
     # ECM burst
     rem_ms = max(400, int((start + time_ms/1000.0 - time.time()) * 1000))
-    f = quick_ecm(N, digits, rem_ms)
+    B1, curves = ecm_params(digits, rem_ms)
+    stats: dict = {}
+    with tr.span("ecm", B1=B1, curves=curves, timeout_ms=rem_ms) as sp:
+        f = quick_ecm(N, digits, rem_ms, stats=stats)
+        sp.iterations = stats.get("iterations")
+        _ecm_outcome(sp, f, N)
     if 1 < f < N:
         steps.append(f"ECM found {f}")
-        return _finish(n, f, steps, "ecm")
+        return done(_finish(n, f, steps, "ecm", tr))
 
     steps.append("no factor found in budget")
-    return None
+    return done(None)
 
 # ---------- Tiny CLI for quick testing ----------
 if __name__ == "__main__":
@@ -1,7 +1,8 @@
 from .exec_tools import (
     trial_division, fermat_try, pollard_rho_try_parallel, 
-    pm1_try, pp1_try, ecm_try_parallel
+    pm1_try, pp1_try, ecm_try_parallel, _ecm_available
 )
+from .tracing import Tracer
 import math
 
 def get_curves_for_ecm(n: int) -> int:
@@ -22,127 +23,137 @@ def get_instances_for_pollard_rho(n: int) -> int:
     else:
         return 8
 
-def factorize_smart(n: int, timeout_ms: int = 5000) -> dict:
+def factorize_smart(n: int, timeout_ms: int = 5000, tracer: Tracer | None = None) -> dict:
+    """Stages in order until one hits or the budget is spent.  "trace" holds one span per stage."""
     steps = []
+    tr = tracer or Tracer("smart", n)
     time_used_ms = 0
     time_left_ms = timeout_ms
 
-    # Helper to update time left
-    def update_time(elapsed):
+    # Helper to update time left (wall clock since the trace started)
+    def update_time():
         nonlocal time_used_ms, time_left_ms
-        time_used_ms += elapsed
+        time_used_ms = tr.elapsed_ms()
         time_left_ms = max(0, timeout_ms - time_used_ms)
 
+    def hit(span, p, method, detail=None):
+        span.outcome = "hit"
+        span.detail = detail
+        update_time()
+        res = {
+            "status": "ok",
+            "n": str(n),
+            "p": str(p),
+            "q": str(n // p),
+            "method": method,
+            "steps": steps,
+            "time_ms": time_used_ms,
+            "trace": tr.finish("ok"),
+        }
+        if detail is not None:
+            res["detail"] = detail
+        return res
+
+    def miss(span, step):
+        steps.append(step)
+        update_time()
+        if span.outcome == "miss" and time_left_ms <= 0:
+            span.outcome = "timeout"
+
     # 1. Trial division
+    update_time()
     if time_left_ms > 0:
-        factor = trial_division(n, time_left_ms / 1000)
+        stats = {}
+        with tr.span("trial", timeout_ms=time_left_ms) as sp:
+            factor = trial_division(n, time_left_ms / 1000, stats=stats)
+            sp.iterations = stats.get("iterations")
         if factor:
             steps.append("trial division hit")
-            return {
-                "status": "ok",
-                "n": str(n),
-                "p": str(factor),
-                "q": str(n // factor),
-                "method": "trial",
-                "steps": steps,
-                "time_ms": time_used_ms
-            }
-        steps.append("trial division missed")
+            return hit(sp, factor, "trial")
+        miss(sp, "trial division missed")
 
     # 2. Fermat's method
+    update_time()
     if time_left_ms > 0 and len(str(n)) < 40:  # Fermat is fast for close factors
-        factor = fermat_try(n, time_left_ms / 1000)
+        stats = {}
+        with tr.span("fermat", timeout_ms=time_left_ms) as sp:
+            factor = fermat_try(n, time_left_ms / 1000, stats=stats)
+            sp.iterations = stats.get("iterations")
         if factor:
             steps.append("fermat hit")
-            return {
-                "status": "ok",
-                "n": str(n),
-                "p": str(factor),
-                "q": str(n // factor),
-                "method": "fermat",
-                "steps": steps,
-                "time_ms": time_used_ms
-            }
-        steps.append("fermat missed")
+            return hit(sp, factor, "fermat")
+        miss(sp, "fermat missed")
+    elif time_left_ms > 0:
+        tr.skip("fermat", "n has 40+ digits")
 
     # 3. Pollard's Rho with parallel instances
+    update_time()
     if time_left_ms > 0:
         instances = get_instances_for_pollard_rho(n)
-        factor = pollard_rho_try_parallel(n, instances=instances, timeout_s=time_left_ms / 1000)
+        with tr.span("rho", instances=instances, timeout_ms=time_left_ms) as sp:
+            factor = pollard_rho_try_parallel(n, instances=instances, timeout_s=time_left_ms / 1000)
         if factor:
             steps.append(f"pollard_rho hit with {instances} instances")
-            return {
-                "status": "ok",
-                "n": str(n),
-                "p": str(factor.p),
-                "q": str(n // factor.p),
-                "method": factor.method,
-                "detail": factor.detail,
-                "steps": steps,
-                "time_ms": time_used_ms + factor.elapsed_ms
-            }
-        steps.append("pollard_rho missed")
+            return hit(sp, factor.p, factor.method, factor.detail)
+        miss(sp, "pollard_rho missed")
 
     # 4. P-1 method
+    update_time()
     if time_left_ms > 0:
         # Choose B1 based on n size
         B1 = min(10000, int(math.sqrt(math.sqrt(n))))
-        factor = pm1_try(n, B1, timeout_s=time_left_ms / 1000)
+        with tr.span("p-1", B1=B1, timeout_ms=time_left_ms) as sp:
+            if not _ecm_available():
+                sp.outcome = "unavailable"
+            factor = pm1_try(n, B1, timeout_s=time_left_ms / 1000)
         if factor:
             steps.append("p-1 hit")
-            return {
-                "status": "ok",
-                "n": str(n),
-                "p": str(factor.p),
-                "q": str(n // factor.p),
-                "method": factor.method,
-                "detail": factor.detail,
-                "steps": steps,
-                "time_ms": time_used_ms + factor.elapsed_ms
-            }
-        steps.append("p-1 missed")
+            return hit(sp, factor.p, factor.method, factor.detail)
+        miss(sp, "p-1 missed")
 
     # 5. P+1 method
+    update_time()
     if time_left_ms > 0:
         B1 = min(10000, int(math.sqrt(math.sqrt(n))))
-        factor = pp1_try(n, B1, timeout_s=time_left_ms / 1000)
+        with tr.span("p+1", B1=B1, timeout_ms=time_left_ms) as sp:
+            if not _ecm_available():
+                sp.outcome = "unavailable"
+            factor = pp1_try(n, B1, timeout_s=time_left_ms / 1000)
         if factor:
             steps.append("p+1 hit")
-            return {
-                "status": "ok",
-                "n": str(n),
-                "p": str(factor.p),
-                "q": str(n // factor.p),
-                "method": factor.method,
-                "detail": factor.detail,
-                "steps": steps,
-                "time_ms": time_used_ms + factor.elapsed_ms
-            }
-        steps.append("p+1 missed")
+            return hit(sp, factor.p, factor.method, factor.detail)
+        miss(sp, "p+1 missed")
 
     # 6. ECM with parallel curves
+    update_time()
     if time_left_ms > 0:
         curves = get_curves_for_ecm(n)
         B1 = 10000
         B2 = 100000
-        factor = ecm_try_parallel(n, B1, B2, curves=curves, timeout_s=time_left_ms / 1000)
+        with tr.span("ecm", B1=B1, B2=B2, curves=curves, timeout_ms=time_left_ms) as sp:
+            if not _ecm_available():
+                sp.outcome = "unavailable"
+            factor = ecm_try_parallel(n, B1, B2, curves=curves, timeout_s=time_left_ms / 1000)
+            sp.iterations = curves if _ecm_available() else 0
         if factor:
             steps.append(f"ecm hit with {curves} curves")
-            return {
-                "status": "ok",
-                "n": str(n),
-                "p": str(factor.p),
-                "q": str(n // factor.p),
-                "method": factor.method,
-                "detail": factor.detail,
-                "steps": steps,
-                "time_ms": time_used_ms + factor.elapsed_ms
-            }
-        steps.append("ecm missed")
+            return hit(sp, factor.p, factor.method, factor.detail)
+        miss(sp, "ecm missed")
 
+    update_time()
+    status = "timeout" if time_left_ms <= 0 else "no factor found"
     return {
-        "status": "timeout" if time_left_ms <= 0 else "no factor found",
+        "status": status,
         "n": str(n),
         "steps": steps,
-        "time_ms": time_used_ms
+        "time_ms": time_used_ms,
+        "trace": tr.finish(status),
     }
+
+def factor_smart(n: int, max_ms: int = 5000, tracer: Tracer | None = None) -> dict | None:
+    """Hit dict from factorize_smart with integer p/q, or None if nothing was found (used by factor_server).
+    Pass a Tracer to keep the spans of a miss."""
+    res = factorize_smart(n, timeout_ms=max_ms, tracer=tracer)
+    if res.get("status") != "ok":
+        return None
+    return dict(res, p=int(res["p"]), q=int(res["q"]))
@@ -0,0 +1,118 @@
+# Per-stage spans for the factoring pipelines
+#
+# Every stage (trial, fermat, rho, p-1, p+1, ecm, ...) runs inside
+# tracer.span(stage, **params) and becomes one record:
+#   stage, params (B1, curves, instances, ...), start_ms / end_ms on the
+#   monotonic clock relative to the start of the trace, iterations, outcome
+# finish() writes each span as one JSON line to the "rsacrack.trace" logger
+# when TRACE_LOG=1 (stderr unless the application configured its own
+# handler), so slow stages can be found in the logs of real traffic.  It is
+# off for library callers; the servers (factor_server, asgi_app, app_demo)
+# turn it on unless TRACE_LOG is set.
+#
+# The active stage of each thread is also published (set_stage /
+# current_stage) so a profiler can group its samples by stage.
+
+from __future__ import annotations
+import os, json, time, logging, itertools, threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, List, Optional
+
+LOG_ENABLED = os.getenv("TRACE_LOG", "0") not in ("", "0", "false", "no")
+
+log = logging.getLogger("rsacrack.trace")
+_ids = itertools.count(1)
+
+# thread id -> active stage; read from the sampling profiler's thread
+_stage_by_thread: Dict[int, Optional[str]] = {}
+# thread id -> callback(stage), installed by the deterministic profiler
+_stage_hooks: Dict[int, Any] = {}
+
+def set_stage(stage: Optional[str]) -> None:
+    tid = threading.get_ident()
+    _stage_by_thread[tid] = stage
+    hook = _stage_hooks.get(tid)
+    if hook is not None:
+        hook(stage)
+
+def current_stage(thread_id: Optional[int] = None) -> Optional[str]:
+    return _stage_by_thread.get(threading.get_ident() if thread_id is None else thread_id)
+
+def _logger() -> logging.Logger:
+    if not log.handlers:
+        h = logging.StreamHandler()
+        h.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(h)
+        log.setLevel(logging.INFO)
+        log.propagate = False
+    return log
+
+@dataclass
+class Span:
+    stage: str
+    params: Dict[str, Any] = field(default_factory=dict)
+    start_ms: float = 0.0
+    end_ms: Optional[float] = None
+    iterations: Optional[int] = None
+    outcome: str = "miss"        # hit | miss | timeout | skipped | unavailable | error
+    detail: Optional[str] = None
+
+    @property
+    def duration_ms(self) -> float:
+        return round((self.end_ms if self.end_ms is not None else self.start_ms) - self.start_ms, 3)
+
+    def to_dict(self) -> dict:
+        d = asdict(self)
+        d["duration_ms"] = self.duration_ms
+        return d
+
+class Tracer:
+    """Collects the spans of one factoring call."""
+
+    def __init__(self, pipeline: str, n: Optional[int] = None, parent: Optional["Tracer"] = None):
+        self.pipeline = pipeline
+        self.bits = n.bit_length() if n is not None else None
+        self.trace_id = parent.trace_id if parent else f"{os.getpid()}-{next(_ids)}"
+        self.t0 = parent.t0 if parent else time.monotonic()
+        self.spans: List[Span] = parent.spans if parent else []
+
+    def now_ms(self) -> float:
+        return round((time.monotonic() - self.t0) * 1000.0, 3)
+
+    def elapsed_ms(self) -> int:
+        return int((time.monotonic() - self.t0) * 1000)
+
+    @contextmanager
+    def span(self, stage: str, **params):
+        s = Span(stage=stage, params={k: v for k, v in params.items() if v is not None}, start_ms=self.now_ms())
+        self.spans.append(s)
+        outer = current_stage()
+        set_stage(stage)
+        try:
+            yield s
+        except BaseException as e:
+            s.outcome, s.detail = "error", f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            s.end_ms = self.now_ms()
+            set_stage(outer)
+
+    def skip(self, stage: str, reason: str, **params) -> Span:
+        t = self.now_ms()
+        s = Span(stage=stage, params=params, start_ms=t, end_ms=t, outcome="skipped", detail=reason)
+        self.spans.append(s)
+        return s
+
+    def to_list(self) -> List[dict]:
+        return [s.to_dict() for s in self.spans]
+
+    def finish(self, outcome: str) -> List[dict]:
+        """Log every span as a JSON line; returns the spans as dicts."""
+        spans = self.to_list()
+        if LOG_ENABLED:
+            lg = _logger()
+            for s in spans:
+                lg.info(json.dumps(dict(s, trace_id=self.trace_id, pipeline=self.pipeline,
+                                        bits=self.bits, result=outcome), default=str))
+        return spans
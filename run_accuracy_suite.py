@@ -1,8 +1,9 @@
-import json, random, csv, urllib.request, urllib.parse
+import os, json, random, csv, urllib.request, urllib.parse
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from sympy import randprime, isprime
 
-BASE = "https://rsacrack.com"
+# live-server suite; offline, in-process numbers come from bench.py
+BASE = os.getenv("RSACRACK_URL", "http://127.0.0.1:8080").rstrip("/")
 TIMEOUT = 15  # seconds
 
 def http_json(path, params):
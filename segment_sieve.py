@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# segment_sieve.py — factor a block of consecutive integers in one sieve pass
+#
+# For a block [lo, hi) every prime p <= bound is applied to the block at
+# once: the multiples of p are found by stepping from (-lo) mod p, their
+# exponent is counted by dividing the block's remaining cofactors, and the
+# (index, p, e) hits are kept.  The few primes below STEP_PRIMES are stepped
+# one by one; the multiples of all larger ones are generated as one array.
+# What is left of n afterwards is 1, a prime (when it is below bound^2), or
+# a product of primes above the bound, which is the only case factored per
+# number (Brent's rho from tangent_prime_test), and only when that n is asked
+# for: a scan that jumps over most of a block never pays for the rest.  The
+# default bound is sqrt(hi), so the leftover is always 1 or prime;
+# SIEVE_BOUND caps it for very large n.
+#
+# Per block: spf, lpf, omega (distinct), Omega (with multiplicity) as arrays
+# (reading one factors every leftover), small_or_prime(limit) as a mask that
+# only primality-tests them, and factors(n) as a sorted [(p, e)] list.
+# Needs NumPy; n < 2^62.
+#
+#   from segment_sieve import BlockFactorer
+#   bf = BlockFactorer()
+#   kind, cnt = bf.classify(n)     # as coil_scanner.classify_and_count
+
+import math
+from collections import Counter
+
+import numpy as np
+
+BLOCK       = 1 << 16
+STEP_PRIMES = 64           # primes up to here are stepped one by one, larger ones batched
+SIEVE_BOUND = 1 << 24
+MAX_N       = 1 << 62
+
+_primes = np.zeros(0, dtype=np.int64)
+
+def primes_up_to(bound: int) -> np.ndarray:
+    """Primes <= bound (Eratosthenes, cached and grown per process)."""
+    global _primes
+    if bound < 2:
+        return _primes[:0]
+    if not len(_primes) or _primes[-1] < bound:
+        top = max(bound, 2 * int(_primes[-1]) if len(_primes) else 0)
+        flags = np.ones(top + 1, dtype=bool)
+        flags[:2] = False
+        for p in range(2, math.isqrt(top) + 1):
+            if flags[p]:
+                flags[p * p::p] = False
+        _primes = np.flatnonzero(flags).astype(np.int64)
+    return _primes[:np.searchsorted(_primes, bound, side="right")]
+
+def _big_factor(m: int) -> list:
+    """Prime factors of a leftover cofactor: no prime factor <= bound and m < 2^62,
+    so Brent's rho finds one in ~sqrt(p) steps; p-1/ECM would only cost time here."""
+    import random
+    from tangent_prime_test import is_probable_prime, _rho_brent
+    if is_probable_prime(m):
+        return [m]
+    rng = random.Random(m)
+    d = 1
+    while not 1 < d < m:
+        d = _rho_brent(m, rng)
+    return sorted(_big_factor(d) + _big_factor(m // d))
+
+class FactorBlock:
+    """Complete factorizations of lo <= n < hi (lo >= 2)."""
+
+    def __init__(self, lo: int, hi: int, bound: int = None, big_factor=_big_factor):
+        if lo < 2 or hi <= lo or hi > MAX_N:
+            raise ValueError(f"block [{lo}, {hi}) outside 2 <= n < 2^62")
+        self.lo, self.hi = lo, hi
+        self.bound = bound or min(math.isqrt(hi - 1), SIEVE_BOUND)
+        self._big_factor = big_factor
+        size = hi - lo
+        rem = np.arange(lo, hi, dtype=np.int64)
+        self._spf = np.zeros(size, dtype=np.int64)
+        self._lpf = np.zeros(size, dtype=np.int64)
+        self._omega = np.zeros(size, dtype=np.int64)
+        self._Omega = np.zeros(size, dtype=np.int64)
+        hit_i, hit_p, hit_e = [], [], []
+
+        def apply(idx, p):
+            # idx: block positions divisible by p (p scalar or one prime per position)
+            e = np.ones(len(idx), dtype=np.int64)
+            rem[idx] //= p
+            more = rem[idx] % p == 0
+            while more.any():
+                sub = idx[more]
+                rem[sub] //= p if np.ndim(p) == 0 else p[more]
+                e[more] += 1
+                more[more] = rem[sub] % (p if np.ndim(p) == 0 else p[more]) == 0
+            pa = np.broadcast_to(p, idx.shape)
+            first = self._spf[idx] == 0
+            self._spf[idx[first]] = pa[first]
+            self._lpf[idx] = pa           # primes come in ascending order
+            self._omega[idx] += 1
+            self._Omega[idx] += e
+            hit_i.append(idx); hit_p.append(np.array(pa)); hit_e.append(e)
+
+        primes = primes_up_to(self.bound)
+        cut = np.searchsorted(primes, STEP_PRIMES, side="right")
+        for p in primes[:cut].tolist():
+            idx = np.arange((-lo) % p, size, p, dtype=np.int64)
+            if len(idx):
+                apply(idx, p)
+        big = primes[cut:]
+        if len(big):
+            # every multiple of every larger prime in one array: prime k has
+            # count[k] multiples off[k], off[k]+p, ... inside the block
+            off = (-lo) % big
+            ok = off < size
+            off, big = off[ok], big[ok]
+            count = (size - 1 - off) // big + 1
+            ps = np.repeat(big, count)
+            step = np.arange(len(ps)) - np.repeat(np.cumsum(count) - count, count)
+            idx = np.repeat(off, count) + step * ps
+            # one n can have several of these primes; fancy-indexed updates need
+            # unique positions, so apply one prime per position per round
+            # (np.unique keeps the first, i.e. smallest, prime of each position)
+            while len(idx):
+                _, first = np.unique(idx, return_index=True)
+                apply(idx[first], ps[first])
+                rest = np.ones(len(idx), dtype=bool)
+                rest[first] = False
+                idx, ps = idx[rest], ps[rest]
+
+        # leftovers: 1, a prime, or (bound < sqrt(n)) a product of primes > bound
+        left = np.flatnonzero(rem > 1)
+        surely_prime = rem[left] <= self.bound * self.bound
+        idx = left[surely_prime]
+        if len(idx):
+            apply(idx, rem[idx].copy())       # a prime above every sieved one
+        self._pending = {i: int(rem[i]) for i in left[~surely_prime].tolist()}  # factored on first use
+        self._late = {}                                                         # i -> [(p, e)] of those
+
+        hi_, hp, he = (np.concatenate(x) if x else np.zeros(0, dtype=np.int64) for x in (hit_i, hit_p, hit_e))
+        order = np.lexsort((hp, hi_))
+        # Python lists: factors() is called once per n and list slicing beats array indexing there
+        self._hit_p, self._hit_e = hp[order].tolist(), he[order].tolist()
+        self._starts = np.searchsorted(hi_[order], np.arange(size + 1)).tolist()
+        self._total = self._Omega.tolist()
+
+    def _leftover(self, i) -> list:
+        """[(p, e)] of position i's cofactor above the bound; factored the first time it is asked for."""
+        m = self._pending.pop(i, None)
+        if m is not None:
+            fs = sorted(Counter(self._big_factor(m)).items())
+            self._late[i] = fs
+            if self._spf[i] == 0:
+                self._spf[i] = fs[0][0]
+            self._lpf[i] = fs[-1][0]
+            self._omega[i] += len(fs)
+            self._Omega[i] += sum(e for _, e in fs)
+            self._total[i] = int(self._Omega[i])
+        return self._late.get(i, [])
+
+    def _settle(self):
+        for i in list(self._pending):
+            self._leftover(i)
+
+    @property
+    def spf(self) -> np.ndarray:
+        self._settle()
+        return self._spf
+
+    @property
+    def lpf(self) -> np.ndarray:
+        self._settle()
+        return self._lpf
+
+    @property
+    def omega(self) -> np.ndarray:
+        self._settle()
+        return self._omega
+
+    @property
+    def Omega(self) -> np.ndarray:
+        self._settle()
+        return self._Omega
+
+    def small_or_prime(self, limit: int) -> np.ndarray:
+        """(spf <= limit) | (Omega == 1) without factoring the leftovers: one with no
+        sieved prime below it is n itself and only needs a primality test."""
+        if self._pending and limit > self.bound:
+            self._settle()       # a leftover's smallest prime could be <= limit
+        out = ((self._spf > 0) & (self._spf <= limit)) | (self._Omega == 1)
+        if self._pending:
+            from tangent_prime_test import is_probable_prime
+            for i, m in self._pending.items():   # Omega counts only the sieved primes here
+                out[i] = 0 < self._spf[i] <= limit or (self._omega[i] == 0 and is_probable_prime(m))
+        return out
+
+    def __contains__(self, n) -> bool:
+        return self.lo <= n < self.hi
+
+    def factors(self, n: int) -> list:
+        """[(p, e), ...] ascending."""
+        i = n - self.lo
+        a, b = self._starts[i], self._starts[i + 1]
+        out = list(zip(self._hit_p[a:b], self._hit_e[a:b]))
+        if self._pending or self._late:
+            out += self._leftover(i)     # all above the bound, so the order holds
+        return out
+
+    def total(self, n: int) -> int:
+        """Omega(n): prime factors with multiplicity."""
+        i = n - self.lo
+        if i in self._pending:
+            self._leftover(i)
+        return self._total[i]
+
+    def is_prime(self, n: int) -> bool:
+        return self.total(n) == 1
+
+class BlockFactorer:
+    """Factors n on demand from sieved blocks; a new block starts at the first n outside the current one."""
+
+    def __init__(self, block: int = BLOCK, bound: int = None, stop: int = None):
+        self.block, self.bound = block, bound
+        self.end = min(MAX_N, stop + 1) if stop is not None else MAX_N   # no block reaches past stop
+        self.current = None
+
+    def block_for(self, n: int) -> FactorBlock:
+        if self.current is None or n not in self.current:
+            self.current = FactorBlock(n, min(n + self.block, self.end), self.bound)
+        return self.current
+
+    def classify(self, n: int):
+        """("prime" | "semiprime" | "composite", Counter({p: e}))."""
+        fb = self.block_for(n)
+        cnt = Counter(dict(fb.factors(n)))
+        total = fb.total(n)
+        return ("prime" if total == 1 else "semiprime" if total == 2 else "composite"), cnt
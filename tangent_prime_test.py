@@ -47,13 +47,24 @@ def _is_probable_prime_py(n:int)->bool:
 def is_probable_prime(n:int)->bool:
     return _is_prime_gmp(n) if HAVE_GMPY2 else _is_probable_prime_py(n)
 
+_TRIAL_PRIMES: list[int] = []
+_TRIAL_BOUND = 0
+
+def load_prime_table(bound:int=100000)->list[int]:
+    """Primes <= bound for trial division; built once per process (factor_pool workers do it at start)."""
+    global _TRIAL_PRIMES, _TRIAL_BOUND
+    if _TRIAL_BOUND < bound:  # not _TRIAL_PRIMES[-1]: the largest prime <= bound is usually < bound
+        _TRIAL_BOUND = bound
+        sieve=bytearray(b"\x01")*(bound+1); sieve[:2]=b"\x00\x00"
+        for p in range(2, math.isqrt(bound)+1):
+            if sieve[p]: sieve[p*p::p]=bytes(len(range(p*p,bound+1,p)))
+        _TRIAL_PRIMES=[i for i,v in enumerate(sieve) if v]
+    return _TRIAL_PRIMES
+
 def _trial_division(n:int, bound:int=100000)->int|None:
-    for p in (2,3,5):
+    for p in load_prime_table(bound):
+        if p*p>n or p>bound: break
         if n%p==0: return p
-    f, steps, i = 7, (4,2,4,2,4,6,2,6), 0
-    while f*f<=n and f<=bound:
-        if n%f==0: return f
-        f += steps[i]; i=(i+1)&7
     return None
 
 def _pollard_pm1(n:int, B:int=200000)->int:
@@ -142,12 +153,15 @@ def _factor_rec(n:int, out:list[int], deadline):
             _factor_rec(g,out,deadline); _factor_rec(n//g,out,deadline); return
         rng.seed(rng.randrange(1<<63) ^ (n<<7))
 
-def factor(n:int)->list[int]:
+def factor(n:int, max_seconds:float|None=None)->list[int]:
+    """Prime factors of n. max_seconds <= 0 means no limit; None falls back to $FACTOR_MAX_SECONDS."""
     if n<2: return [n]
     for p in _SMALL_PRIMES:
         if n==p: return [p]
-    s=os.getenv("FACTOR_MAX_SECONDS","0").strip().lower()
-    deadline=None if s in ("","0","inf","infinite") else (time.perf_counter()+float(s))
+    if max_seconds is None:
+        s=os.getenv("FACTOR_MAX_SECONDS","0").strip().lower()
+        max_seconds=0.0 if s in ("","0","inf","infinite") else float(s)
+    deadline=None if max_seconds<=0 else (time.perf_counter()+max_seconds)
     out=[]; _factor_rec(int(n), out, deadline); return out
 
 def tangent_equal_split_info(*a,**k): return {"note":"not implemented"}
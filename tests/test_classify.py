@@ -0,0 +1,86 @@
+# tests/test_classify.py — rsacrack.classify against known factorizations
+#
+#   python -m pytest -q tests
+
+import os, sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from rsacrack.classify import TRIAL_LIMIT, classify, factorize
+
+P32, P33 = 4294967311, 8589934609                       # nextprime(2^32), nextprime(2^33)
+P22 = (4194319, 4194409, 4195307)                        # primes just above 2^22
+M89 = 2**89 - 1                                          # Mersenne prime
+
+def _omega(f):
+    return sum(f.values())
+
+@pytest.mark.parametrize("n", [2, 3, 97, 1000003, M89])
+def test_prp(n):
+    c = classify(n)
+    assert (c.kind, c.proof) == ("prime", "prp")
+    assert c.primes == {n: 1}
+    assert factorize(n, c) == {n: 1}
+
+@pytest.mark.parametrize("n, kind, f", [
+    (4, "semiprime", {2: 2}),
+    (91, "semiprime", {7: 1, 13: 1}),
+    (8, "other", {2: 3}),
+    (210, "other", {2: 1, 3: 1, 5: 1, 7: 1}),
+    (3 * M89, "semiprime", {3: 1, M89: 1}),          # small factor, prime cofactor
+    (9 * M89, "other", {3: 2, M89: 1}),
+    (3 * P32 * P33, "other", {3: 1, P32: 1, P33: 1}),  # small factor, composite cofactor
+])
+def test_trial(n, kind, f):
+    c = classify(n)
+    assert (c.kind, c.proof) == (kind, "trial")
+    assert factorize(n, c) == f
+
+@pytest.mark.parametrize("p, q", [(1000003, 1000033), (1000003, 1000003), (4194319, 1000003)])
+def test_cube_root(p, q):
+    n = p * q
+    c = classify(n)
+    assert (c.kind, c.proof) == ("semiprime", "cube-root")
+    assert c.small == {} and c.bound ** 3 >= n
+    assert factorize(n, c) == ({p: 2} if p == q else {min(p, q): 1, max(p, q): 1})
+
+def test_split_semiprime():
+    n = P32 * P33
+    assert n > TRIAL_LIMIT ** 3
+    c = classify(n)
+    assert (c.kind, c.proof) == ("semiprime", "split")
+    assert sorted(c.split) == [P32, P33]
+    assert c.primes == {P32: 1, P33: 1}
+    assert factorize(n, c) == {P32: 1, P33: 1}
+
+def test_split_other():
+    n = P22[0] * P22[1] * P22[2]
+    assert n > TRIAL_LIMIT ** 3
+    c = classify(n)
+    assert (c.kind, c.proof) == ("other", "split")
+    assert factorize(n, c) == {p: 1 for p in P22}
+
+def test_split_square():
+    c = classify(P32 * P32)
+    assert (c.kind, c.proof, c.split) == ("semiprime", "split", (P32, P32))
+    assert c.primes == {P32: 2}
+
+def test_unknown_when_split_times_out():
+    n = P32 * P33
+    c = classify(n, time_ms=0)
+    assert (c.kind, c.proof, c.primes) == ("unknown", "", None)
+    assert factorize(n, c) == {P32: 1, P33: 1}
+
+def test_matches_sympy_below_20000():
+    sympy = pytest.importorskip("sympy")
+    for n in range(2, 20000):
+        f = {int(p): e for p, e in sympy.factorint(n).items()}
+        c = classify(n)
+        assert c.kind == ("prime" if _omega(f) == 1 else "semiprime" if _omega(f) == 2 else "other"), n
+        assert factorize(n, c) == f, n
+
+def test_rejects_below_two():
+    with pytest.raises(ValueError):
+        classify(1)
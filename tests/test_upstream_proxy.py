@@ -0,0 +1,82 @@
+# tests/test_upstream_proxy.py — deadline and streaming of the Node API proxy
+#
+# _read_until relies on read1 and the connection's socket of the urllib3
+# response (see its docstring); these tests fail when an upgrade moves them.
+#
+#   python -m pytest -q tests
+
+import os, sys, time, threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import upstream_proxy
+
+BODY = b"hello" * 1000
+
+class _Upstream(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.startswith("/api/empty"):
+            self.send_response(204)
+            self.end_headers()
+            return
+        if self.path.startswith("/api/trickle"):   # 1 byte per 10 ms of a 100 kB body
+            self.send_response(200)
+            self.send_header("Content-Length", "100000")
+            self.end_headers()
+            try:
+                for _ in range(100000):
+                    self.wfile.write(b"x")
+                    self.wfile.flush()
+                    time.sleep(0.01)
+            except OSError:
+                pass
+            return
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+@pytest.fixture(scope="module")
+def client():
+    from flask import Flask
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _Upstream)
+    srv.daemon_threads = True
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    old, upstream_proxy.UPSTREAM = upstream_proxy.UPSTREAM, f"http://127.0.0.1:{srv.server_port}"
+    app = Flask(__name__)
+    app.add_url_rule("/api/<path:path>", view_func=lambda path: upstream_proxy.forward(f"/api/{path}"))
+    yield app.test_client()
+    upstream_proxy.UPSTREAM = old
+    srv.shutdown()
+
+def test_read_hooks_present():
+    import urllib3
+    raw = urllib3.response.HTTPResponse
+    assert hasattr(raw, "read1") or hasattr(urllib3.connection.HTTPConnection.response_class, "read1")
+    assert isinstance(getattr(raw, "connection", None), property)
+
+def test_full_body(client):
+    for _ in range(2):   # the second one reuses the pooled connection
+        r = client.get("/api/ok")
+        assert (r.status_code, r.get_data()) == (200, BODY)
+
+def test_empty_body(client):
+    r = client.get("/api/empty")
+    assert (r.status_code, r.get_data()) == (204, b"")
+
+def test_deadline_cuts_trickling_body(client):
+    t0 = time.monotonic()
+    r = client.get("/api/trickle", headers={"X-Deadline-Ms": "500"})
+    body = r.get_data()
+    took = time.monotonic() - t0
+    assert r.status_code == 200
+    assert 0 < len(body) < 100000
+    assert took < 1.5
@@ -1,8 +1,15 @@
 #!/usr/bin/env python3
 # trail_compare.py — sweep a range and export E(n)
+#
+# The range is swept with trail_length.sweep (divisor sieve, batched coil
+# geometry, segments in a process pool); rows are streamed to the CSV and
+# the excess statistics by prime/composite are kept as running totals, so
+# nothing grows with the range.  --scalar uses trail_length() per n (sympy).
+#
+#   python trail_compare.py 2 10000000 --jobs 8 --stats-only
 
-import argparse, csv
-from trail_length import trail_length
+import argparse, csv, json, sys, time
+from trail_length import trail_length, sweep, RunningStats, SEGMENT
 
 def main():
     ap = argparse.ArgumentParser()
@@ -10,16 +17,50 @@ def main():
     ap.add_argument("end", type=int)
     ap.add_argument("--omega", type=float, default=0.3)
     ap.add_argument("--out", default="trail_excess.csv")
+    ap.add_argument("--jobs", type=int, default=None, help="worker processes (default: all CPUs)")
+    ap.add_argument("--segment", type=int, default=SEGMENT, help="numbers per sieve segment")
+    ap.add_argument("--stats-only", action="store_true", help="no CSV, only the E(n) statistics")
+    ap.add_argument("--scalar", action="store_true", help="one trail_length() (sympy) per n")
     args = ap.parse_args()
+    if args.start < 1 or args.end < args.start:
+        ap.error("need 1 <= start <= end")
 
-    rows = [("n","divisors","L(n)","Chord","Excess","is_prime")]
-    for n in range(args.start, args.end+1):
-        D, L, C, E = trail_length(n, omega=args.omega)
-        rows.append((n, len(D), f"{L:.6f}", f"{C:.6f}", f"{E:.6f}", 1 if len(D)==2 else 0))
+    if args.scalar:
+        rows = [("n","divisors","L(n)","Chord","Excess","is_prime")]
+        for n in range(args.start, args.end+1):
+            D, L, C, E = trail_length(n, omega=args.omega)
+            rows.append((n, len(D), f"{L:.6f}", f"{C:.6f}", f"{E:.6f}", 1 if len(D)==2 else 0))
 
-    with open(args.out, "w", newline="") as f:
-        csv.writer(f).writerows(rows)
-    print(f"Wrote {args.out} with {len(rows)-1} rows.")
+        with open(args.out, "w", newline="") as f:
+            csv.writer(f).writerows(rows)
+        print(f"Wrote {args.out} with {len(rows)-1} rows.")
+        return
+
+    t0 = time.perf_counter()
+    stats = {"prime": RunningStats(), "composite": RunningStats()}
+    f = None if args.stats_only else open(args.out, "w", newline="")
+    written = 0
+    try:
+        w = csv.writer(f) if f else None
+        if w:
+            w.writerow(("n","divisors","L(n)","Chord","Excess","is_prime"))
+        for seg_stats, seg in sweep(args.start, args.end, args.omega, args.jobs, args.segment,
+                                    keep_rows=not args.stats_only):
+            for cls, st in seg_stats.items():
+                stats[cls].merge(st)
+            if w:
+                cols = (seg["n"].tolist(), seg["divisors"].tolist(), seg["L"].tolist(),
+                        seg["chord"].tolist(), seg["excess"].tolist())
+                w.writerows((n, d, f"{L:.6f}", f"{C:.6f}", f"{E:.6f}", 1 if d == 2 else 0)
+                            for n, d, L, C, E in zip(*cols))
+                written += len(cols[0])
+    finally:
+        if f:
+            f.close()
+    if f:
+        print(f"Wrote {args.out} with {written} rows.")
+    print(json.dumps({cls: st.as_dict() for cls, st in stats.items()}, indent=2))
+    print(f"{args.end - args.start + 1} numbers in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
 
 if __name__ == "__main__":
     main()
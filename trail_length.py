@@ -5,7 +5,6 @@ import math, argparse
 from itertools import product
 from typing import List
 import numpy as np
-from sympy import factorint
 
 # --- coil definition (match your repo’s choice) ---
 def coil_coords(t: int, omega=0.3):
@@ -25,6 +24,7 @@ def divisors_from_factorization(factors: dict) -> List[int]:
     return sorted(divs)
 
 def trail_length(n: int, omega=0.3):
+    from sympy import factorint  # slow import; the range sweep below does not need it
     fac = factorint(n)  # {p: e}
     D = divisors_from_factorization(fac)  # sorted divisors
     P = [coil_coords(d, omega=omega) for d in D]
@@ -35,6 +35,135 @@ def trail_length(n: int, omega=0.3):
     excess = L - chord
     return D, L, chord, excess
 
+# --- range mode: divisor sieve + batched coil geometry ---
+# Every n in [a, b) gets its divisors from one sieve pass: for each
+# d <= sqrt(b) the multiples m of d in the segment (m >= d*d) yield the pair
+# d, m/d.  The (n, divisor) pairs are sorted once, the coil points and the
+# segment lengths between consecutive divisors are computed as whole-array
+# operations and summed per n with bincount.  Same formulas as trail_length.
+
+SEGMENT = 1 << 15
+
+def coil_coords_array(t, omega=0.3):
+    t = np.asarray(t, dtype=np.float64)
+    r = 1.0 / np.log(t + 2.0)
+    theta = omega * t
+    return r * np.cos(theta), r * np.sin(theta), t
+
+def _divisor_pairs(a: int, b: int):
+    """(n, d) int64 arrays: every divisor d of every n in [a, b), unsorted."""
+    owners, divs = [], []
+    for d in range(1, math.isqrt(b - 1) + 1):
+        m0 = max(d * d, -(-a // d) * d)
+        if m0 >= b:
+            continue
+        m = np.arange(m0, b, d, dtype=np.int64)
+        co = m // d
+        owners += [m, m[co != d]]
+        divs += [np.full(len(m), d, dtype=np.int64), co[co != d]]
+    return np.concatenate(owners), np.concatenate(divs)
+
+def trail_segment(a: int, b: int, omega=0.3):
+    """trail_length for every n in [a, b), as arrays: n, divisors (count), L, chord, excess."""
+    if a < 1 or b <= a:
+        raise ValueError(f"need 1 <= a < b, got [{a}, {b})")
+    owner, div = _divisor_pairs(a, b)
+    order = np.lexsort((div, owner))
+    owner, div = owner[order], div[order]
+    x, y, z = coil_coords_array(div, omega)
+    same = owner[1:] == owner[:-1]          # consecutive divisors of the same n
+    dx, dy, dz = np.diff(x), np.diff(y), np.diff(z)
+    seg = np.sqrt(dx*dx + dy*dy + dz*dz)
+    idx = owner - a
+    L = np.bincount(idx[1:][same], weights=seg[same], minlength=b - a)
+    ndiv = np.bincount(idx, minlength=b - a)
+    n = np.arange(a, b, dtype=np.int64)
+    cx, cy, cz = coil_coords_array(n, omega)
+    ox, oy, oz = coil_coords_array(1, omega)
+    ex, ey, ez = cx - ox, cy - oy, cz - oz
+    chord = np.sqrt(ex*ex + ey*ey + ez*ez)
+    return {"n": n, "divisors": ndiv, "L": L, "chord": chord, "excess": L - chord}
+
+class RunningStats:
+    """Count/mean/variance/min/max without keeping the values (Welford, merged per batch)."""
+
+    def __init__(self):
+        self.count, self.mean, self.m2 = 0, 0.0, 0.0
+        self.min, self.max, self.argmax = math.inf, -math.inf, None
+
+    def add_array(self, values, keys=None):
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return
+        nb, mb = len(values), float(values.mean())
+        m2b = float(((values - mb) ** 2).sum())
+        n = self.count + nb
+        delta = mb - self.mean
+        self.mean += delta * nb / n
+        self.m2 += m2b + delta * delta * self.count * nb / n
+        self.count = n
+        self.min = min(self.min, float(values.min()))
+        i = int(values.argmax())
+        if values[i] > self.max:
+            self.max = float(values[i])
+            self.argmax = int(keys[i]) if keys is not None else None
+
+    def merge(self, other: "RunningStats"):
+        if not other.count:
+            return
+        n = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / n
+        self.m2 += other.m2 + delta * delta * self.count * other.count / n
+        self.count = n
+        self.min = min(self.min, other.min)
+        if other.max > self.max:
+            self.max, self.argmax = other.max, other.argmax
+
+    def as_dict(self) -> dict:
+        std = math.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else 0.0
+        return {"count": self.count, "mean": self.mean, "std": std,
+                "min": self.min if self.count else None, "max": self.max if self.count else None,
+                "argmax": self.argmax}
+
+def segment_stats(seg) -> dict:
+    """{"prime": RunningStats, "composite": RunningStats} of the excess over one segment (n = 1 left out)."""
+    out = {}
+    for cls, mask in (("prime", seg["divisors"] == 2), ("composite", seg["divisors"] > 2)):
+        st = RunningStats()
+        st.add_array(seg["excess"][mask], seg["n"][mask])
+        out[cls] = st
+    return out
+
+def _sweep_task(args):
+    a, b, omega, keep_rows = args
+    seg = trail_segment(a, b, omega)
+    return segment_stats(seg), (seg if keep_rows else None)
+
+def sweep(start: int, end: int, omega=0.3, jobs=None, segment=SEGMENT, keep_rows=True):
+    """
+    Yield (stats, rows) per segment of [start, end], in order; segments run
+    in a process pool (jobs <= 1: in this process).  rows is the
+    trail_segment dict, or None when keep_rows is False.
+    """
+    import os
+    tasks = [(a, min(a + segment, end + 1), omega, keep_rows) for a in range(start, end + 1, segment)]
+    jobs = jobs or os.cpu_count() or 1
+    if jobs <= 1 or len(tasks) <= 1:
+        for t in tasks:
+            yield _sweep_task(t)
+        return
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        # ordered results; at most a few segments per worker in flight keeps memory flat
+        pending, it = [], iter(tasks)
+        for t in it:
+            pending.append(pool.submit(_sweep_task, t))
+            if len(pending) >= 2 * jobs:
+                yield pending.pop(0).result()
+        for f in pending:
+            yield f.result()
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("N", type=int, nargs="+", help="integers to evaluate")
@@ -0,0 +1,151 @@
+# upstream_proxy.py — pooled, streaming passthrough to the Node API (:3000)
+#
+# One keep-alive Session per worker process with a bounded connection pool
+# (UPSTREAM_POOL_SIZE; extra concurrent calls wait for a free connection
+# instead of opening more).  Request and response bodies are streamed in
+# chunks, never buffered whole.  An X-Deadline-Ms header (milliseconds the
+# caller is still willing to wait) caps the whole exchange, body included: it
+# is forwarded with what is left of it, and a response still streaming when
+# it runs out is cut off.
+
+import os, time
+from flask import request, Response, jsonify
+
+UPSTREAM     = os.getenv("NODE_UPSTREAM", "http://127.0.0.1:3000").rstrip("/")
+POOL_SIZE    = int(os.getenv("UPSTREAM_POOL_SIZE", "16"))
+CONNECT_S    = 3.0
+CHUNK        = 64 * 1024
+DEADLINE_HDR = "X-Deadline-Ms"
+
+# RFC 7230 hop-by-hop headers, plus the ones the WSGI server recomputes
+HOP_BY_HOP = {"connection", "keep-alive", "proxy-authenticate", "proxy-authorization",
+              "te", "trailer", "trailers", "transfer-encoding", "upgrade", "host"}
+
+_session = None
+_session_pid = None
+
+def session():
+    """Shared Session; re-created after a fork so workers never share sockets."""
+    global _session, _session_pid
+    if _session is None or _session_pid != os.getpid():
+        import requests  # ~80 ms; only once something is proxied
+        from requests.adapters import HTTPAdapter
+        s = requests.Session()
+        s.trust_env = False  # localhost upstream: skip proxy/netrc lookups per call
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, pool_block=True, max_retries=0)
+        s.mount("http://", adapter); s.mount("https://", adapter)
+        _session, _session_pid = s, os.getpid()
+    return _session
+
+class _Body:
+    """Incoming request body with a known length: sent as-is, not chunked."""
+    def __init__(self, stream, length):
+        self.stream, self.length = stream, length
+    def __len__(self):
+        return self.length
+    def read(self, size=CHUNK):
+        return self.stream.read(size)
+
+def _iter_body(stream):
+    while True:
+        chunk = stream.read(CHUNK)
+        if not chunk:
+            return
+        yield chunk
+
+def _request_body():
+    if request.content_length is not None:
+        return _Body(request.stream, request.content_length) if request.content_length else None
+    if "chunked" in request.headers.get("Transfer-Encoding", "").lower():
+        return _iter_body(request.stream)
+    return None
+
+def _deadline_s(timeout_s):
+    raw = request.headers.get(DEADLINE_HDR)
+    if raw is None:
+        return timeout_s
+    try:
+        return min(timeout_s, int(raw) / 1000.0)
+    except ValueError:
+        return timeout_s
+
+def _read_until(resp, deadline):
+    """read(n) for resp's raw body that returns what has arrived rather than
+    waiting for n bytes (a trickling upstream would hold one read for ever), and
+    never waits on the socket past deadline; TimeoutError once it has passed.
+
+    read1 is public on urllib3 2; on the 1.26 line pinned in requirements.txt
+    it is the http.client response underneath (tests/test_upstream_proxy.py
+    fails if that moves).  Nothing is optional here: without both hooks the
+    deadline could not hold, so a missing one raises instead of streaming."""
+    raw = resp.raw
+    read1 = ((lambda n: raw.read1(n, decode_content=False)) if hasattr(raw, "read1")
+             else raw._fp.read1)
+    sock = raw.connection.sock
+    def read(n):
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise TimeoutError("deadline exceeded")
+        sock.settimeout(left)     # this read's timeout is whatever is left of the deadline
+        return read1(n)
+    return read
+
+def forward(path: str, method=None, timeout_s=300, allow_headers=("content-type", "accept", "authorization"),
+            fixed_headers=None, error_status=502):
+    """Stream the current request to UPSTREAM + path and the reply back."""
+    import requests
+    t0 = time.monotonic()
+    budget = _deadline_s(timeout_s)
+    deadline = t0 + budget
+    if budget <= 0:
+        return jsonify(ok=False, error="deadline exceeded"), 504
+    headers = {k: v for k, v in request.headers.items() if k.lower() in allow_headers}
+    headers.update(fixed_headers or {})
+    if request.content_length is not None:
+        headers["Content-Length"] = str(request.content_length)
+    if DEADLINE_HDR in request.headers:
+        headers[DEADLINE_HDR] = str(max(1, int((budget - (time.monotonic() - t0)) * 1000)))
+    try:
+        resp = session().request(
+            method=method or request.method,
+            url=f"{UPSTREAM}{path}",
+            params=request.args,
+            data=_request_body(),
+            headers=headers,
+            stream=True,
+            allow_redirects=False,
+            timeout=(min(CONNECT_S, budget), budget),
+        )
+    except requests.Timeout:
+        return jsonify(ok=False, error="upstream timeout"), 504
+    except Exception as e:
+        return jsonify(ok=False, error=f"proxy error: {e}"), error_status
+
+    # body bytes pass through undecoded, so Content-Encoding/Length stay valid
+    hdrs = [(k, v) for k, v in resp.headers.items() if k.lower() not in HOP_BY_HOP]
+
+    try:
+        read = _read_until(resp, deadline)
+    except AttributeError:
+        resp.close()
+        raise
+    def body():
+        done = False
+        try:
+            while True:
+                chunk = read(CHUNK)
+                if not chunk:
+                    done = True
+                    return
+                yield chunk
+        except Exception:
+            pass  # upstream went away or the deadline passed mid-body; status is already sent
+        finally:
+            if done:
+                resp.raw.release_conn()   # fully read: the connection goes back to the pool
+            else:
+                resp.close()              # part-read: the connection is dropped
+
+    out = Response(body(), resp.status_code, headers=hdrs, direct_passthrough=True)
+    out.headers["X-Accel-Buffering"] = "no"
+    return out
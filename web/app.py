@@ -1,11 +1,15 @@
 from rho_api import rho_bp
+from batch_api import batch_bp
 import time
 from flask import Flask, request, jsonify, send_from_directory
 from werkzeug.exceptions import BadRequest
 from lotto_factor import factor_lotto_64
+import rate_limit, metrics
 
 app = Flask(__name__, static_folder="static")
 app.register_blueprint(rho_bp)
+app.register_blueprint(batch_bp)
+metrics.init_app(app)
 
 @app.get("/")
 def index():
@@ -15,6 +19,7 @@ def _factor_core(n: int, budget_ms: int|None):
     t0 = time.perf_counter()
     res = factor_lotto_64(n, budget_ms=budget_ms)
     dt_ms = int((time.perf_counter() - t0) * 1000)
+    metrics.record_factor("lotto", dt_ms / 1000.0, n.bit_length(), res is not None)
     if res is None:
         return {"ok": True, "n": str(n), "duration_ms": dt_ms, "result": "none"}
     p, q = res
@@ -36,6 +41,8 @@ def api_lotto_factor():
         raise BadRequest(f"Invalid payload: {e}")
     if n < 0 or n > 0xFFFFFFFFFFFFFFFF:
         raise BadRequest("n must be a 64-bit unsigned integer (0..2^64-1)")
+    limited = rate_limit.limit("lotto", n.bit_length(), budget_ms)
+    if limited: return limited
     return jsonify(_factor_core(n, budget_ms))
 
 # New GET endpoint for your UI (query params)
@@ -58,50 +65,22 @@ def api_factor_query():
             raise BadRequest("timeout_ms must be integer")
     if n < 0 or n > 0xFFFFFFFFFFFFFFFF:
         raise BadRequest("n must be a 64-bit unsigned integer (0..2^64-1)")
+    limited = rate_limit.limit("lotto", n.bit_length(), budget_ms)
+    if limited: return limited
     return jsonify(_factor_core(n, budget_ms))
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=8080)
 
 # --- Lotto-128 proxy to Node API ---
-from flask import request, Response, jsonify
-import requests as _rq
+from upstream_proxy import forward as _forward
 
 @app.route('/api/lotto128_factor', methods=['POST'])
 def lotto128_factor_proxy():
-    try:
-        resp = _rq.post(
-            'http://127.0.0.1:3000/api/lotto128_factor',
-            data=request.get_data(),
-            headers={'Content-Type': 'application/json'},
-            timeout=120
-        )
-        return Response(resp.content, resp.status_code, headers={
-            'Content-Type': resp.headers.get('Content-Type','application/json')
-        })
-    except Exception as e:
-        return jsonify(ok=False, error=f'proxy error: {e}'), 500
+    return _forward('/api/lotto128_factor', method='POST', timeout_s=120, allow_headers=(),
+                    fixed_headers={'Content-Type': 'application/json'}, error_status=500)
 
 # --- Generic API proxy to Node (:3000) ---
-from flask import request, Response, jsonify
-import requests as _rq
-
 @app.route('/api/<path:path>', methods=['GET','POST','PUT','DELETE','PATCH','OPTIONS'])
 def api_proxy(path):
-    try:
-        url = f'http://127.0.0.1:3000/api/{path}'
-        resp = _rq.request(
-            method=request.method,
-            url=url,
-            params=request.args,
-            data=request.get_data(),
-            headers={k:v for k,v in request.headers.items()
-                     if k.lower() in ('content-type','accept','authorization')},
-            timeout=300
-        )
-        # filter hop-by-hop headers
-        drop = {'content-encoding','transfer-encoding','connection'}
-        hdrs = [(k,v) for k,v in resp.headers.items() if k.lower() not in drop]
-        return Response(resp.content, resp.status_code, headers=hdrs)
-    except Exception as e:
-        return jsonify(ok=False, error=f'proxy error: {e}'), 502
+    return _forward(f'/api/{path}', timeout_s=300)
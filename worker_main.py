@@ -1,4 +1,4 @@
-import os, sys, time, json, random, requests
+import os, sys, time, json, random
 
 BASE_URL      = (os.getenv("BASE_URL", "https://rsacrack.com") or "https://rsacrack.com").rstrip("/")
 TARGET_N      = os.getenv("TARGET_N", "110000479000513")
@@ -10,23 +10,7 @@ TASK_BUDGET_S = float(os.getenv("TASK_BUDGET_S", "240"))
 # Cloud Run exposes this; fallback to 0 when not present
 TASK_INDEX = int(os.getenv("CLOUD_RUN_TASK_INDEX", "0"))
 
-# --- Stagger start: spread load across your VM ---
-# up to ~30s max stagger; spaced by index and a dash of randomness
-jitter = min(30.0, 3.0 * TASK_INDEX + random.uniform(0, 5))
-print("task_index", TASK_INDEX, "jitter_s", round(jitter, 2), flush=True)
-time.sleep(jitter)
-
-deadline = time.time() + TASK_BUDGET_S
-session = requests.Session()
-session.headers.update({"User-Agent": "rsacrack-batch/1.0"})
-
-# quick health check (non-fatal)
-try:
-    session.get(f"{BASE_URL}/healthz", timeout=5)
-except Exception as e:
-    print("health_error", repr(e), flush=True)
-
-def attempt_once(try_no: int) -> int:
+def attempt_once(session, deadline: float, try_no: int) -> int:
     if time.time() + READ_TIMEOUT > deadline:
         print("stopping_before_timeout", flush=True)
         return 2
@@ -47,17 +31,36 @@ def attempt_once(try_no: int) -> int:
         print("requests_error", f"try={try_no}", "err="+repr(e), flush=True)
         return 2
 
-code = 2
-for t in range(1, MAX_TRIES + 1):
-    code = attempt_once(t)
-    if code == 0:
-        sys.exit(0)
-    # small exponential backoff with jitter, but stay within task budget
-    backoff = min(15.0, (2 ** t) + random.uniform(0, 2))
-    if time.time() + backoff > deadline:
-        print("stopping_before_timeout", flush=True)
-        break
-    time.sleep(backoff)
+def main() -> int:
+    # --- Stagger start: spread load across your VM ---
+    # up to ~30s max stagger; spaced by index and a dash of randomness
+    jitter = min(30.0, 3.0 * TASK_INDEX + random.uniform(0, 5))
+    print("task_index", TASK_INDEX, "jitter_s", round(jitter, 2), flush=True)
+    time.sleep(jitter)
+
+    deadline = time.time() + TASK_BUDGET_S
+    import requests  # ~140 ms; not worth paying before the stagger sleep
+    session = requests.Session()
+    session.headers.update({"User-Agent": "rsacrack-batch/1.0"})
+
+    # quick health check (non-fatal)
+    try:
+        session.get(f"{BASE_URL}/healthz", timeout=5)
+    except Exception as e:
+        print("health_error", repr(e), flush=True)
+
+    for t in range(1, MAX_TRIES + 1):
+        if attempt_once(session, deadline, t) == 0:
+            return 0
+        # small exponential backoff with jitter, but stay within task budget
+        backoff = min(15.0, (2 ** t) + random.uniform(0, 2))
+        if time.time() + backoff > deadline:
+            print("stopping_before_timeout", flush=True)
+            break
+        time.sleep(backoff)
+
+    print("final_error", "gave up", flush=True)
+    return 2
 
-print("final_error", "gave up", flush=True)
-sys.exit(2)
+if __name__ == "__main__":
+    sys.exit(main())